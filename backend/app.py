@@ -8,13 +8,15 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 
 from src.interfaces.controllers import create_controllers
+from src.interfaces.compression import init_compression
 
 # Load environment variables
 load_dotenv()
 
 def create_app():
     """Application factory"""
-    app = Flask(__name__)
+    # /static est servi par le blueprint "media" (Range, ETag, copies .gz/.br)
+    app = Flask(__name__, static_folder=None)
     
     # Configuration
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
@@ -40,6 +42,9 @@ def create_app():
     
     print("All controllers registered!")
     
+    # Compression gzip / brotli des réponses JSON
+    init_compression(app)
+    
     # Routes de compatibilité pour le frontend existant
     @app.route('/api/login', methods=['POST', 'OPTIONS'])
     def login_compatibility():
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Recalcule les œuvres similaires (« vous aimerez aussi ») de toutes les œuvres
+
+Le serveur les recalcule en arrière-plan après chaque modification d'œuvre ;
+ce script le fait immédiatement, par exemple après un import en base.
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.infrastructure.search import SimilarArtworksService
+from src.infrastructure.search.similarity import SIMILAR_TOP_K
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Calcul des œuvres similaires")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--top-k', type=int, default=SIMILAR_TOP_K, help="Nombre de voisins gardés par œuvre")
+    args = parser.parse_args()
+
+    print("🧭 Calcul des œuvres similaires...")
+    started = time.perf_counter()
+    rows = SimilarArtworksService(args.db, k=args.top_k).refresh()
+    print(f"✅ {rows} voisin(s) enregistré(s) en {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
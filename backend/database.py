@@ -37,6 +37,15 @@ def create_default_admin():
     conn.close()
 
 def create_tables():
+    # Les tables et colonnes des services (médias, recherche) sont définies dans leur module
+    from src.infrastructure.media.derivatives import ensure_variant_columns
+    from src.infrastructure.media.image_metadata import IMAGE_METADATA_SCHEMA
+    from src.infrastructure.media.panorama_tiles import ensure_tiles_column
+    from src.infrastructure.search.analytics import ensure_search_analytics_tables
+    from src.infrastructure.search.catalog import ensure_catalog_version
+    from src.infrastructure.search.similarity import SIMILARITY_SCHEMA
+    from src.infrastructure.search.trigrams import TRIGRAM_ARTWORK_INDEX, TRIGRAM_SCHEMA
+
     conn = get_connection()
     cur = conn.cursor()
 
@@ -94,6 +103,17 @@ def create_tables():
     )
     """)
 
+    # Déclinaisons WebP/JPEG (JSON) et pyramide de tuiles des panoramas
+    ensure_variant_columns(conn)
+    ensure_tiles_column(conn)
+    # Métadonnées des images, index de recherche, œuvres similaires, version du catalogue, statistiques
+    cur.execute(IMAGE_METADATA_SCHEMA)
+    cur.execute(TRIGRAM_SCHEMA)
+    cur.execute(TRIGRAM_ARTWORK_INDEX)
+    cur.execute(SIMILARITY_SCHEMA)
+    ensure_catalog_version(conn)
+    ensure_search_analytics_tables(conn)
+
     conn.commit()
     conn.close()
 
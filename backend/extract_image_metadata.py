@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Calcule les métadonnées (dimensions, blurhash, couleur dominante) des images
+d'œuvres et des panoramas déjà en ligne
+
+Les nouveaux uploads sont traités automatiquement ; ce script rattrape
+les images existantes.
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.infrastructure.media import ImageMetadataService
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Extraction des métadonnées d'images")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : nombre de CPU)")
+    parser.add_argument('--force', action='store_true', help="Tout recalculer, même les images déjà traitées")
+    args = parser.parse_args()
+
+    service = ImageMetadataService(args.db)
+    urls = service.pending_urls(force=args.force)
+    print(f"🎨 {len(urls)} image(s) à analyser...")
+
+    started = time.perf_counter()
+    extracted, errors = service.generate_many(urls, workers=args.workers)
+
+    print(f"✅ {extracted} image(s) analysée(s) en {time.perf_counter() - started:.2f}s")
+    for error in errors[:10]:
+        print(f"❌ {error['target']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Génère les déclinaisons responsives (WebP et JPEG à plusieurs largeurs)
+des images d'œuvres et des panoramas déjà en ligne
+
+Les nouveaux uploads sont traités automatiquement ; ce script rattrape
+les images existantes.
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.infrastructure.media import ImageDerivativeService
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Génération des déclinaisons d'images")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : nombre de CPU)")
+    parser.add_argument('--force', action='store_true', help="Tout régénérer, même les images déjà traitées")
+    args = parser.parse_args()
+
+    service = ImageDerivativeService(args.db)
+    targets = service.pending_targets(force=args.force)
+    print(f"🖼️  {len(targets)} image(s) à traiter...")
+
+    started = time.perf_counter()
+    generated, errors = service.generate_many(targets, workers=args.workers)
+
+    print(f"✅ {generated} image(s) déclinée(s) en {time.perf_counter() - started:.2f}s")
+    for error in errors[:10]:
+        print(f"❌ {error['target']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Découpe les panoramas des salles en pyramide de tuiles multirésolution
+(format multires de pannellum)
+
+Les nouveaux panoramas sont traités automatiquement ; ce script rattrape
+les salles existantes.
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.infrastructure.media import PanoramaTileService
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Génération des tuiles de panoramas")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : nombre de CPU)")
+    parser.add_argument('--force', action='store_true', help="Tout redécouper, même les panoramas déjà traités")
+    args = parser.parse_args()
+
+    service = PanoramaTileService(args.db)
+    targets = service.pending_targets(force=args.force)
+    print(f"🌐 {len(targets)} panorama(s) à découper...")
+
+    started = time.perf_counter()
+    completed, errors = service.generate_many(targets, workers=args.workers, force=args.force)
+
+    print(f"✅ {completed} panorama(s) découpé(s) en {time.perf_counter() - started:.2f}s")
+    for error in errors[:10]:
+        print(f"❌ {error['target']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
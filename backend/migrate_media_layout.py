@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Migre les fichiers médias vers l'arborescence répartie par préfixe de hachage
+(static/images/ab/cd/<fichier>) et réécrit les URLs en base
+
+À lancer serveur arrêté. Le script peut être relancé : seuls les fichiers
+encore à plat sont traités.
+"""
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+
+from src.infrastructure.media import MediaLayoutMigration
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Migration vers l'arborescence répartie des médias")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher ce qui serait déplacé sans rien modifier")
+    args = parser.parse_args()
+
+    folders = {
+        '/static/images': os.getenv('IMAGES_FOLDER', os.path.join('static', 'images')),
+        '/static/audios': os.getenv('AUDIO_FOLDER', os.path.join('static', 'audios')),
+        '/static/videos': os.getenv('VIDEOS_FOLDER', os.path.join('static', 'videos')),
+        '/static/qrcodes': os.getenv('QR_FOLDER', os.path.join('static', 'qrcodes')),
+    }
+    migration = MediaLayoutMigration(args.db, folders, qr_folder=folders['/static/qrcodes'])
+
+    print("📦 Migration des médias" + (" (simulation)" if args.dry_run else "") + "...")
+    report = migration.run(dry_run=args.dry_run)
+
+    print(f"✅ {report.files_moved} fichier(s) déplacé(s), {report.rows_updated} ligne(s) mise(s) à jour "
+          f"en {report.elapsed_seconds:.2f}s ({report.already_sharded} déjà réparti(s))")
+    if report.missing_files:
+        print(f"⚠️  {len(report.missing_files)} fichier(s) référencé(s) introuvable(s)")
+    for error in report.errors[:10]:
+        print(f"❌ {error['file']}: {error['error']}")
+    if args.dry_run:
+        print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Écrit les copies précompressées (.gz et .br) des fichiers statiques texte
+(SVG, JSON, CSS...) servies selon l'en-tête Accept-Encoding
+
+À lancer au déploiement (ou après un ajout de fichiers) : seuls les fichiers
+nouveaux ou modifiés sont recompressés.
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+from src.infrastructure.media.precompress import available_encodings, precompress_tree
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Précompression gzip / brotli des fichiers statiques")
+    parser.add_argument('folders', nargs='*', default=['static'], help="Dossiers à traiter (static par défaut)")
+    parser.add_argument('--force', action='store_true', help="Recompresser même les copies à jour")
+    args = parser.parse_args()
+
+    print(f"🗜️  Précompression ({', '.join(available_encodings())}) de {', '.join(args.folders)}...")
+    report = precompress_tree(args.folders, force=args.force)
+
+    print(f"✅ {report.files_written} fichier(s) compressé(s) sur {report.scanned} en {report.elapsed_seconds:.2f}s")
+    for encoding, size in report.bytes_compressed.items():
+        ratio = size / report.bytes_original * 100 if report.bytes_original else 0
+        print(f"   {encoding}: {report.bytes_original} -> {size} octets ({ratio:.0f}%)")
+    for error in report.errors[:10]:
+        print(f"❌ {error['file']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Génère la planche imprimable des QR codes des œuvres d'une salle
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.infrastructure import SQLiteArtworkRepository
+from src.infrastructure.qr import QRSheetRenderer, ShortLinkService, write_sheet
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Planche de QR codes d'une salle")
+    parser.add_argument('room_id', type=int, help="ID de la salle")
+    parser.add_argument('--format', choices=['pdf', 'png'], default='pdf', help="PDF paginé ou planche PNG")
+    parser.add_argument('--output', help="Fichier de sortie (défaut : room_<id>_qrcodes.<format>)")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--base-url', default=os.getenv('BASE_URL', 'http://127.0.0.1:5000'), help="URL publique de l'API")
+    parser.add_argument('--workers', type=int, default=None, help="Étiquettes rendues en parallèle au plus (pool partagé, voir MEDIA_WORKERS)")
+    args = parser.parse_args()
+
+    output = args.output or f"room_{args.room_id}_qrcodes.{args.format}"
+    artworks = SQLiteArtworkRepository(args.db).get_by_room_id(args.room_id)
+    if not artworks:
+        print(f"⚠️  Aucune œuvre dans la salle {args.room_id}")
+        return
+
+    started = time.perf_counter()
+    urls = ShortLinkService(args.db, args.base_url).qr_urls(('artwork', artwork.id) for artwork in artworks)
+    items = [(urls[('artwork', artwork.id)], artwork.title) for artwork in artworks]
+    size = write_sheet(QRSheetRenderer(args.workers).render(items, args.format), output)
+
+    print(f"✅ {len(items)} QR codes → {output} ({size // 1024} Ko) en {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
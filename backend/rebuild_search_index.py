@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Reconstruit l'index de trigrammes de la recherche d'œuvres
+
+Le serveur indexe les œuvres créées ou modifiées par l'API et, au démarrage,
+celles qui manquent ; ce script sert après des modifications faites
+directement en base (imports, scripts SQL).
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from src.infrastructure.search import TrigramIndex
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Reconstruction de l'index de recherche")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--force', action='store_true', help="Réindexer toutes les œuvres, pas seulement les manquantes")
+    args = parser.parse_args()
+
+    print("🔎 Indexation des œuvres...")
+    started = time.perf_counter()
+    indexed = TrigramIndex(args.db).sync(force=args.force)
+    print(f"✅ {indexed} œuvre(s) indexée(s) en {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Régénère en parallèle les QR codes des œuvres et des salles
+
+À lancer après un changement de BASE_URL : seules les images dont l'URL
+encodée a changé sont recalculées (voir static/qrcodes/manifest.json).
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+from src.infrastructure.qr import QRCodeRegenerationService, ShortLinkService
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Régénération des QR codes du musée")
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'museum.db'), help="Chemin de la base SQLite")
+    parser.add_argument('--base-url', default=os.getenv('BASE_URL', 'http://127.0.0.1:5000'), help="URL publique de l'API")
+    parser.add_argument('--qr-folder', default=os.path.join("static", "qrcodes"), help="Dossier des QR codes")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : nombre de CPU)")
+    parser.add_argument('--force', action='store_true', help="Tout régénérer, même les QR codes à jour")
+    args = parser.parse_args()
+
+    print(f"🔄 Régénération des QR codes pour {args.base_url}...")
+    short_links = ShortLinkService(args.db, args.base_url)
+    service = QRCodeRegenerationService(args.db, args.qr_folder, short_links)
+    report = service.regenerate(force=args.force, workers=args.workers)
+
+    print(f"✅ {report.regenerated} régénérés, {report.skipped} inchangés, {report.failed} en échec "
+          f"sur {report.total} en {report.elapsed_seconds:.2f}s ({report.throughput:.0f}/s)")
+    for error in report.errors[:10]:
+        print(f"❌ {error['file']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
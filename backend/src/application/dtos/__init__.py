@@ -20,6 +20,7 @@ from .artwork_dtos import (
     ArtworkSearchRequest,
     ViewArtworkRequest,
     ArtworkResponse,
+    ArtworkSearchResponse,
     PopularArtworksRequest
 )
 
@@ -43,5 +44,6 @@ __all__ = [
     "ArtworkSearchRequest",
     "ViewArtworkRequest",
     "ArtworkResponse",
+    "ArtworkSearchResponse",
     "PopularArtworksRequest"
 ]
\ No newline at end of file
@@ -2,7 +2,7 @@
 Data Transfer Objects for Artwork operations
 """
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
 
@@ -35,14 +35,24 @@ class UpdateArtworkRequest:
 
 @dataclass
 class ArtworkSearchRequest:
-    """DTO for artwork search request"""
+    """DTO for artwork search request (a list of filter values accepts any of them)"""
     query: Optional[str] = None
-    category: Optional[str] = None
-    period: Optional[str] = None
-    origin: Optional[str] = None
-    room_id: Optional[int] = None
+    category: Optional[Union[str, List[str]]] = None
+    period: Optional[Union[str, List[str]]] = None
+    origin: Optional[Union[str, List[str]]] = None
+    room_id: Optional[Union[int, List[int]]] = None
     language: str = "fr"
     limit: Optional[int] = None
+    has_audio: Optional[bool] = None
+    has_video: Optional[bool] = None
+    
+    def filters(self) -> Dict[str, Any]:
+        """Filter fields that are set"""
+        filters = {
+            'category': self.category, 'period': self.period, 'origin': self.origin,
+            'room_id': self.room_id, 'has_audio': self.has_audio, 'has_video': self.has_video
+        }
+        return {field: value for field, value in filters.items() if value is not None}
 
 
 @dataclass
@@ -67,11 +77,14 @@ class ArtworkResponse:
     image_url: Optional[str]
     audio_url: Optional[str]
     video_url: Optional[str]
-    qr_code_data: Optional[str]
+    qr_code_url: Optional[str]
     view_count: int
     popularity: int
     created_at: datetime
     room_name: Optional[str] = None
+    image_srcset: Optional[Dict[str, str]] = None
+    image_metadata: Optional[Dict[str, Any]] = None
+    thumbnail_url: Optional[str] = None
     
     @classmethod
     def from_entity(cls, artwork, room_name: Optional[str] = None):
@@ -79,9 +92,9 @@ class ArtworkResponse:
         return cls(
             id=artwork.id,
             title=artwork.title,
-            description_fr=artwork.description_fr,
-            description_en=artwork.description_en,
-            description_wo=artwork.description_wo,
+            description_fr=artwork.description.fr,
+            description_en=artwork.description.en,
+            description_wo=artwork.description.wo,
             category=artwork.category,
             period=artwork.period,
             origin=artwork.origin,
@@ -89,12 +102,53 @@ class ArtworkResponse:
             image_url=artwork.image_url,
             audio_url=artwork.audio_url,
             video_url=artwork.video_url,
-            qr_code_data=artwork.qr_code_data,
+            qr_code_url=artwork.qr_code_url,
             view_count=artwork.view_count,
             popularity=artwork.popularity,
             created_at=artwork.created_at,
-            room_name=room_name
+            room_name=room_name,
+            image_srcset=artwork.image_srcset,
+            image_metadata=artwork.image_metadata,
+            thumbnail_url=artwork.thumbnail_url
         )
+    
+    def to_dict(self, language: str = "fr") -> Dict[str, Any]:
+        """Convert to the JSON payload, with the description in the requested language"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': getattr(self, f'description_{language}', None) or self.description_fr,
+            'category': self.category,
+            'period': self.period,
+            'origin': self.origin,
+            'room_id': self.room_id,
+            'room_name': self.room_name,
+            'image_url': self.image_url,
+            'image_srcset': self.image_srcset,
+            'image_metadata': self.image_metadata,
+            'thumbnail_url': self.thumbnail_url,
+            'audio_url': self.audio_url,
+            'video_url': self.video_url,
+            'qr_code_url': self.qr_code_url,
+            'popularity': self.popularity,
+            'view_count': self.view_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+@dataclass
+class ArtworkSearchResponse:
+    """DTO for a faceted artwork search: results, total before limit and counts per facet value"""
+    results: List[ArtworkResponse]
+    total: int
+    facets: Dict[str, List[Dict[str, Any]]]
+    
+    def to_dict(self, language: str = "fr") -> Dict[str, Any]:
+        return {
+            'results': [artwork.to_dict(language) for artwork in self.results],
+            'total': self.total,
+            'facets': self.facets
+        }
 
 
 @dataclass
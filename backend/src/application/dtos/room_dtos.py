@@ -2,7 +2,7 @@
 Data Transfer Objects for Room operations
 """
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -60,6 +60,11 @@ class RoomResponse:
     has_interactive: bool
     created_at: datetime
     artwork_count: Optional[int] = None
+    panorama_srcset: Optional[Dict[str, str]] = None
+    panorama_multires: Optional[Dict[str, Any]] = None
+    panorama_metadata: Optional[Dict[str, Any]] = None
+    artworks: Optional[List[Dict[str, Any]]] = None
+    hotspots: Optional[List[Dict[str, Any]]] = None
     
     @classmethod
     def from_entity(cls, room, artwork_count: Optional[int] = None):
@@ -78,5 +83,8 @@ class RoomResponse:
             has_audio=room.has_audio,
             has_interactive=room.has_interactive,
             created_at=room.created_at,
-            artwork_count=artwork_count
+            artwork_count=artwork_count,
+            panorama_srcset=room.panorama_srcset,
+            panorama_multires=room.panorama_multires,
+            panorama_metadata=room.panorama_metadata
         )
\ No newline at end of file
@@ -1,14 +1,16 @@
 """
 Artwork Application Service - Use Cases for Artwork Management
 """
-from typing import Optional, List
+from typing import Any, Dict, Iterator, Optional, List, Sequence, Tuple
 
 from ..dtos.artwork_dtos import (
     CreateArtworkRequest, UpdateArtworkRequest, ArtworkSearchRequest,
-    ViewArtworkRequest, ArtworkResponse, PopularArtworksRequest
+    ViewArtworkRequest, ArtworkResponse, PopularArtworksRequest, ArtworkSearchResponse
 )
 from ...domain.entities.artwork import Artwork
-from ...domain.repositories.repository_interfaces import ArtworkRepository, RoomRepository
+from ...domain.repositories.repository_interfaces import (
+    ArtworkRepository, RoomRepository, FACET_FIELDS, ARTWORK_FIELDS
+)
 from ...domain.services.qr_code_service import QRCodeService
 
 
@@ -18,9 +20,12 @@ class ArtworkApplicationService:
     Orchestre les opérations métier via les services et repositories du domaine
     """
     
-    def __init__(self, artwork_repository: ArtworkRepository, room_repository: RoomRepository, frontend_url: str):
+    def __init__(self, artwork_repository: ArtworkRepository, room_repository: RoomRepository, frontend_url: str,
+                 search_cache=None):
         self._artwork_repository = artwork_repository
         self._room_repository = room_repository
+        # Cache des IDs trouvés par recherche (get/put par critères et version du catalogue), optionnel
+        self._search_cache = search_cache
         self._qr_service = QRCodeService()
         self._frontend_url = frontend_url
     
@@ -42,7 +47,7 @@ class ArtworkApplicationService:
                 room_name = None
                 if include_room_names:
                     room = self._room_repository.get_by_id(artwork.room_id)
-                    room_name = room.name_fr if room else None
+                    room_name = room.name.fr if room else None
                 
                 responses.append(ArtworkResponse.from_entity(artwork, room_name))
             
@@ -74,7 +79,7 @@ class ArtworkApplicationService:
             
             # Enrichir avec le nom de la salle
             room = self._room_repository.get_by_id(artwork.room_id)
-            room_name = room.name_fr if room else None
+            room_name = room.name.fr if room else None
             
             return ArtworkResponse.from_entity(artwork, room_name)
             
@@ -98,7 +103,7 @@ class ArtworkApplicationService:
             room_name = None
             if include_room_name and artworks:
                 room = self._room_repository.get_by_id(room_id)
-                room_name = room.name_fr if room else None
+                room_name = room.name.fr if room else None
             
             return [ArtworkResponse.from_entity(artwork, room_name) for artwork in artworks]
             
@@ -149,17 +154,12 @@ class ArtworkApplicationService:
             # Sauvegarder pour obtenir l'ID
             saved_artwork = self._artwork_repository.save(artwork)
             
-            # Générer le QR code
+            # Le QR code est rendu à la demande : on ne stocke que son URL
             if saved_artwork and saved_artwork.id:
-                qr_code_data = self._qr_service.generate_qr_code_for_artwork(
-                    saved_artwork.id,
-                    self._frontend_url
-                )
-                saved_artwork.set_qr_code(qr_code_data)
-                # Sauvegarder à nouveau avec le QR code
+                saved_artwork.set_qr_code(f"/api/artworks/{saved_artwork.id}/qr.png")
                 saved_artwork = self._artwork_repository.save(saved_artwork)
             
-            return ArtworkResponse.from_entity(saved_artwork, room.name_fr) if saved_artwork else None
+            return ArtworkResponse.from_entity(saved_artwork, room.name.fr) if saved_artwork else None
             
         except Exception:
             return None
@@ -209,7 +209,7 @@ class ArtworkApplicationService:
             
             # Enrichir avec le nom de la salle
             room = self._room_repository.get_by_id(updated_artwork.room_id)
-            room_name = room.name_fr if room else None
+            room_name = room.name.fr if room else None
             
             return ArtworkResponse.from_entity(updated_artwork, room_name) if updated_artwork else None
             
@@ -227,42 +227,151 @@ class ArtworkApplicationService:
             Liste des œuvres correspondantes
         """
         try:
-            # Construire les critères de recherche
-            criteria = {}
-            
-            if request.query:
-                criteria['query'] = request.query
-            
-            if request.category:
-                criteria['category'] = request.category
-            
-            if request.period:
-                criteria['period'] = request.period
+            criteria = self._search_criteria(request)
+            limit = request.limit if request.limit and request.limit > 0 else None
             
-            if request.origin:
-                criteria['origin'] = request.origin
+            if self._search_cache is None:
+                artworks = self._artwork_repository.search(criteria)[:limit]
+            else:
+                # Seuls les IDs sont en cache : les œuvres sont relues, jamais périmées
+                version = self._artwork_repository.catalog_version()
+                artwork_ids = self._search_cache.get(criteria, version)
+                if artwork_ids is None:
+                    artworks = self._artwork_repository.search(criteria)
+                    self._search_cache.put(criteria, version, [artwork.id for artwork in artworks])
+                    artworks = artworks[:limit]
+                else:
+                    artworks = self._artwork_repository.get_by_ids(artwork_ids[:limit])
+            
+            # Noms des salles chargés une seule fois pour tous les résultats
+            room_names = {room.id: room.name.fr for room in self._room_repository.get_all()}
+            return [ArtworkResponse.from_entity(artwork, room_names.get(artwork.room_id)) for artwork in artworks]
             
-            if request.room_id:
-                criteria['room_id'] = request.room_id
+        except Exception:
+            return []
+    
+    def search_artworks_with_facets(self, request: ArtworkSearchRequest,
+                                    facets: Optional[List[str]] = None) -> ArtworkSearchResponse:
+        """
+        Use Case: Recherche d'œuvres avec le nombre de résultats par facette
+        
+        Args:
+            request: Critères de recherche
+            facets: Facettes à compter (défaut : toutes)
             
-            # Rechercher via le repository
-            artworks = self._artwork_repository.search(criteria)
+        Returns:
+            Résultats, total avant limite et compteurs par facette
+        """
+        criteria = self._search_criteria(request)
+        artworks = self._artwork_repository.search(criteria)
+        counts = self._artwork_repository.facet_counts(criteria, facets or FACET_FIELDS)
+        
+        rooms = {room.id: room for room in self._room_repository.get_all()}
+        total = len(artworks)
+        if request.limit and request.limit > 0:
+            artworks = artworks[:request.limit]
+        
+        facet_values = {}
+        for facet, values in counts.items():
+            entries = []
+            for value, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0]))):
+                entry = {'value': value, 'count': count}
+                if facet == 'room_id':
+                    room = rooms.get(value)
+                    entry['label'] = room.name.get_text(request.language) if room else None
+                entries.append(entry)
+            facet_values[facet] = entries
+        
+        results = []
+        for artwork in artworks:
+            room = rooms.get(artwork.room_id)
+            results.append(ArtworkResponse.from_entity(artwork, room.name.fr if room else None))
+        return ArtworkSearchResponse(results=results, total=total, facets=facet_values)
+    
+    @staticmethod
+    def _search_criteria(request: ArtworkSearchRequest) -> dict:
+        """Critères du repository à partir de la requête de recherche"""
+        criteria = request.filters()
+        if request.query:
+            criteria['search_text'] = request.query
+        return criteria
+    
+    def get_similar_artworks(self, artwork_id: int, limit: int) -> Optional[List[Tuple[ArtworkResponse, float]]]:
+        """
+        Use Case: Œuvres similaires (« vous aimerez aussi »)
+        
+        Args:
+            artwork_id: ID de l'œuvre consultée
+            limit: Nombre maximum de suggestions
             
-            # Limiter les résultats si demandé
-            if request.limit and request.limit > 0:
-                artworks = artworks[:request.limit]
+        Returns:
+            Œuvres similaires avec leur score, None si l'œuvre n'existe pas
+        """
+        neighbors = self._artwork_repository.get_similar(artwork_id, limit)
+        if not neighbors:
+            # Pas encore calculé, œuvre isolée ou inexistante
+            return [] if self._artwork_repository.get_by_id(artwork_id) else None
+        
+        room_names = {room.id: room.name.fr for room in self._room_repository.get_all()}
+        return [
+            (ArtworkResponse.from_entity(artwork, room_names.get(artwork.room_id)), score)
+            for artwork, score in neighbors
+        ]
+    
+    def get_artworks_by_ids(self, artwork_ids: List[int]) -> List[ArtworkResponse]:
+        """
+        Use Case: Récupération d'œuvres déjà sélectionnées (ex. par un index en mémoire)
+        
+        Args:
+            artwork_ids: IDs des œuvres, dans l'ordre voulu
             
-            # Enrichir avec les noms des salles
-            responses = []
-            for artwork in artworks:
-                room = self._room_repository.get_by_id(artwork.room_id)
-                room_name = room.name_fr if room else None
-                responses.append(ArtworkResponse.from_entity(artwork, room_name))
+        Returns:
+            Œuvres existantes, dans l'ordre des IDs
+        """
+        artworks = self._artwork_repository.get_by_ids(artwork_ids)
+        room_names = {room.id: room.name.fr for room in self._room_repository.get_all()} if artworks else {}
+        return [ArtworkResponse.from_entity(artwork, room_names.get(artwork.room_id)) for artwork in artworks]
+    
+    def list_artworks(self, fields: Sequence[str] = ARTWORK_FIELDS, language: str = 'fr',
+                      room_id: Optional[int] = None, category: Optional[str] = None,
+                      order: str = 'title', limit: Optional[int] = None,
+                      ids: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Use Case: Liste d'œuvres réduite aux champs demandés (grilles, administration)
+        
+        Args:
+            fields: Champs renvoyés (ARTWORK_PROJECTION_FIELDS), l'ID est toujours inclus
+            language: Langue de la description
+            room_id: Salle des œuvres
+            category: Catégorie des œuvres
+            order: 'title', 'popularity' ou 'newest'
+            limit: Nombre maximal d'œuvres
+            ids: IDs des œuvres voulues, renvoyées dans cet ordre
             
-            return responses
+        Returns:
+            Dictionnaires des champs demandés, lus sans charger les autres colonnes
+        """
+        fields = tuple(dict.fromkeys(('id', *fields)))
+        criteria = {'room_id': room_id, 'category': category}
+        return self._artwork_repository.get_projected(fields, language, criteria, order, limit, ids)
+    
+    def iter_artworks(self, fields: Sequence[str] = ARTWORK_FIELDS, language: str = 'fr',
+                      room_id: Optional[int] = None, category: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Use Case: Parcours de tout le catalogue (exports), en mémoire constante
+        
+        Args:
+            fields: Champs renvoyés (ARTWORK_PROJECTION_FIELDS), l'ID est toujours inclus
+            language: Langue de la description
+            room_id: Salle des œuvres
+            category: Catégorie des œuvres
             
-        except Exception:
-            return []
+        Returns:
+            Itérateur des dictionnaires, des plus récentes aux plus anciennes, lus par lots
+        """
+        fields = tuple(dict.fromkeys(('id', *fields)))
+        criteria = {'room_id': room_id, 'category': category}
+        return self._artwork_repository.iter_projected(fields, language, criteria, order='newest')
     
     def get_popular_artworks(self, limit_or_request) -> List[ArtworkResponse]:
         """
@@ -294,7 +403,7 @@ class ArtworkApplicationService:
             responses = []
             for artwork in artworks:
                 room = self._room_repository.get_by_id(artwork.room_id)
-                room_name = room.name_fr if room else None
+                room_name = room.name.fr if room else None
                 responses.append(ArtworkResponse.from_entity(artwork, room_name))
             
             return responses
@@ -1,7 +1,7 @@
 """
 Room Application Service - Use Cases for Room Management
 """
-from typing import Optional, List
+from typing import Optional, List, Sequence
 
 from ..dtos.room_dtos import (
     CreateRoomRequest, UpdateRoomRequest, RoomSearchRequest, RoomResponse
@@ -71,6 +71,40 @@ class RoomApplicationService:
         except Exception:
             return None
     
+    def get_room_with_artworks(self, room_id: int, fields: Sequence[str], language: str = 'fr',
+                               include: Sequence[str] = ('artworks',)) -> Optional[RoomResponse]:
+        """
+        Use Case: Salle avec ses œuvres et/ou ses hotspots reliés à leur œuvre, en une seule requête
+        
+        Args:
+            room_id: ID de la salle
+            fields: Champs renvoyés pour chaque œuvre (ARTWORK_PROJECTION_FIELDS)
+            language: Langue des descriptions d'œuvres
+            include: 'artworks' (œuvres de la salle) et/ou 'hotspots' (hotspots avec leur œuvre)
+            
+        Returns:
+            Détails de la salle avec artworks et/ou hotspots, ou None si non trouvée
+        """
+        fields = tuple(dict.fromkeys(('id', *fields)))
+        result = self._room_repository.get_with_artworks(
+            room_id, fields, language, room_artworks='artworks' in include, hotspot_artworks='hotspots' in include
+        )
+        if not result:
+            return None
+        
+        room, artworks, hotspot_artworks = result
+        response = RoomResponse.from_entity(room)
+        if 'artworks' in include:
+            response.artworks = artworks
+        if 'hotspots' in include:
+            # Chaque hotspot pointant vers une œuvre la reçoit (None si elle n'existe plus)
+            response.hotspots = [
+                dict(hotspot, artwork=hotspot_artworks.get(hotspot['artwork_id']))
+                if isinstance(hotspot.get('artwork_id'), int) else hotspot
+                for hotspot in room.hotspot_list
+            ]
+        return response
+    
     def get_room_by_id(self, room_id: int) -> Optional[RoomResponse]:
         """Alias pour get_room_details pour compatibilité avec le controller"""
         return self.get_room_details(room_id, include_artwork_count=False)
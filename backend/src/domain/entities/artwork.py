@@ -6,6 +6,8 @@ from datetime import datetime
 
 from ..shared.base_entity import Entity
 from .room import MultilingualText
+from .image_variants import ImageVariants
+from .image_metadata import ImageMetadata
 
 
 class Artwork(Entity):
@@ -26,7 +28,9 @@ class Artwork(Entity):
         popularity: int = 0,
         view_count: int = 0,
         id: Optional[int] = None,
-        created_at: Optional[datetime] = None
+        created_at: Optional[datetime] = None,
+        image_variants: Optional[ImageVariants] = None,
+        image_metadata: Optional[ImageMetadata] = None
     ):
         super().__init__(id, created_at)
         self._title = title
@@ -41,6 +45,8 @@ class Artwork(Entity):
         self._qr_code_url = qr_code_url
         self._popularity = popularity
         self._view_count = view_count
+        self._image_variants = image_variants
+        self._image_metadata = image_metadata
         self._validate()
     
     @property
@@ -83,6 +89,30 @@ class Artwork(Entity):
     def qr_code_url(self) -> Optional[str]:
         return self._qr_code_url
     
+    @property
+    def image_variants(self) -> Optional[ImageVariants]:
+        """Resized copies of the current image, if generated"""
+        if self._image_variants and self._image_variants.matches(self._image_url):
+            return self._image_variants
+        return None
+    
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        """srcset values per format (webp, jpeg) for the current image"""
+        variants = self.image_variants
+        return variants.srcset() if variants else None
+    
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        """Smallest copy of the current image for grids, the image itself if none was generated"""
+        variants = self.image_variants
+        return (variants.thumbnail() if variants else None) or self._image_url
+    
+    @property
+    def image_metadata(self) -> Optional[Dict[str, Any]]:
+        """Size, blurhash and dominant color of the current image, once extracted"""
+        return self._image_metadata.to_dict() if self._image_metadata else None
+    
     @property
     def popularity(self) -> int:
         return self._popularity
@@ -216,6 +246,9 @@ class Artwork(Entity):
             'origin': self.origin,
             'room_id': self.room_id,
             'image_url': self.image_url,
+            'image_srcset': self.image_srcset,
+            'image_metadata': self.image_metadata,
+            'thumbnail_url': self.thumbnail_url,
             'audio_url': self.audio_url,
             'video_url': self.video_url,
             'qr_code_url': self.qr_code_url,
@@ -0,0 +1,40 @@
+"""
+Image metadata value object
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class ImageMetadata:
+    """Value object for what a client needs to lay out an image before loading it"""
+    width: int
+    height: int
+    blurhash: Optional[str] = None
+    dominant_color: Optional[str] = None
+
+    @property
+    def aspect_ratio(self) -> float:
+        return round(self.width / self.height, 4) if self.height else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'width': self.width,
+            'height': self.height,
+            'aspect_ratio': self.aspect_ratio,
+            'blurhash': self.blurhash,
+            'dominant_color': self.dominant_color
+        }
+
+    @classmethod
+    def from_row(cls, row, prefix: str = '') -> Optional['ImageMetadata']:
+        """Build from joined columns (<prefix>width, <prefix>height...), None when absent"""
+        keys = row.keys()
+        if f'{prefix}width' not in keys or row[f'{prefix}width'] is None:
+            return None
+        return cls(
+            width=row[f'{prefix}width'],
+            height=row[f'{prefix}height'],
+            blurhash=row[f'{prefix}blurhash'] if f'{prefix}blurhash' in keys else None,
+            dominant_color=row[f'{prefix}dominant_color'] if f'{prefix}dominant_color' in keys else None
+        )
@@ -0,0 +1,53 @@
+"""
+Image variants value object
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class ImageVariants:
+    """Value object for the resized copies of an image, per format and width"""
+    source: str
+    formats: Dict[str, Dict[int, str]] = field(default_factory=dict)
+
+    def srcset(self) -> Dict[str, str]:
+        """srcset attribute value for each format, narrowest first"""
+        return {
+            fmt: ", ".join(f"{urls[width]} {width}w" for width in sorted(urls))
+            for fmt, urls in self.formats.items() if urls
+        }
+
+    def thumbnail(self) -> Optional[str]:
+        """Narrowest copy, WebP when available"""
+        for fmt in ('webp', *self.formats):
+            urls = self.formats.get(fmt)
+            if urls:
+                return urls[min(urls)]
+        return None
+
+    def matches(self, url: Optional[str]) -> bool:
+        """Whether these variants were generated from the given image"""
+        return bool(url) and url == self.source
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'source': self.source,
+            'formats': {fmt: {str(width): url for width, url in urls.items()} for fmt, urls in self.formats.items()}
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> Optional['ImageVariants']:
+        """Parse the stored JSON, returning None when missing or invalid"""
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            formats = {
+                fmt: {int(width): url for width, url in urls.items()}
+                for fmt, urls in data.get('formats', {}).items()
+            }
+            return cls(source=data['source'], formats=formats)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
@@ -0,0 +1,46 @@
+"""
+Panorama tile pyramid value object
+"""
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class PanoramaTiles:
+    """Value object for the multi-resolution cube tiles of a panorama"""
+    source: str
+    base_path: str
+    cube_resolution: int
+    max_level: int
+    tile_resolution: int = 512
+    extension: str = "jpg"
+
+    def multires(self) -> Dict[str, Any]:
+        """multiRes configuration expected by pannellum (type "multires")"""
+        return {
+            'basePath': self.base_path,
+            'path': '/%l/%s%y_%x',
+            'fallbackPath': '/fallback/%s',
+            'extension': self.extension,
+            'tileResolution': self.tile_resolution,
+            'maxLevel': self.max_level,
+            'cubeResolution': self.cube_resolution
+        }
+
+    def matches(self, url: Optional[str]) -> bool:
+        """Whether these tiles were cut from the given panorama"""
+        return bool(url) and url == self.source
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> Optional['PanoramaTiles']:
+        """Parse the stored JSON, returning None when missing or invalid"""
+        if not raw:
+            return None
+        try:
+            return cls(**json.loads(raw))
+        except (ValueError, TypeError):
+            return None
@@ -1,11 +1,15 @@
 """
 Room domain entity
 """
-from typing import Optional, Dict, Any
+import json
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from dataclasses import dataclass
 
 from ..shared.base_entity import Entity
+from .image_variants import ImageVariants
+from .image_metadata import ImageMetadata
+from .panorama_tiles import PanoramaTiles
 
 
 @dataclass
@@ -42,7 +46,10 @@ class Room(Entity):
         has_audio: bool = False,
         has_interactive: bool = False,
         id: Optional[int] = None,
-        created_at: Optional[datetime] = None
+        created_at: Optional[datetime] = None,
+        panorama_variants: Optional[ImageVariants] = None,
+        panorama_tiles: Optional[PanoramaTiles] = None,
+        panorama_metadata: Optional[ImageMetadata] = None
     ):
         super().__init__(id, created_at)
         self._name = name
@@ -53,6 +60,9 @@ class Room(Entity):
         self._hotspots = hotspots or "[]"
         self._has_audio = has_audio
         self._has_interactive = has_interactive
+        self._panorama_variants = panorama_variants
+        self._panorama_tiles = panorama_tiles
+        self._panorama_metadata = panorama_metadata
         self._validate()
     
     @property
@@ -75,10 +85,57 @@ class Room(Entity):
     def panorama_url(self) -> Optional[str]:
         return self._panorama_url
     
+    @property
+    def panorama_srcset(self) -> Optional[Dict[str, str]]:
+        """srcset values per format (webp, jpeg) for the current panorama"""
+        if self._panorama_variants and self._panorama_variants.matches(self._panorama_url):
+            return self._panorama_variants.srcset()
+        return None
+    
+    @property
+    def panorama_multires(self) -> Optional[Dict[str, Any]]:
+        """pannellum multiRes configuration for the current panorama, once its tiles are cut"""
+        if self._panorama_tiles and self._panorama_tiles.matches(self._panorama_url):
+            return self._panorama_tiles.multires()
+        return None
+    
+    @property
+    def panorama_metadata(self) -> Optional[Dict[str, Any]]:
+        """Size, blurhash and dominant color of the current panorama, once extracted"""
+        return self._panorama_metadata.to_dict() if self._panorama_metadata else None
+    
     @property
     def hotspots(self) -> str:
         return self._hotspots
     
+    @property
+    def hotspot_list(self) -> List[Dict[str, Any]]:
+        """Parsed hotspots (objects only, [] when the JSON is invalid), artwork_id as an int when valid"""
+        try:
+            hotspots = json.loads(self._hotspots or "[]")
+        except (ValueError, TypeError):
+            return []
+        
+        result = []
+        for hotspot in hotspots if isinstance(hotspots, list) else []:
+            if not isinstance(hotspot, dict):
+                continue
+            hotspot = dict(hotspot)
+            if 'artwork_id' in hotspot:
+                try:
+                    hotspot['artwork_id'] = int(hotspot['artwork_id'])
+                except (TypeError, ValueError):
+                    pass
+            result.append(hotspot)
+        return result
+    
+    @property
+    def hotspot_artwork_ids(self) -> List[int]:
+        """IDs of the artworks pointed at by the hotspots, without duplicates"""
+        return list(dict.fromkeys(
+            hotspot['artwork_id'] for hotspot in self.hotspot_list if isinstance(hotspot.get('artwork_id'), int)
+        ))
+    
     @property
     def has_audio(self) -> bool:
         return self._has_audio
@@ -177,6 +234,9 @@ class Room(Entity):
             'theme': self.theme,
             'accessibility_level': self.accessibility_level,
             'panorama_url': self.panorama_url,
+            'panorama_srcset': self.panorama_srcset,
+            'panorama_multires': self.panorama_multires,
+            'panorama_metadata': self.panorama_metadata,
             'hotspots': self.hotspots,
             'has_audio': self.has_audio,
             'has_interactive': self.has_interactive,
@@ -2,13 +2,32 @@
 Repository interfaces for data access
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Sequence, Tuple
 
 from ..entities.user import User
 from ..entities.room import Room  
 from ..entities.artwork import Artwork
 
 
+# Champs filtrables de la recherche d'œuvres, comptés par facette
+FACET_FIELDS = ('category', 'period', 'origin', 'room_id')
+# Filtres de la recherche : facettes et présence d'un média
+FILTER_FIELDS = FACET_FIELDS + ('has_audio', 'has_video')
+
+# Représentation complète d'une œuvre dans les listes (description dans la langue demandée)
+ARTWORK_FIELDS = (
+    'id', 'title', 'description', 'category', 'period', 'origin', 'room_id', 'room_name',
+    'image_url', 'image_srcset', 'image_metadata', 'thumbnail_url', 'audio_url', 'video_url',
+    'qr_code_url', 'popularity', 'view_count', 'created_at'
+)
+# Champs sélectionnables par ?fields= (les trois descriptions servent à l'administration)
+ARTWORK_PROJECTION_FIELDS = ARTWORK_FIELDS + ('description_fr', 'description_en', 'description_wo')
+# Représentation compacte des grilles (?view=summary)
+ARTWORK_SUMMARY_FIELDS = ('id', 'title', 'thumbnail_url', 'room_id', 'room_name')
+# Ordres possibles des listes projetées
+ARTWORK_LIST_ORDERS = ('title', 'popularity', 'newest')
+
+
 class UserRepository(ABC):
     """Abstract repository interface for User entities"""
     
@@ -70,6 +89,13 @@ class RoomRepository(ABC):
     def search(self, criteria: Dict[str, Any]) -> List[Room]:
         """Search rooms by criteria"""
         pass
+    
+    @abstractmethod
+    def get_with_artworks(self, room_id: int, fields: Sequence[str], language: str = 'fr',
+                          room_artworks: bool = True, hotspot_artworks: bool = False
+                          ) -> Optional[Tuple[Room, List[Dict[str, Any]], Dict[int, Dict[str, Any]]]]:
+        """Get a room with the given fields of its artworks and of its hotspot artworks (by ID)"""
+        pass
 
 
 class ArtworkRepository(ABC):
@@ -115,6 +141,39 @@ class ArtworkRepository(ABC):
         """Search artworks by criteria"""
         pass
     
+    @abstractmethod
+    def get_by_ids(self, artwork_ids: List[int]) -> List[Artwork]:
+        """Get artworks by ID, in the order of the given IDs"""
+        pass
+    
+    @abstractmethod
+    def catalog_version(self) -> int:
+        """Version of the catalog, changed by every write that can change search results"""
+        pass
+    
+    @abstractmethod
+    def get_similar(self, artwork_id: int, limit: int) -> List[Tuple[Artwork, float]]:
+        """Get the precomputed most similar artworks with their similarity score"""
+        pass
+    
+    @abstractmethod
+    def facet_counts(self, criteria: Dict[str, Any], facets) -> Dict[str, Dict[Any, int]]:
+        """Count the artworks matching the criteria per value of each facet"""
+        pass
+    
+    @abstractmethod
+    def get_projected(self, fields: Sequence[str], language: str = 'fr', criteria: Optional[Dict[str, Any]] = None,
+                      order: str = 'title', limit: Optional[int] = None,
+                      ids: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Get only the given fields (ARTWORK_PROJECTION_FIELDS) of the matching artworks, as dicts"""
+        pass
+    
+    @abstractmethod
+    def iter_projected(self, fields: Sequence[str], language: str = 'fr', criteria: Optional[Dict[str, Any]] = None,
+                       order: str = 'newest', batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stream the given fields of the matching artworks without loading them all at once"""
+        pass
+    
     @abstractmethod
     def increment_view_count(self, artwork_id: int) -> bool:
         """Increment view count for artwork"""
@@ -4,12 +4,117 @@ QR Code generation service for artworks
 import qrcode
 from io import BytesIO
 import base64
-from typing import Optional
+from typing import Optional, List
 
 
 class QRCodeService:
     """Domain service for generating QR codes for artworks"""
     
+    @staticmethod
+    def build_artwork_url(base_url: str, artwork_id: int) -> str:
+        """Build the URL encoded in the QR code of an artwork"""
+        return f"{base_url.rstrip('/')}/api/artworks/{artwork_id}"
+    
+    @staticmethod
+    def build_room_url(base_url: str, room_id: int) -> str:
+        """Build the URL encoded in the QR code of a room"""
+        return f"{base_url.rstrip('/')}/api/rooms/{room_id}"
+    
+    @staticmethod
+    def build_short_url(base_url: str, code: str) -> str:
+        """Build the short redirect URL encoded in QR codes"""
+        return f"{base_url.rstrip('/')}/q/{code}"
+    
+    @staticmethod
+    def build_frontend_url(frontend_url: str, target_type: str, target_id: int) -> str:
+        """Build the frontend page URL a scanned short code redirects to"""
+        routes = {'artwork': 'artworks', 'room': 'rooms'}
+        if target_type not in routes:
+            raise ValueError(f"Unknown QR code target: {target_type}")
+        return f"{frontend_url.rstrip('/')}/{routes[target_type]}/{target_id}"
+    
+    @staticmethod
+    def build_matrix(data: str, border: int = 4) -> List[List[bool]]:
+        """
+        Encode data into a QR module matrix (quiet zone included)
+        
+        Args:
+            data: Text or URL to encode
+            border: Quiet zone width in modules
+            
+        Returns:
+            Square matrix of booleans, True for dark modules
+        """
+        if not data:
+            raise ValueError("QR code data is required")
+        
+        qr = qrcode.QRCode(border=border)
+        qr.add_data(data)
+        qr.make(fit=True)
+        return qr.get_matrix()
+    
+    @staticmethod
+    def render_svg(data: str, size: int = 300) -> bytes:
+        """
+        Render a QR code as a standalone SVG document (no imaging library needed)
+        
+        Args:
+            data: Text or URL to encode
+            size: Width and height of the SVG in pixels
+            
+        Returns:
+            UTF-8 encoded SVG document
+        """
+        matrix = QRCodeService.build_matrix(data)
+        modules = len(matrix)
+        
+        # Un segment horizontal par suite de modules noirs
+        segments = []
+        for y, row in enumerate(matrix):
+            x = 0
+            while x < modules:
+                if row[x]:
+                    start = x
+                    while x < modules and row[x]:
+                        x += 1
+                    segments.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+                else:
+                    x += 1
+        
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+            f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+            f'<rect width="{modules}" height="{modules}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(segments)}"/></svg>'
+        )
+        return svg.encode('utf-8')
+    
+    @staticmethod
+    def render_png(data: str, size: int = 300) -> bytes:
+        """
+        Render a QR code as a PNG image
+        
+        Args:
+            data: Text or URL to encode
+            size: Approximate width and height in pixels (modules stay whole pixels)
+            
+        Returns:
+            PNG bytes
+        """
+        from PIL import Image
+        
+        matrix = QRCodeService.build_matrix(data)
+        modules = len(matrix)
+        box_size = max(1, size // modules)
+        
+        pixels = bytes(0 if dark else 255 for row in matrix for dark in row)
+        img = Image.frombytes('L', (modules, modules), pixels)
+        img = img.resize((modules * box_size, modules * box_size), Image.NEAREST).convert('1')
+        
+        buffer = BytesIO()
+        img.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+    
     @staticmethod
     def generate_qr_code_for_artwork(artwork_id: int, frontend_url: str) -> str:
         """
@@ -29,7 +134,7 @@ class QRCodeService:
             raise ValueError("Frontend URL is required")
         
         # Create URL pointing to frontend artwork detail page
-        artwork_url = f"{frontend_url.rstrip('/')}/artwork/{artwork_id}"
+        artwork_url = QRCodeService.build_frontend_url(frontend_url, 'artwork', artwork_id)
         
         # Generate QR code
         qr = qrcode.QRCode(
@@ -1,4 +1,16 @@
 # Infrastructure layer - External concerns (database, file system, etc.)
 from .repositories import SQLiteUserRepository, SQLiteRoomRepository, SQLiteArtworkRepository
+from .qr import QRCodeRegenerationService, OnDemandQRCodeRenderer, QRSheetRenderer, ShortLinkService
+from .cache import DiskLRUCache
+from .media import (
+    ChunkedUploadService, MediaBlobStore, ImageDerivativeService, PanoramaTileService, OnDemandImageResizer,
+    MediaGarbageCollector, ImageMetadataService
+)
+from .search import SuggestionIndex, TrigramIndex, ArtworkFilterIndex, SimilarArtworksService, SearchAnalytics
 
-__all__ = ['SQLiteUserRepository', 'SQLiteRoomRepository', 'SQLiteArtworkRepository']
\ No newline at end of file
+__all__ = ['SQLiteUserRepository', 'SQLiteRoomRepository', 'SQLiteArtworkRepository',
+           'QRCodeRegenerationService', 'OnDemandQRCodeRenderer', 'QRSheetRenderer', 'ShortLinkService',
+           'DiskLRUCache', 'ChunkedUploadService', 'MediaBlobStore', 'ImageDerivativeService',
+           'PanoramaTileService', 'OnDemandImageResizer',
+           'MediaGarbageCollector', 'ImageMetadataService', 'SuggestionIndex',
+           'TrigramIndex', 'ArtworkFilterIndex', 'SimilarArtworksService', 'SearchAnalytics']
\ No newline at end of file
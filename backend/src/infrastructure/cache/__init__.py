@@ -0,0 +1,6 @@
+# Cache implementations
+from .disk_lru_cache import DiskLRUCache
+from .single_flight import SingleFlight
+from .search_cache import SearchResultCache
+
+__all__ = ['DiskLRUCache', 'SingleFlight', 'SearchResultCache']
@@ -0,0 +1,125 @@
+"""
+Size-bounded on-disk cache with least-recently-used eviction
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class DiskLRUCache:
+    """
+    Stores rendered artefacts as files in one directory
+
+    An in-memory index ordered by last access tracks file sizes, so lookups
+    and evictions never list the directory. The index is rebuilt from file
+    modification times when the process starts, and hits refresh the
+    modification time so the order survives restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        if max_bytes <= 0:
+            raise ValueError("Cache size must be positive")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from the files already on disk"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def filename_for(key: str, extension: str) -> str:
+        """Cache file name of a key"""
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:40]
+        return f"{digest}.{extension.lstrip('.')}"
+
+    def get(self, key: str, extension: str) -> Optional[str]:
+        """Return the path of a cached entry, or None on a miss"""
+        name = self.filename_for(key, extension)
+        path = os.path.join(self.directory, name)
+
+        with self._lock:
+            if name not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(name)
+
+        try:
+            os.utime(path)
+        except OSError:
+            # Fichier supprimé derrière notre dos
+            with self._lock:
+                size = self._index.pop(name, None)
+                if size is not None:
+                    self._total_bytes -= size
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key: str, extension: str, data: bytes) -> str:
+        """Store an entry atomically and return its path"""
+        name = self.filename_for(key, extension)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            previous = self._index.pop(name, None)
+            if previous is not None:
+                self._total_bytes -= previous
+            self._index[name] = len(data)
+            self._total_bytes += len(data)
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used entries until the cache fits (lock held)"""
+        while self._total_bytes > self.max_bytes and self._index:
+            name, size = next(iter(self._index.items()))
+            if name == keep:
+                break
+            del self._index[name]
+            self._total_bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Cache occupancy and hit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,93 @@
+"""
+In-memory cache of artwork search results, keyed on normalized criteria
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..search.text import normalize_text
+
+
+class SearchResultCache:
+    """
+    Remembers the ordered artwork IDs matched by recent searches
+
+    Only IDs are kept, so the payloads are always read fresh; what can go
+    stale is the match itself, which depends on the catalog. Entries carry
+    no TTL: every lookup passes the current catalog version (bumped by the
+    database on each artwork write) and a new version drops the whole cache.
+
+    Keys ignore case, accents and punctuation of the text query (the search
+    itself does) and the order of filter values; filter values themselves
+    are kept as given since the filters match them exactly.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        if max_entries <= 0:
+            raise ValueError("Cache size must be positive")
+
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, List[int]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(criteria: Dict[str, Any]) -> Tuple:
+        """Normalized, order-independent key of repository search criteria"""
+        key = []
+        for field, value in sorted(criteria.items()):
+            if field == 'search_text':
+                value = normalize_text(value)
+            elif isinstance(value, (list, tuple, set)):
+                value = tuple(sorted(set(value), key=str))
+            key.append((field, value))
+        return tuple(key)
+
+    def _current(self, version: int) -> bool:
+        """Move to a newer catalog version; False for a lookup made at an older one"""
+        if self._version is None or version > self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+        return version == self._version
+
+    def get(self, criteria: Dict[str, Any], version: int) -> Optional[List[int]]:
+        """Cached IDs of a search at a catalog version, or None on a miss"""
+        key = self.key_for(criteria)
+        with self._lock:
+            ids = self._entries.get(key) if self._current(version) else None
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def put(self, criteria: Dict[str, Any], version: int, ids: List[int]) -> None:
+        """Store the IDs matched by a search at a catalog version"""
+        key = self.key_for(criteria)
+        with self._lock:
+            if not self._current(version):
+                return
+            self._entries[key] = list(ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Cache occupancy and hit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'catalog_version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+            }
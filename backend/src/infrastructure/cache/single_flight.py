@@ -0,0 +1,59 @@
+"""
+Request coalescing: concurrent calls for the same key share one computation
+"""
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class _Call:
+    """A computation in progress and the callers waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time
+
+    The first caller for a key computes the value; callers arriving while it
+    runs wait and receive the same result (or exception). Nothing is kept
+    once the computation finishes, so results should be cached elsewhere.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns:
+            Tuple of (result, shared) where shared is True for the waiting callers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
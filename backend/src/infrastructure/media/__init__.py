@@ -0,0 +1,31 @@
+"""
+Media storage infrastructure
+"""
+from .blob_store import MediaBlobStore, MediaBlob
+from .derivatives import ImageDerivativeService, render_derivatives
+from .panorama_tiles import PanoramaTileService, render_cube_face
+from .image_resizer import OnDemandImageResizer, resize_image
+from .image_metadata import ImageMetadataService, extract_image_metadata, blurhash_encode
+from .garbage_collector import MediaGarbageCollector, SweepReport
+from .layout_migration import MediaLayoutMigration, LayoutMigrationReport
+from .sharding import shard_prefix, sharded_name
+from .precompress import precompress_file, precompress_tree, precompressed_variant, PrecompressReport
+from .workers import media_pool, submit_media_job, shutdown_media_pool
+from .chunked_uploads import ChunkedUploadService, UploadSession, UploadNotFound, UploadOffsetMismatch
+from .upload_validation import (
+    UploadTooLarge, UnsupportedMediaType, UPLOAD_LIMITS, sniff_media_type, upload_limit
+)
+
+__all__ = [
+    'MediaBlobStore', 'MediaBlob',
+    'ImageDerivativeService', 'render_derivatives',
+    'PanoramaTileService', 'render_cube_face',
+    'OnDemandImageResizer', 'resize_image',
+    'ImageMetadataService', 'extract_image_metadata', 'blurhash_encode',
+    'MediaGarbageCollector', 'SweepReport',
+    'MediaLayoutMigration', 'LayoutMigrationReport', 'shard_prefix', 'sharded_name',
+    'precompress_file', 'precompress_tree', 'precompressed_variant', 'PrecompressReport',
+    'media_pool', 'submit_media_job', 'shutdown_media_pool',
+    'ChunkedUploadService', 'UploadSession', 'UploadNotFound', 'UploadOffsetMismatch',
+    'UploadTooLarge', 'UnsupportedMediaType', 'UPLOAD_LIMITS', 'sniff_media_type', 'upload_limit'
+]
@@ -0,0 +1,254 @@
+"""
+Content-addressed media store: identical files are stored once and reference counted
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from .derivatives import derivative_files
+from .panorama_tiles import tile_directory
+from .precompress import precompressed_siblings
+from .sharding import sharded_name
+
+
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# Colonnes qui référencent un fichier média (utilisées pour les fichiers d'avant le store)
+MEDIA_URL_COLUMNS = (
+    ('artworks', 'image_url'),
+    ('artworks', 'audio_url'),
+    ('artworks', 'video_url'),
+    ('rooms', 'panorama_url'),
+)
+
+
+@dataclass
+class MediaBlob:
+    """A stored file, shared by every record that uploaded the same bytes"""
+    sha256: str
+    url: str
+    size: int
+    ref_count: int
+    deduplicated: bool = False
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'sha256': self.sha256,
+            'url': self.url,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'deduplicated': self.deduplicated
+        }
+
+
+class MediaBlobStore:
+    """
+    Stores uploads under their SHA-256 and counts the records using them
+
+    The digest is computed while the upload is streamed to a temporary file.
+    If a blob with the same digest exists, the temporary file is dropped and
+    the existing path is shared; otherwise the file is moved into its static
+    folder as ab/cd/<sha256><ext>. Each record pointing at a blob holds one
+    reference, and the file is deleted when the last one is released.
+    """
+
+    def __init__(self, db_path: str, destinations: Dict[str, Tuple[str, str]], tmp_folder: str):
+        """
+        Args:
+            db_path: SQLite database holding the media_blobs table
+            destinations: kind -> (folder, public url prefix)
+            tmp_folder: Folder of files being received (same filesystem as the static folders)
+        """
+        self.db_path = db_path
+        self.destinations = destinations
+        self.tmp_folder = tmp_folder
+
+        os.makedirs(tmp_folder, exist_ok=True)
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS media_blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    size INTEGER NOT NULL,
+                    ref_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+
+    @staticmethod
+    def _row_to_blob(row: sqlite3.Row, deduplicated: bool = False) -> MediaBlob:
+        return MediaBlob(row['sha256'], row['url'], row['size'], row['ref_count'], deduplicated)
+
+    def find(self, sha256: str) -> Optional[MediaBlob]:
+        """Blob with this digest, if stored"""
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT * FROM media_blobs WHERE sha256 = ?", (sha256.lower(),)).fetchone()
+        if row and os.path.exists(row['url'].lstrip('/')):
+            return self._row_to_blob(row)
+        return None
+
+    def acquire(self, sha256: str) -> Optional[MediaBlob]:
+        """Take one more reference on an existing blob (None if it is not stored)"""
+        with self._get_connection() as conn:
+            conn.execute("UPDATE media_blobs SET ref_count = ref_count + 1 WHERE sha256 = ?", (sha256.lower(),))
+            row = conn.execute("SELECT * FROM media_blobs WHERE sha256 = ?", (sha256.lower(),)).fetchone()
+            conn.commit()
+        if row:
+            self._touch(row['url'])
+        return self._row_to_blob(row, deduplicated=True) if row else None
+
+    @staticmethod
+    def _touch(url: str) -> None:
+        """Mark a blob as just used, so the orphan sweep leaves it alone until it is attached"""
+        try:
+            os.utime(url.lstrip('/'))
+        except OSError:
+            pass
+
+    def put_stream(self, stream: BinaryIO, kind: str, filename: str) -> MediaBlob:
+        """Store an uploaded stream, hashing it on the way, and take a reference on it"""
+        if kind not in self.destinations:
+            raise ValueError(f"Unsupported media kind: {kind}")
+
+        tmp_path = os.path.join(self.tmp_folder, f"blob_{os.getpid()}_{threading.get_ident()}_{time.time_ns()}.tmp")
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for block in iter(lambda: stream.read(STREAM_BLOCK_SIZE), b''):
+                    hasher.update(block)
+                    f.write(block)
+                    size += len(block)
+            return self.put_file(tmp_path, kind, filename, hasher.hexdigest(), size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_file(self, path: str, kind: str, filename: str, sha256: str, size: Optional[int] = None) -> MediaBlob:
+        """
+        Adopt a fully received file whose digest is known, and take a reference on it
+
+        The file is moved into place, or removed if the same content is already stored.
+        """
+        if kind not in self.destinations:
+            raise ValueError(f"Unsupported media kind: {kind}")
+        sha256 = sha256.lower()
+        if size is None:
+            size = os.path.getsize(path)
+
+        folder, url_prefix = self.destinations[kind]
+        extension = os.path.splitext(secure_filename(filename or ''))[1].lower()
+        blob_name = sharded_name(f"{sha256}{extension}")
+
+        conn = self._get_connection()
+        try:
+            # Verrou d'écriture : deux uploads identiques simultanés ne créent qu'un blob
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM media_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if row and os.path.exists(row['url'].lstrip('/')):
+                conn.execute("UPDATE media_blobs SET ref_count = ref_count + 1 WHERE sha256 = ?", (sha256,))
+                conn.commit()
+                self._touch(row['url'])
+                os.remove(path)
+                return MediaBlob(sha256, row['url'], row['size'], row['ref_count'] + 1, deduplicated=True)
+
+            destination = os.path.join(folder, blob_name)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(path, destination)
+            url = f"{url_prefix}/{blob_name}"
+            # Ligne orpheline (fichier disparu) : on la remplace
+            conn.execute("DELETE FROM media_blobs WHERE sha256 = ? OR url = ?", (sha256, url))
+            conn.execute(
+                "INSERT INTO media_blobs (sha256, url, size, ref_count) VALUES (?, ?, ?, 1)",
+                (sha256, url, size)
+            )
+            conn.commit()
+            return MediaBlob(sha256, url, size, 1)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def release(self, url: Optional[str]) -> bool:
+        """
+        Drop one reference on the file behind a url
+
+        Files stored before the blob store existed are not counted; they are
+        deleted only once no artwork or room points at them any more.
+
+        Returns:
+            True if the file was deleted
+        """
+        if not url or not url.startswith('/static/'):
+            return False
+
+        conn = self._get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT sha256, ref_count FROM media_blobs WHERE url = ?", (url,)).fetchone()
+            if row:
+                if row['ref_count'] > 1:
+                    conn.execute("UPDATE media_blobs SET ref_count = ref_count - 1 WHERE sha256 = ?", (row['sha256'],))
+                    conn.commit()
+                    return False
+                conn.execute("DELETE FROM media_blobs WHERE sha256 = ?", (row['sha256'],))
+            elif self._count_references(conn, url) > 0:
+                conn.commit()
+                return False
+            conn.commit()
+        finally:
+            conn.close()
+
+        path = url.lstrip('/')
+        for derivative in derivative_files(path) + precompressed_siblings(path):
+            try:
+                os.remove(derivative)
+            except OSError:
+                pass
+        shutil.rmtree(tile_directory(path), ignore_errors=True)
+        try:
+            os.remove(path)
+            print(f"DEBUG: Deleted media file: {path}")
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _count_references(conn: sqlite3.Connection, url: str) -> int:
+        return sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} = ?", (url,)).fetchone()[0]
+            for table, column in MEDIA_URL_COLUMNS
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Stored bytes versus bytes the references would take without deduplication"""
+        with self._get_connection() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS stored_bytes,
+                       COALESCE(SUM(size * ref_count), 0) AS referenced_bytes
+                FROM media_blobs
+            """).fetchone()
+        return {
+            'blobs': row['blobs'],
+            'stored_bytes': row['stored_bytes'],
+            'referenced_bytes': row['referenced_bytes'],
+            'saved_bytes': row['referenced_bytes'] - row['stored_bytes']
+        }
@@ -0,0 +1,393 @@
+"""
+Resumable chunked uploads for large media files (videos, panoramas)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from .blob_store import MediaBlobStore
+from .upload_validation import SNIFF_BYTES, UploadTooLarge, sniff_media_type, upload_limit
+
+
+# Taille des blocs lus dans le corps de la requête : la mémoire reste constante
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# Taille de morceau conseillée au client
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Sessions jamais rattachées (inachevées ou terminées) supprimées après ce délai
+STALE_UPLOAD_SECONDS = 24 * 3600
+
+# Colonne mise à jour quand un upload est rattaché à une œuvre ou une salle
+ATTACH_COLUMNS = {
+    ('artwork', 'image'): ('artworks', 'image_url'),
+    ('artwork', 'audio'): ('artworks', 'audio_url'),
+    ('artwork', 'video'): ('artworks', 'video_url'),
+    ('room', 'panorama'): ('rooms', 'panorama_url'),
+}
+
+
+class UploadNotFound(LookupError):
+    """Unknown or expired upload session"""
+
+
+class UploadOffsetMismatch(ValueError):
+    """A chunk does not start where the previous one ended"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Chunk must start at offset {offset}")
+        self.offset = offset
+
+
+@dataclass
+class UploadSession:
+    """State of a resumable upload"""
+    id: str
+    kind: str
+    filename: str
+    total_size: int
+    sha256: Optional[str]
+    offset: int
+    created_at: float
+    completed_url: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'upload_id': self.id,
+            'kind': self.kind,
+            'filename': self.filename,
+            'size': self.total_size,
+            'offset': self.offset,
+            'complete': self.completed_url is not None,
+            'url': self.completed_url,
+            'chunk_size': DEFAULT_CHUNK_SIZE
+        }
+
+
+class ChunkedUploadService:
+    """
+    init -> PUT chunk at offset -> complete
+
+    Chunks are appended to a .part file in a temporary folder; the offset of
+    a session is the size of that file, so an interrupted client asks for it
+    and resumes where the server actually stopped. The SHA-256 is updated as
+    chunks arrive and checked on completion, then the file is handed to the
+    media blob store (the temporary folder must be on the same filesystem as
+    the static folders). When the client announces a checksum the store
+    already holds, the session is complete as soon as it is opened.
+    """
+
+    def __init__(self, db_path: str, tmp_folder: str, blob_store: MediaBlobStore, max_size: int):
+        """
+        Args:
+            db_path: SQLite database holding the sessions
+            tmp_folder: Folder of the partial files
+            blob_store: Store receiving completed files
+            max_size: Largest accepted upload in bytes
+        """
+        self.db_path = db_path
+        self.tmp_folder = tmp_folder
+        self.blob_store = blob_store
+        self.max_size = max_size
+
+        # Hash incrémental par session tant que les morceaux arrivent dans l'ordre
+        self._hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        os.makedirs(tmp_folder, exist_ok=True)
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_sessions (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL, -- "image", "audio", "video" ou "panorama"
+                    filename TEXT NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    sha256 TEXT,
+                    created_at REAL NOT NULL,
+                    completed_url TEXT,
+                    attached INTEGER DEFAULT 0
+                )
+            """)
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(upload_sessions)")]
+            if 'attached' not in columns:
+                conn.execute("ALTER TABLE upload_sessions ADD COLUMN attached INTEGER DEFAULT 0")
+            conn.commit()
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.tmp_folder, f"{upload_id}.part")
+
+    def _lock_for(self, upload_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def create(self, kind: str, filename: str, total_size: int, sha256: Optional[str] = None) -> UploadSession:
+        """Open an upload session"""
+        if kind not in self.blob_store.destinations:
+            raise ValueError(f"Unsupported upload kind: {kind}")
+        filename = secure_filename(filename or '')
+        if not filename:
+            raise ValueError("A file name is required")
+        if not isinstance(total_size, int) or total_size <= 0:
+            raise ValueError("The file size must be a positive integer")
+        max_size = min(self.max_size, upload_limit(kind))
+        if total_size > max_size:
+            raise UploadTooLarge(f"{kind.capitalize()} files are limited to {max_size} bytes")
+        if sha256 is not None:
+            sha256 = sha256.lower()
+            if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+                raise ValueError("Invalid sha256 checksum")
+
+        self.purge_stale()
+
+        session = UploadSession(uuid.uuid4().hex, kind, filename, total_size, sha256, 0, time.time())
+
+        # Contenu déjà stocké : rien à envoyer
+        existing = self.blob_store.find(sha256) if sha256 else None
+        if existing and existing.size == total_size:
+            blob = self.blob_store.acquire(sha256)
+            if blob:
+                session.offset = total_size
+                session.completed_url = blob.url
+        if not session.completed_url:
+            open(self._part_path(session.id), 'wb').close()
+            self._hashers[session.id] = (0, hashlib.sha256())
+
+        with self._get_connection() as conn:
+            conn.execute(
+                "INSERT INTO upload_sessions (id, kind, filename, total_size, sha256, created_at, completed_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session.id, kind, filename, total_size, sha256, session.created_at, session.completed_url)
+            )
+            conn.commit()
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        """Current state of a session; the offset is read from the partial file"""
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT * FROM upload_sessions WHERE id = ?", (upload_id,)).fetchone()
+        if not row:
+            raise UploadNotFound(upload_id)
+
+        if row['completed_url']:
+            offset = row['total_size']
+        else:
+            try:
+                offset = os.path.getsize(self._part_path(upload_id))
+            except OSError:
+                raise UploadNotFound(upload_id)
+
+        return UploadSession(row['id'], row['kind'], row['filename'], row['total_size'], row['sha256'],
+                             offset, row['created_at'], row['completed_url'])
+
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO, length: Optional[int] = None) -> int:
+        """
+        Append a chunk read from a stream
+
+        Args:
+            upload_id: Session id
+            offset: Position of the first byte of the chunk
+            stream: Request body
+            length: Announced chunk length, if known
+
+        Returns:
+            New offset
+        """
+        with self._lock_for(upload_id):
+            session = self.get(upload_id)
+            if session.completed_url:
+                raise ValueError("Upload already completed")
+            if offset != session.offset:
+                raise UploadOffsetMismatch(session.offset)
+            if length is not None and offset + length > session.total_size:
+                raise UploadTooLarge("Chunk goes past the declared file size")
+
+            hashed_offset, hasher = self._hashers.get(upload_id, (-1, None))
+            if hashed_offset != offset:
+                # Reprise après redémarrage : le hash sera recalculé à la fin
+                hasher = None
+
+            head = b''
+            if offset == 0:
+                # Premier morceau : vérifier le format avant d'écrire quoi que ce soit
+                while len(head) < SNIFF_BYTES:
+                    block = stream.read(SNIFF_BYTES - len(head))
+                    if not block:
+                        break
+                    head += block
+                if head:
+                    sniff_media_type(head, session.kind)
+
+            written = 0
+            path = self._part_path(upload_id)
+            with open(path, 'r+b') as f:
+                f.seek(offset)
+                try:
+                    while True:
+                        block, head = head or stream.read(STREAM_BLOCK_SIZE), b''
+                        if not block:
+                            break
+                        if offset + written + len(block) > session.total_size:
+                            raise UploadTooLarge("Chunk goes past the declared file size")
+                        f.write(block)
+                        if hasher is not None:
+                            hasher.update(block)
+                        written += len(block)
+                finally:
+                    # Ne garder que les octets réellement reçus (connexion coupée, chunk refusé)
+                    f.truncate(offset + written)
+
+            new_offset = offset + written
+            if hasher is not None:
+                self._hashers[upload_id] = (new_offset, hasher)
+            else:
+                self._hashers.pop(upload_id, None)
+            return new_offset
+
+    def _file_digest(self, upload_id: str, size: int) -> str:
+        hashed_offset, hasher = self._hashers.pop(upload_id, (-1, None))
+        if hasher is not None and hashed_offset == size:
+            return hasher.hexdigest()
+
+        hasher = hashlib.sha256()
+        with open(self._part_path(upload_id), 'rb') as f:
+            for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def complete(self, upload_id: str, sha256: Optional[str] = None) -> UploadSession:
+        """
+        Verify the received file and hand it to the blob store
+
+        The completed upload holds one reference on the blob; attaching it
+        to a record hands that reference over.
+
+        Returns:
+            Session with its public url
+        """
+        with self._lock_for(upload_id):
+            session = self.get(upload_id)
+            if session.completed_url:
+                return session
+            if session.offset != session.total_size:
+                raise ValueError(f"Upload incomplete: {session.offset}/{session.total_size} bytes received")
+
+            digest = self._file_digest(upload_id, session.total_size)
+            expected = (sha256 or session.sha256 or '').lower()
+            if expected and expected != digest:
+                # Fichier corrompu : on repart de zéro
+                open(self._part_path(upload_id), 'wb').close()
+                self._hashers[upload_id] = (0, hashlib.sha256())
+                raise ValueError("Checksum mismatch, the upload was reset")
+
+            blob = self.blob_store.put_file(
+                self._part_path(upload_id), session.kind, session.filename, digest, session.total_size
+            )
+
+            session.completed_url = blob.url
+            session.sha256 = digest
+            with self._get_connection() as conn:
+                conn.execute(
+                    "UPDATE upload_sessions SET completed_url = ?, sha256 = ? WHERE id = ?",
+                    (session.completed_url, digest, upload_id)
+                )
+                conn.commit()
+
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+        return session
+
+    def attach(self, upload_id: str, target_type: str, target_id: int) -> Tuple[str, Optional[str]]:
+        """
+        Point an artwork or room at a completed upload
+
+        An upload is attached once: its blob reference goes to that record.
+
+        Returns:
+            (new url, previous url)
+        """
+        session = self.get(upload_id)
+        if not session.completed_url:
+            raise ValueError("Upload not completed")
+        column = ATTACH_COLUMNS.get((target_type, session.kind))
+        if column is None:
+            raise ValueError(f"A {session.kind} upload cannot be attached to a {target_type}")
+        table, field = column
+
+        with self._get_connection() as conn:
+            row = conn.execute(f"SELECT {field} FROM {table} WHERE id = ?", (target_id,)).fetchone()
+            if not row:
+                raise UploadNotFound(f"{target_type} {target_id}")
+            claimed = conn.execute(
+                "UPDATE upload_sessions SET attached = 1 WHERE id = ? AND attached = 0", (upload_id,)
+            ).rowcount
+            if not claimed:
+                raise ValueError("Upload already attached")
+            conn.execute(f"UPDATE {table} SET {field} = ? WHERE id = ?", (session.completed_url, target_id))
+            conn.commit()
+        return session.completed_url, row[field]
+
+    def abort(self, upload_id: str) -> None:
+        """Drop a session, its partial file and, if it was completed but never attached, its blob reference"""
+        with self._lock_for(upload_id):
+            self.get(upload_id)
+            self._discard(upload_id)
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def _discard(self, upload_id: str) -> None:
+        try:
+            os.remove(self._part_path(upload_id))
+        except OSError:
+            pass
+        self._hashers.pop(upload_id, None)
+
+        conn = self._get_connection()
+        try:
+            # Même verrou que attach() : la référence va soit à l'enregistrement, soit est rendue ici
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT completed_url, attached FROM upload_sessions WHERE id = ?", (upload_id,)
+            ).fetchone()
+            conn.execute("DELETE FROM upload_sessions WHERE id = ?", (upload_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        if row and row['completed_url'] and not row['attached']:
+            self.blob_store.release(row['completed_url'])
+
+    def purge_stale(self, max_age: float = STALE_UPLOAD_SECONDS) -> int:
+        """
+        Remove sessions older than max_age seconds that were never attached
+
+        Unfinished sessions lose their partial file; completed ones give
+        their blob reference back, so the file can be reclaimed. Rows of
+        attached sessions are dropped too (their reference belongs to the
+        record).
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id FROM upload_sessions WHERE created_at < ?", (time.time() - max_age,)
+            ).fetchall()
+        for row in rows:
+            with self._lock_for(row['id']):
+                self._discard(row['id'])
+            with self._locks_guard:
+                self._locks.pop(row['id'], None)
+        return len(rows)
@@ -0,0 +1,239 @@
+"""
+Responsive image derivatives: WebP and JPEG copies of uploaded images at several widths
+"""
+import glob
+import os
+import sqlite3
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from ...domain.entities.image_variants import ImageVariants
+from .workers import submit_media_job
+
+
+# Largeurs générées selon le type d'image
+DERIVATIVE_WIDTHS = {
+    'artwork': (320, 640, 1024, 1600),
+    'room': (640, 1280, 2048, 4096),
+}
+
+# Format Pillow -> (extension, options d'enregistrement)
+DERIVATIVE_FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Colonnes (table, url source, variantes) par type de cible
+VARIANT_COLUMNS = {
+    'artwork': ('artworks', 'image_url', 'image_variants'),
+    'room': ('rooms', 'panorama_url', 'panorama_variants'),
+}
+
+
+def ensure_variant_columns(conn: sqlite3.Connection) -> None:
+    """Add the JSON variant map columns (image_variants, panorama_variants) to older databases"""
+    for table, _, column in VARIANT_COLUMNS.values():
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+
+def derivative_path(source_path: str, width: int, fmt: str) -> str:
+    """Path of a derivative, next to its original"""
+    stem = os.path.splitext(source_path)[0]
+    return f"{stem}_w{width}.{DERIVATIVE_FORMATS[fmt][0]}"
+
+
+def derivative_files(source_path: str) -> List[str]:
+    """Derivatives currently on disk for an original"""
+    stem = glob.escape(os.path.splitext(source_path)[0])
+    files = []
+    for extension, _ in DERIVATIVE_FORMATS.values():
+        files.extend(glob.glob(f"{stem}_w[0-9]*.{extension}"))
+    return files
+
+
+def _flatten_alpha(img):
+    """Composite transparent images on white for JPEG"""
+    from PIL import Image
+
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def render_derivatives(source_path: str, widths: Tuple[int, ...]) -> Dict[str, Dict[int, str]]:
+    """
+    Render the derivatives of one image (runs in a worker process)
+
+    Widths wider than the original are skipped; an image narrower than every
+    width still gets one re-encoded copy at its own width. Derivatives already
+    on disk and newer than the original are kept.
+
+    Returns:
+        format -> width -> derivative path
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = None  # panoramas équirectangulaires de plusieurs centaines de mégapixels
+
+    with Image.open(source_path) as img:
+        source_width, source_height = img.size
+        targets = sorted((w for w in widths if w < source_width), reverse=True) or [source_width]
+
+        source_mtime = os.path.getmtime(source_path)
+        missing = [
+            w for w in targets
+            if any(
+                not os.path.exists(derivative_path(source_path, w, fmt))
+                or os.path.getmtime(derivative_path(source_path, w, fmt)) < source_mtime
+                for fmt in DERIVATIVE_FORMATS
+            )
+        ]
+
+        if missing:
+            # Décodage JPEG réduit directement à la plus grande taille utile
+            largest = missing[0]
+            img.draft('RGB', (largest, max(1, source_height * largest // source_width)))
+            current = ImageOps.exif_transpose(img)
+            has_alpha = current.mode in ('RGBA', 'LA') or (current.mode == 'P' and 'transparency' in current.info)
+            current = current.convert('RGBA' if has_alpha else 'RGB')
+
+            for width in missing:
+                # Chaque taille est réduite depuis la précédente : moins de pixels à filtrer
+                height = max(1, round(current.height * width / current.width))
+                if width < current.width:
+                    current = current.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+                for fmt, (_, options) in DERIVATIVE_FORMATS.items():
+                    path = derivative_path(source_path, width, fmt)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    frame = current if fmt == 'webp' else _flatten_alpha(current)
+                    frame.save(tmp_path, format=fmt.upper(), **options)
+                    os.replace(tmp_path, path)
+
+    return {
+        fmt: {w: derivative_path(source_path, w, fmt) for w in targets}
+        for fmt in DERIVATIVE_FORMATS
+    }
+
+
+class ImageDerivativeService:
+    """
+    Generates responsive derivatives of artwork images and room panoramas
+
+    Rendering runs on the shared media process pool; when it finishes, the
+    variant map is stored as JSON next to the source url (image_variants,
+    panorama_variants) and exposed as srcset values in the API payloads.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            ensure_variant_columns(conn)
+            conn.commit()
+
+    @staticmethod
+    def _source_path(url: str) -> Optional[str]:
+        if not url or not url.startswith('/static/'):
+            return None
+        path = url.lstrip('/')
+        return path if os.path.isfile(path) else None
+
+    @staticmethod
+    def _to_variants(url: str, paths: Dict[str, Dict[int, str]]) -> ImageVariants:
+        url_dir = url.rsplit('/', 1)[0]
+        return ImageVariants(
+            source=url,
+            formats={
+                fmt: {width: f"{url_dir}/{os.path.basename(path)}" for width, path in by_width.items()}
+                for fmt, by_width in paths.items()
+            }
+        )
+
+    def _store(self, target_type: str, target_id: int, variants: ImageVariants) -> None:
+        table, url_column, variants_column = VARIANT_COLUMNS[target_type]
+        with self._get_connection() as conn:
+            # Ne pas écraser si l'image a été remplacée entre-temps
+            conn.execute(
+                f"UPDATE {table} SET {variants_column} = ? WHERE id = ? AND {url_column} = ?",
+                (variants.to_json(), target_id, variants.source)
+            )
+            conn.commit()
+
+    def schedule(self, target_type: str, target_id: int, url: Optional[str]) -> Optional[Future]:
+        """Queue derivative generation for an artwork image or a room panorama"""
+        if target_type not in VARIANT_COLUMNS:
+            raise ValueError(f"Unknown derivative target: {target_type}")
+        source_path = self._source_path(url)
+        if not source_path:
+            return None
+
+        return submit_media_job(
+            render_derivatives, source_path, DERIVATIVE_WIDTHS[target_type],
+            on_done=lambda paths: self._store(target_type, target_id, self._to_variants(url, paths))
+        )
+
+    def generate(self, target_type: str, target_id: int, url: Optional[str]) -> Optional[ImageVariants]:
+        """Generate derivatives in the calling process and store them"""
+        source_path = self._source_path(url)
+        if not source_path:
+            return None
+        variants = self._to_variants(url, render_derivatives(source_path, DERIVATIVE_WIDTHS[target_type]))
+        self._store(target_type, target_id, variants)
+        return variants
+
+    def generate_many(self, targets: List[Tuple[str, int, str]],
+                      workers: Optional[int] = None) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        Generate derivatives for many targets on a dedicated process pool
+
+        Returns:
+            (number generated, errors)
+        """
+        jobs = [(t, self._source_path(t[2])) for t in targets]
+        errors = [{'target': f"{t[0]} {t[1]}", 'error': 'Source file not found'} for t, path in jobs if not path]
+        jobs = [(t, path) for t, path in jobs if path]
+        if not jobs:
+            return 0, errors
+
+        generated = 0
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            futures = {
+                executor.submit(render_derivatives, path, DERIVATIVE_WIDTHS[target[0]]): target
+                for target, path in jobs
+            }
+            for future in as_completed(futures):
+                target_type, target_id, url = futures[future]
+                try:
+                    self._store(target_type, target_id, self._to_variants(url, future.result()))
+                    generated += 1
+                except Exception as e:
+                    errors.append({'target': f"{target_type} {target_id}", 'error': str(e)})
+        return generated, errors
+
+    def pending_targets(self, force: bool = False) -> List[Tuple[str, int, str]]:
+        """Artworks and rooms whose current image has no derivatives yet"""
+        targets = []
+        with self._get_connection() as conn:
+            for target_type, (table, url_column, variants_column) in VARIANT_COLUMNS.items():
+                rows = conn.execute(
+                    f"SELECT id, {url_column} AS url, {variants_column} AS variants FROM {table} "
+                    f"WHERE {url_column} IS NOT NULL"
+                ).fetchall()
+                for row in rows:
+                    variants = ImageVariants.from_json(row['variants'])
+                    if force or not variants or not variants.matches(row['url']):
+                        targets.append((target_type, row['id'], row['url']))
+        return targets
@@ -0,0 +1,447 @@
+"""
+Background media garbage collection: queued deletes and periodic orphan sweeps
+"""
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from .blob_store import MEDIA_URL_COLUMNS, MediaBlobStore
+from .precompress import precompressed_source
+from .sharding import sharded_name
+
+
+# Intervalle de traitement de la file (secondes) et des balayages complets
+MEDIA_GC_INTERVAL = float(os.getenv('MEDIA_GC_INTERVAL', 10))
+MEDIA_GC_SWEEP_INTERVAL = float(os.getenv('MEDIA_GC_SWEEP_INTERVAL', 6 * 3600))
+
+# Un fichier modifié récemment n'est jamais supprimé par le balayage
+# (upload en cours, ligne pas encore enregistrée, rendu en arrière-plan)
+MEDIA_GC_GRACE_SECONDS = float(os.getenv('MEDIA_GC_GRACE_SECONDS', 3600))
+
+# Taille des lots du parcours disque et de la file
+SCAN_BATCH_SIZE = 1000
+QUEUE_BATCH_SIZE = 200
+MAX_DELETE_ATTEMPTS = 5
+
+# Fichiers dérivés d'une image source : <source>_w<largeur>.<ext> et <source>_tiles/...
+DERIVATIVE_NAME = re.compile(r'^(.+)_w\d+\.[A-Za-z0-9]+$')
+TILES_SUFFIX = '_tiles'
+
+# Fichiers conservés même sans référence
+KEPT_FILES = {'manifest.json'}
+
+# QR code statique d'une œuvre ou d'une salle : <type>_<id>.png
+QR_FILE_NAME = re.compile(r'^(artwork|room)_(\d+)\.png$')
+QR_TABLES = {'artwork': 'artworks', 'room': 'rooms'}
+
+
+@dataclass
+class SweepReport:
+    """Outcome of one orphan sweep"""
+    scanned: int = 0
+    deleted: List[str] = field(default_factory=list)
+    skipped_recent: int = 0
+    orphan_blobs: int = 0
+    orphan_metadata: int = 0
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    dry_run: bool = False
+    duration: float = 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'scanned': self.scanned,
+            'deleted': len(self.deleted),
+            'deleted_files': self.deleted[:100],
+            'skipped_recent': self.skipped_recent,
+            'orphan_blobs': self.orphan_blobs,
+            'orphan_metadata': self.orphan_metadata,
+            'errors': self.errors[:100],
+            'dry_run': self.dry_run,
+            'duration': round(self.duration, 3)
+        }
+
+
+class MediaGarbageCollector:
+    """
+    Deletes media files outside of the request that dropped them
+
+    Requests only enqueue the urls they stop using (media_deletes table); a
+    background thread drains the queue through the blob store, which keeps
+    files still referenced elsewhere. A periodic sweep walks the static
+    folders in batches and removes files no row points at any more, which
+    also catches files left behind by failed requests. Only one process
+    sweeps at a time (lease in media_gc_state).
+    """
+
+    def __init__(self, db_path: str, blob_store: MediaBlobStore, folders: Iterable[str], qr_folder: str,
+                 interval: float = MEDIA_GC_INTERVAL, sweep_interval: float = MEDIA_GC_SWEEP_INTERVAL,
+                 grace_seconds: float = MEDIA_GC_GRACE_SECONDS):
+        """
+        Args:
+            db_path: SQLite database
+            blob_store: Store whose release() decides whether a file can go
+            folders: Static folders swept for orphans
+            qr_folder: Folder of the static QR codes (named after their artwork or room)
+        """
+        self.db_path = db_path
+        self.blob_store = blob_store
+        self.folders = [os.path.normpath(folder) for folder in folders]
+        self.qr_folder = os.path.normpath(qr_folder)
+        self.interval = interval
+        self.sweep_interval = sweep_interval
+        self.grace_seconds = grace_seconds
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.last_sweep: Optional[SweepReport] = None
+
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS media_deletes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    enqueued_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS media_gc_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    last_sweep_at REAL NOT NULL DEFAULT 0
+                )
+            """)
+            # Premier balayage automatique un intervalle après la création : jamais au démarrage
+            # (les balayages immédiats passent par POST /api/admin/media/gc)
+            now = time.time()
+            conn.execute("INSERT OR IGNORE INTO media_gc_state (id, last_sweep_at) VALUES (1, ?)", (now,))
+            conn.execute("UPDATE media_gc_state SET last_sweep_at = ? WHERE id = 1 AND last_sweep_at = 0", (now,))
+            conn.commit()
+
+    # File des suppressions
+
+    def enqueue(self, urls: Iterable[Optional[str]]) -> List[str]:
+        """
+        Queue urls a record no longer uses
+
+        Returns:
+            The urls queued
+        """
+        urls = [url for url in urls if url and url.startswith('/static/')]
+        if urls:
+            now = time.time()
+            with self._get_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO media_deletes (url, enqueued_at) VALUES (?, ?)", [(url, now) for url in urls]
+                )
+                conn.commit()
+            self._wakeup.set()
+        return urls
+
+    def _claim_batch(self) -> List[sqlite3.Row]:
+        """Take queued deletes out of the table (one process gets each row)"""
+        conn = self._get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM media_deletes ORDER BY id LIMIT ?", (QUEUE_BATCH_SIZE,)
+            ).fetchall()
+            if rows:
+                conn.executemany("DELETE FROM media_deletes WHERE id = ?", [(row['id'],) for row in rows])
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    def process_queue(self) -> int:
+        """
+        Delete the queued files that nothing references any more
+
+        Returns:
+            Number of queue entries processed
+        """
+        processed = 0
+        retry = []
+        rows = self._claim_batch()
+        while rows:
+            for row in rows:
+                try:
+                    if self._is_qr_url(row['url']):
+                        self._release_qr(row['url'])
+                    else:
+                        self.blob_store.release(row['url'])
+                except Exception as e:
+                    print(f"DEBUG: Media delete failed for {row['url']}: {e}")
+                    if row['attempts'] + 1 < MAX_DELETE_ATTEMPTS:
+                        retry.append((row['url'], row['attempts'] + 1, str(e), row['enqueued_at']))
+            processed += len(rows)
+            rows = self._claim_batch()
+
+        if retry:
+            # Réessayé au prochain passage (le balayage rattrape les abandons)
+            with self._get_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO media_deletes (url, attempts, last_error, enqueued_at) VALUES (?, ?, ?, ?)", retry
+                )
+                conn.commit()
+        return processed
+
+    def _is_qr_url(self, url: str) -> bool:
+        return os.path.normpath(url.lstrip('/')).startswith(self.qr_folder + os.sep)
+
+    def _release_qr(self, url: str) -> None:
+        """Delete a QR code unless its artwork or room still exists"""
+        path = os.path.normpath(url.lstrip('/'))
+        with self._get_connection() as conn:
+            if self._qr_is_referenced(conn, url):
+                return
+        try:
+            os.remove(path)
+            print(f"DEBUG: Deleted QR code file: {path}")
+        except FileNotFoundError:
+            pass
+
+    def _qr_is_referenced(self, conn: sqlite3.Connection, url: str) -> bool:
+        """Whether the artwork or room a QR code is named after still exists (one lookup by primary key)"""
+        match = QR_FILE_NAME.match(os.path.basename(url))
+        if match:
+            target_type, target_id = match.groups()
+            return conn.execute(
+                f"SELECT 1 FROM {QR_TABLES[target_type]} WHERE id = ?", (int(target_id),)
+            ).fetchone() is not None
+        # Autre nom : seule une URL enregistrée sur une œuvre le retient
+        return conn.execute(
+            "SELECT 1 FROM artworks WHERE qr_code_url = ? LIMIT 1", ('/' + url.lstrip('/'),)
+        ).fetchone() is not None
+
+    def pending(self) -> int:
+        """Number of queued deletes"""
+        with self._get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM media_deletes").fetchone()[0]
+
+    # Balayage des fichiers orphelins
+
+    def _referenced_qr_paths(self, conn: sqlite3.Connection) -> Set[str]:
+        """QR codes of existing artworks and rooms, under the sharded and the legacy flat names"""
+        paths = set()
+        for target_type, table in (('artwork', 'artworks'), ('room', 'rooms')):
+            for row in conn.execute(f"SELECT id FROM {table}"):
+                name = f"{target_type}_{row['id']}.png"
+                # Nom à plat tant que migrate_media_layout.py n'a pas été lancé
+                paths.add(os.path.normpath(os.path.join(self.qr_folder, name)))
+                paths.add(os.path.normpath(os.path.join(self.qr_folder, sharded_name(name))))
+        paths.update(
+            os.path.normpath(row['qr_code_url'].lstrip('/'))
+            for row in conn.execute("SELECT qr_code_url FROM artworks WHERE qr_code_url IS NOT NULL")
+        )
+        return paths
+
+    def _referenced_paths(self, conn: sqlite3.Connection) -> Set[str]:
+        """Paths of every file a row points at"""
+        urls = set()
+        for table, column in MEDIA_URL_COLUMNS:
+            urls.update(
+                row[0] for row in conn.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL")
+            )
+        if self._has_table(conn, 'upload_sessions'):
+            # Uploads terminés mais pas encore rattachés
+            urls.update(
+                row[0] for row in conn.execute(
+                    "SELECT completed_url FROM upload_sessions WHERE completed_url IS NOT NULL AND attached = 0"
+                )
+            )
+
+        paths = {os.path.normpath(url.lstrip('/')) for url in urls if url and url.startswith('/static/')}
+        paths.update(self._referenced_qr_paths(conn))
+        return paths
+
+    @staticmethod
+    def _has_table(conn: sqlite3.Connection, table: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def _walk(self, folder: str) -> Iterator[List[os.DirEntry]]:
+        """Yield the files under a folder in batches (scandir, no full listing in memory)"""
+        batch = []
+        stack = [folder]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            batch.append(entry)
+                            if len(batch) >= SCAN_BATCH_SIZE:
+                                yield batch
+                                batch = []
+            except FileNotFoundError:
+                continue
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _source_stem(path: str) -> Optional[str]:
+        """Stem of the original a derivative or tile was made from"""
+        parts = path.split(os.sep)
+        for index, part in enumerate(parts[:-1]):
+            if part.endswith(TILES_SUFFIX):
+                return os.sep.join(parts[:index] + [part[:-len(TILES_SUFFIX)]])
+        match = DERIVATIVE_NAME.match(os.path.basename(path))
+        if match:
+            return os.path.join(os.path.dirname(path), match.group(1))
+        return None
+
+    def _reclaim_orphan_blobs(self, referenced: Set[str], report: SweepReport) -> None:
+        """Drop blob rows whose file is referenced by nothing and was not used recently"""
+        cutoff = time.time() - self.grace_seconds
+        with self._get_connection() as conn:
+            rows = conn.execute("SELECT sha256, url FROM media_blobs").fetchall()
+            orphans = []
+            for row in rows:
+                path = os.path.normpath(row['url'].lstrip('/'))
+                if path in referenced:
+                    continue
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                except OSError:
+                    pass
+                orphans.append(row['sha256'])
+            if orphans and not report.dry_run:
+                conn.executemany("DELETE FROM media_blobs WHERE sha256 = ?", [(sha,) for sha in orphans])
+                conn.commit()
+        report.orphan_blobs = len(orphans)
+
+    def _reclaim_orphan_metadata(self, referenced: Set[str], report: SweepReport) -> None:
+        """Drop image metadata rows of files no row references any more"""
+        with self._get_connection() as conn:
+            if not self._has_table(conn, 'image_metadata'):
+                return
+            orphans = [
+                row['url'] for row in conn.execute("SELECT url FROM image_metadata")
+                if os.path.normpath(row['url'].lstrip('/')) not in referenced
+            ]
+            if orphans and not report.dry_run:
+                conn.executemany("DELETE FROM image_metadata WHERE url = ?", [(url,) for url in orphans])
+                conn.commit()
+        report.orphan_metadata = len(orphans)
+
+    def sweep(self, dry_run: bool = False) -> SweepReport:
+        """
+        Remove files under the static folders that no row references
+
+        Files modified within the grace period are kept. With dry_run, the
+        orphans are reported but nothing is deleted.
+        """
+        started = time.perf_counter()
+        report = SweepReport(dry_run=dry_run)
+
+        with self._get_connection() as conn:
+            referenced = self._referenced_paths(conn)
+        referenced_stems = {os.path.splitext(path)[0] for path in referenced}
+        self._reclaim_orphan_blobs(referenced, report)
+        self._reclaim_orphan_metadata(referenced, report)
+
+        cutoff = time.time() - self.grace_seconds
+        for folder in self.folders:
+            for batch in self._walk(folder):
+                for entry in batch:
+                    report.scanned += 1
+                    path = os.path.normpath(entry.path)
+                    if path in referenced or entry.name in KEPT_FILES or entry.name.endswith('.tmp'):
+                        continue
+                    stem = self._source_stem(path)
+                    if stem is not None and stem in referenced_stems:
+                        continue
+                    # Copie .gz/.br : supprimée avec son original, au passage suivant
+                    source = precompressed_source(path)
+                    if source is not None and os.path.exists(source):
+                        continue
+                    try:
+                        if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                            report.skipped_recent += 1
+                            continue
+                        if not dry_run:
+                            os.remove(path)
+                        report.deleted.append(path)
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        report.errors.append({'path': path, 'error': str(e)})
+
+            if not dry_run:
+                self._remove_empty_dirs(folder)
+
+        report.duration = time.perf_counter() - started
+        self.last_sweep = report
+        print(f"DEBUG: Media sweep: {report.scanned} files scanned, {len(report.deleted)} orphans "
+              f"{'found' if dry_run else 'deleted'}")
+        return report
+
+    @staticmethod
+    def _remove_empty_dirs(folder: str) -> None:
+        for root, _, _ in os.walk(folder, topdown=False):
+            if root != folder:
+                try:
+                    os.rmdir(root)  # échoue si le dossier n'est pas vide
+                except OSError:
+                    pass
+
+    def _claim_sweep(self) -> bool:
+        """Take the sweep lease if the last sweep is old enough"""
+        now = time.time()
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "UPDATE media_gc_state SET last_sweep_at = ? WHERE id = 1 AND last_sweep_at <= ?",
+                (now, now - self.sweep_interval)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+
+    # Thread d'arrière-plan
+
+    def start(self) -> None:
+        """Start the background thread (once per process)"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name='media-gc', daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.process_queue()
+                if self.sweep_interval > 0 and self._claim_sweep():
+                    self.sweep()
+            except Exception as e:
+                print(f"DEBUG: Media garbage collector error: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def close(self) -> None:
+        """Stop the background thread"""
+        self._stop.set()
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'pending_deletes': self.pending(),
+            'last_sweep': self.last_sweep.to_dict() if self.last_sweep else None
+        }
@@ -0,0 +1,236 @@
+"""
+Upload-time image metadata: dimensions, blurhash placeholder and dominant color
+"""
+import os
+import sqlite3
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...domain.entities.image_metadata import ImageMetadata
+from .derivatives import _flatten_alpha
+from .workers import submit_media_job
+
+
+# Composantes blurhash (axe long, axe court) et taille de l'image analysée
+BLURHASH_COMPONENTS = (4, 3)
+BLURHASH_SAMPLE_SIZE = 32
+PALETTE_SAMPLE_SIZE = 64
+PALETTE_COLORS = 5
+
+# Colonnes d'images dont on extrait les métadonnées
+IMAGE_URL_COLUMNS = (
+    ('artworks', 'image_url'),
+    ('rooms', 'panorama_url'),
+)
+
+IMAGE_METADATA_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS image_metadata (
+        url TEXT PRIMARY KEY,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        blurhash TEXT,
+        dominant_color TEXT,
+        computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Orientations EXIF qui échangent largeur et hauteur
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _base83(value: int, length: int) -> str:
+    return ''.join(_BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _linear_to_srgb(value: float) -> int:
+    value = min(1.0, max(0.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash_encode(pixels, components_x: int, components_y: int) -> str:
+    """
+    Encode an RGB image as a blurhash string
+
+    Args:
+        pixels: uint8 array of shape (height, width, 3), ideally a small thumbnail
+        components_x: Horizontal cosine components (1-9)
+        components_y: Vertical cosine components (1-9)
+    """
+    import numpy as np
+
+    height, width = pixels.shape[:2]
+    srgb = pixels.astype(np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+
+    # Facteurs DCT : projection de l'image sur chaque cosinus (j vertical, i horizontal)
+    basis_y = np.cos(np.pi * np.arange(components_y)[:, None] * np.arange(height)[None, :] / height)
+    basis_x = np.cos(np.pi * np.arange(components_x)[:, None] * np.arange(width)[None, :] / width)
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((components_x - 1) + (components_y - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    quantised = np.clip(np.floor(np.sign(ac) * np.sqrt(np.abs(ac / max_value)) * 9 + 9.5), 0, 18).astype(int)
+    for r, g, b in quantised:
+        result += _base83(int(r) * 19 * 19 + int(g) * 19 + int(b), 2)
+    return result
+
+
+def _dominant_color(img) -> str:
+    """Most common color of a median-cut palette, as #rrggbb"""
+    from PIL import Image
+
+    paletted = img.quantize(colors=PALETTE_COLORS, method=Image.Quantize.MEDIANCUT)
+    count, index = max(paletted.getcolors())
+    r, g, b = paletted.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def extract_image_metadata(source_path: str) -> Dict[str, object]:
+    """
+    Read the displayed size of an image and compute its placeholders (runs in a worker process)
+
+    Only a small thumbnail is decoded: JPEG sources are decoded at a reduced
+    scale (draft), so even large panoramas are cheap to analyse.
+
+    Returns:
+        Dict with width, height, blurhash and dominant_color
+    """
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = None  # panoramas équirectangulaires de plusieurs centaines de mégapixels
+
+    with Image.open(source_path) as img:
+        transposed = img.getexif().get(0x0112, 1) in _TRANSPOSED_ORIENTATIONS
+        width, height = (img.height, img.width) if transposed else img.size
+
+        img.draft('RGB', (PALETTE_SAMPLE_SIZE * 2, PALETTE_SAMPLE_SIZE * 2))
+        sample = ImageOps.exif_transpose(img)
+        if sample.mode not in ('RGB', 'RGBA'):
+            # Images en palette : réduire en couleurs réelles, pas au plus proche voisin
+            sample = sample.convert('RGBA')
+        sample.thumbnail((PALETTE_SAMPLE_SIZE, PALETTE_SAMPLE_SIZE), Image.BILINEAR, reducing_gap=2.0)
+        sample = _flatten_alpha(sample)
+
+    dominant_color = _dominant_color(sample)
+
+    # Plus de composantes le long de l'axe le plus long
+    long_axis, short_axis = BLURHASH_COMPONENTS
+    components = (long_axis, short_axis) if width >= height else (short_axis, long_axis)
+    sample.thumbnail((BLURHASH_SAMPLE_SIZE, BLURHASH_SAMPLE_SIZE), Image.BILINEAR)
+    blurhash = blurhash_encode(np.asarray(sample), *components)
+
+    return {'width': width, 'height': height, 'blurhash': blurhash, 'dominant_color': dominant_color}
+
+
+class ImageMetadataService:
+    """
+    Extracts and stores the layout metadata of uploaded images
+
+    Metadata is keyed by the image url (uploads are content-addressed) in the
+    image_metadata table; the repositories join it into the artwork and room
+    payloads as image_metadata / panorama_metadata.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute(IMAGE_METADATA_SCHEMA)
+            conn.commit()
+
+    @staticmethod
+    def _source_path(url: Optional[str]) -> Optional[str]:
+        if not url or not url.startswith('/static/'):
+            return None
+        path = url.lstrip('/')
+        return path if os.path.isfile(path) else None
+
+    def _store(self, url: str, metadata: Dict[str, object]) -> None:
+        with self._get_connection() as conn:
+            conn.execute("""
+                INSERT INTO image_metadata (url, width, height, blurhash, dominant_color)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    width = excluded.width, height = excluded.height, blurhash = excluded.blurhash,
+                    dominant_color = excluded.dominant_color, computed_at = CURRENT_TIMESTAMP
+            """, (url, metadata['width'], metadata['height'], metadata['blurhash'], metadata['dominant_color']))
+            conn.commit()
+
+    def get(self, url: Optional[str]) -> Optional[ImageMetadata]:
+        """Stored metadata of an image url"""
+        if not url:
+            return None
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT * FROM image_metadata WHERE url = ?", (url,)).fetchone()
+        return ImageMetadata.from_row(row) if row else None
+
+    def schedule(self, url: Optional[str]) -> Optional[Future]:
+        """Queue metadata extraction for an uploaded image"""
+        source_path = self._source_path(url)
+        if not source_path:
+            return None
+        return submit_media_job(
+            extract_image_metadata, source_path,
+            on_done=lambda metadata: self._store(url, metadata)
+        )
+
+    def generate_many(self, urls: Iterable[str], workers: Optional[int] = None) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        Extract the metadata of many images on a dedicated process pool
+
+        Returns:
+            (number extracted, errors)
+        """
+        jobs = [(url, self._source_path(url)) for url in urls]
+        errors = [{'target': url, 'error': 'Source file not found'} for url, path in jobs if not path]
+        jobs = [(url, path) for url, path in jobs if path]
+        if not jobs:
+            return 0, errors
+
+        extracted = 0
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            futures = {executor.submit(extract_image_metadata, path): url for url, path in jobs}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    self._store(url, future.result())
+                    extracted += 1
+                except Exception as e:
+                    errors.append({'target': url, 'error': str(e)})
+        return extracted, errors
+
+    def pending_urls(self, force: bool = False) -> List[str]:
+        """Artwork images and room panoramas without metadata yet"""
+        urls = []
+        with self._get_connection() as conn:
+            for table, column in IMAGE_URL_COLUMNS:
+                query = f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL"
+                if not force:
+                    query += f" AND {column} NOT IN (SELECT url FROM image_metadata)"
+                urls.extend(row[0] for row in conn.execute(query))
+        return list(dict.fromkeys(urls))
@@ -0,0 +1,184 @@
+"""
+On-the-fly image resizing backed by a disk cache
+"""
+import io
+import os
+from typing import Optional, Tuple
+
+from ..cache.disk_lru_cache import DiskLRUCache
+from ..cache.single_flight import SingleFlight
+from .derivatives import DERIVATIVE_FORMATS, _flatten_alpha
+
+
+# Format demandé -> (format Pillow, type MIME, options d'enregistrement)
+RESIZE_FORMATS = {
+    'webp': ('WEBP', 'image/webp', DERIVATIVE_FORMATS['webp'][1]),
+    'jpeg': ('JPEG', 'image/jpeg', DERIVATIVE_FORMATS['jpeg'][1]),
+    'png': ('PNG', 'image/png', {}),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+RESIZE_FITS = ('contain', 'cover')
+
+MIN_RESIZE_DIMENSION = 16
+MAX_RESIZE_DIMENSION = 4096
+
+# Orientations EXIF qui échangent largeur et hauteur
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def _output_size(source_size: Tuple[int, int], width: Optional[int], height: Optional[int],
+                 fit: str) -> Tuple[int, int, float]:
+    """
+    Output size and scale factor for a request, never enlarging the source
+
+    Returns:
+        (output width, output height, scale applied to the source)
+    """
+    source_width, source_height = source_size
+    if fit == 'cover' and width and height:
+        scale = max(width / source_width, height / source_height)
+        if scale > 1:
+            # Recadrage aux proportions demandées, sans agrandir
+            width, height = round(width / scale), round(height / scale)
+            scale = 1.0
+        return max(1, width), max(1, height), scale
+
+    scales = [1.0]
+    if width:
+        scales.append(width / source_width)
+    if height:
+        scales.append(height / source_height)
+    scale = min(scales)
+    return max(1, round(source_width * scale)), max(1, round(source_height * scale)), scale
+
+
+def resize_image(source_path: str, width: Optional[int], height: Optional[int],
+                 fmt: str, fit: str = 'contain') -> bytes:
+    """
+    Resize an image and encode it
+
+    JPEG sources are decoded at a reduced scale (draft) close to the target,
+    and the remaining downscale uses reduce() before the LANCZOS pass
+    (reducing_gap), so a thumbnail of a large photo never decodes it fully.
+    """
+    from PIL import Image, ImageOps
+
+    pil_format, _, options = RESIZE_FORMATS[fmt]
+
+    with Image.open(source_path) as img:
+        transposed = img.getexif().get(0x0112, 1) in _TRANSPOSED_ORIENTATIONS
+        oriented_size = (img.height, img.width) if transposed else img.size
+        out_width, out_height, scale = _output_size(oriented_size, width, height, fit)
+
+        draft_size = (max(1, round(oriented_size[0] * scale)), max(1, round(oriented_size[1] * scale)))
+        img.draft('RGB', draft_size[::-1] if transposed else draft_size)
+        current = ImageOps.exif_transpose(img)
+
+        # Zone source à conserver (centrée pour "cover"), dans l'image décodée
+        ratio = out_width / out_height
+        if current.width / current.height > ratio:
+            crop_width, crop_height = current.height * ratio, current.height
+        else:
+            crop_width, crop_height = current.width, current.width / ratio
+        left = (current.width - crop_width) / 2
+        top = (current.height - crop_height) / 2
+        box = (left, top, left + crop_width, top + crop_height)
+
+        has_alpha = current.mode in ('RGBA', 'LA') or (current.mode == 'P' and 'transparency' in current.info)
+        current = current.convert('RGBA' if has_alpha else 'RGB')
+        resized = current.resize((out_width, out_height), Image.LANCZOS, box=box, reducing_gap=2.0)
+
+    if pil_format == 'JPEG':
+        resized = _flatten_alpha(resized)
+    buffer = io.BytesIO()
+    resized.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+class OnDemandImageResizer:
+    """
+    Serves arbitrary thumbnail sizes of uploaded images from a disk cache
+
+    Concurrent requests for a variant that is not cached yet are coalesced:
+    one request renders it while the others wait for the same file.
+    """
+
+    def __init__(self, cache: DiskLRUCache):
+        self._cache = cache
+        self._in_flight = SingleFlight()
+
+    @staticmethod
+    def source_path(url: Optional[str]) -> Optional[str]:
+        """Local file of a /static image url, if it exists"""
+        if not url or not url.startswith('/static/'):
+            return None
+        path = url.lstrip('/')
+        return path if os.path.isfile(path) else None
+
+    @staticmethod
+    def normalize_format(fmt: Optional[str], accept_webp: bool = False) -> str:
+        """Requested output format, or WebP/JPEG depending on what the client accepts"""
+        if not fmt:
+            return 'webp' if accept_webp else 'jpeg'
+        fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+        if fmt not in RESIZE_FORMATS:
+            raise ValueError(f"Unsupported image format: {fmt}")
+        return fmt
+
+    @staticmethod
+    def normalize_dimension(value, name: str) -> Optional[int]:
+        """Clamp a requested width or height to the supported range"""
+        if value in (None, ''):
+            return None
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Image {name} must be an integer")
+        return max(MIN_RESIZE_DIMENSION, min(MAX_RESIZE_DIMENSION, value))
+
+    def render(self, source_path: str, width=None, height=None,
+               fmt: str = 'jpeg', fit: str = 'contain') -> Tuple[str, str]:
+        """
+        Get the cached resized file, rendering it on a miss
+
+        Args:
+            source_path: Original image on disk
+            width: Maximum width in pixels
+            height: Maximum height in pixels
+            fmt: 'webp', 'jpeg' or 'png'
+            fit: 'contain' (fit inside the box) or 'cover' (fill it, cropping the overflow)
+
+        Returns:
+            Tuple of (file path, mimetype)
+        """
+        width = self.normalize_dimension(width, 'width')
+        height = self.normalize_dimension(height, 'height')
+        if width is None and height is None:
+            raise ValueError("Image width or height is required")
+        if fit not in RESIZE_FITS:
+            raise ValueError(f"Unsupported fit: {fit}")
+        fmt = self.normalize_format(fmt)
+
+        # La date de modification invalide les variantes d'un fichier remplacé
+        key = f"{source_path}|{os.stat(source_path).st_mtime_ns}|{width}x{height}|{fit}|{fmt}"
+        mimetype = RESIZE_FORMATS[fmt][1]
+
+        path = self._cache.get(key, fmt)
+        if path is not None:
+            return path, mimetype
+
+        def _render() -> str:
+            # Un autre rendu a pu se terminer entre la recherche et l'entrée dans le groupe
+            cached = self._cache.get(key, fmt)
+            if cached is not None:
+                return cached
+            return self._cache.put(key, fmt, resize_image(source_path, width, height, fmt, fit))
+
+        path, _ = self._in_flight.do(key, _render)
+        return path, mimetype
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats['coalesced'] = self._in_flight.coalesced
+        return stats
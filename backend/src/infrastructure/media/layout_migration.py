@@ -0,0 +1,317 @@
+"""
+Migration of the static media folders from a flat to a sharded layout
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .derivatives import derivative_files
+from .panorama_tiles import tile_directory
+from .precompress import precompressed_siblings
+from .sharding import is_sharded, sharded_name
+
+
+# Colonnes contenant une URL de fichier
+URL_COLUMNS = (
+    ('artworks', 'image_url'),
+    ('artworks', 'audio_url'),
+    ('artworks', 'video_url'),
+    ('artworks', 'qr_code_url'),
+    ('rooms', 'panorama_url'),
+    ('media_blobs', 'url'),
+    ('upload_sessions', 'completed_url'),
+    ('image_metadata', 'url'),
+)
+
+# Colonnes JSON contenant des URLs de fichiers dérivés (variantes, tuiles)
+JSON_COLUMNS = (
+    ('artworks', 'image_variants'),
+    ('rooms', 'panorama_variants'),
+    ('rooms', 'panorama_tiles'),
+)
+
+QR_MANIFEST_FILENAME = 'manifest.json'
+
+# <source>_w<largeur>.<ext> ou <source>_tiles
+_DERIVED_SUFFIX = re.compile(r'^(.+?)(_w\d+\.[A-Za-z0-9]+|_tiles)$')
+
+
+@dataclass
+class LayoutMigrationReport:
+    """Outcome of a layout migration"""
+    files_moved: int = 0
+    rows_updated: int = 0
+    already_sharded: int = 0
+    missing_files: List[str] = field(default_factory=list)
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    dry_run: bool = False
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'files_moved': self.files_moved,
+            'rows_updated': self.rows_updated,
+            'already_sharded': self.already_sharded,
+            'missing_files': self.missing_files[:50],
+            'errors': self.errors[:50],
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(self.elapsed_seconds, 3)
+        }
+
+
+class MediaLayoutMigration:
+    """
+    Moves flat static media files into hash-prefixed shard directories
+
+    Every file referenced by a row is moved to <folder>/ab/cd/<name> together
+    with its derivatives and panorama tiles, then all url columns (and the url
+    maps stored as JSON) are rewritten with executemany in one transaction.
+    If the database update fails the files are moved back. Flat QR codes are
+    moved as well, since room QR codes are not referenced by a column.
+    Running the migration again only handles what is still flat.
+    """
+
+    def __init__(self, db_path: str, folders: Dict[str, str], qr_folder: Optional[str] = None):
+        """
+        Args:
+            db_path: SQLite database
+            folders: public url prefix -> folder on disk (e.g. "/static/images" -> "static/images")
+            qr_folder: Folder of the QR codes, whose manifest is rewritten
+        """
+        self.db_path = db_path
+        self.folders = {prefix.rstrip('/'): folder for prefix, folder in folders.items()}
+        self.qr_folder = qr_folder
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _existing_columns(conn: sqlite3.Connection, columns) -> List[Tuple[str, str]]:
+        existing = []
+        for table, column in columns:
+            names = [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if column in names:
+                existing.append((table, column))
+        return existing
+
+    def _folder_prefix(self, url: str) -> Optional[str]:
+        """Url prefix of the media folder a url belongs to"""
+        return next((prefix for prefix in self.folders if url.startswith(prefix + '/')), None)
+
+    def plan(self) -> Tuple[Dict[str, str], int]:
+        """
+        Collect the urls to move
+
+        Returns:
+            (old url -> new url, number of urls already sharded)
+        """
+        moves: Dict[str, str] = {}
+        already_sharded = 0
+        with self._get_connection() as conn:
+            for table, column in self._existing_columns(conn, URL_COLUMNS):
+                for (url,) in conn.execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL"):
+                    prefix = self._folder_prefix(url)
+                    if prefix is None or url in moves:
+                        continue
+                    relative = url[len(prefix) + 1:]
+                    if is_sharded(relative):
+                        already_sharded += 1
+                    else:
+                        moves[url] = f"{prefix}/{sharded_name(relative)}"
+
+        qr_prefix = next(
+            (prefix for prefix, folder in self.folders.items()
+             if self.qr_folder and os.path.normpath(folder) == os.path.normpath(self.qr_folder)),
+            None
+        )
+        if qr_prefix and os.path.isdir(self.qr_folder):
+            # QR codes des salles : fichiers qu'aucune colonne ne référence
+            with os.scandir(self.qr_folder) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith('.png'):
+                        moves.setdefault(f"{qr_prefix}/{entry.name}", f"{qr_prefix}/{sharded_name(entry.name)}")
+        return moves, already_sharded
+
+    @staticmethod
+    def collisions(moves: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Destinations shared by several urls
+
+        The sharded name only depends on the file name, so a/x.jpg and b/x.jpg
+        would end up at the same place.
+
+        Returns:
+            new url -> old urls mapped to it (only when there are several)
+        """
+        sources: Dict[str, List[str]] = {}
+        for old_url, new_url in moves.items():
+            sources.setdefault(new_url, []).append(old_url)
+        return {new_url: old_urls for new_url, old_urls in sources.items() if len(old_urls) > 1}
+
+    def _remap_url(self, url: str, moves: Dict[str, str], stems: Dict[str, str]) -> str:
+        """New url of a moved file or of one of its derivatives"""
+        if url in moves:
+            return moves[url]
+        directory, _, name = url.rpartition('/')
+        match = _DERIVED_SUFFIX.match(name)
+        if match:
+            new_stem = stems.get(f"{directory}/{match.group(1)}")
+            if new_stem:
+                return f"{new_stem}{match.group(2)}"
+        return url
+
+    def _remap_json(self, value: Any, moves: Dict[str, str], stems: Dict[str, str]) -> Any:
+        if isinstance(value, str) and value.startswith('/static/'):
+            return self._remap_url(value, moves, stems)
+        if isinstance(value, dict):
+            return {key: self._remap_json(item, moves, stems) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._remap_json(item, moves, stems) for item in value]
+        return value
+
+    @staticmethod
+    def _move(source: str, destination: str) -> None:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source, destination)
+
+    def _files_of(self, old_path: str, new_path: str) -> List[Tuple[str, str]]:
+        """Original, derivatives, precompressed copies and tile folder of a file, with their destinations"""
+        files = [(old_path, new_path)]
+        new_dir = os.path.dirname(new_path)
+        files.extend(
+            (path, os.path.join(new_dir, os.path.basename(path)))
+            for path in derivative_files(old_path) + precompressed_siblings(old_path)
+        )
+        if os.path.isdir(tile_directory(old_path)):
+            files.append((tile_directory(old_path), tile_directory(new_path)))
+        return files
+
+    def run(self, dry_run: bool = False) -> LayoutMigrationReport:
+        """
+        Move the files and rewrite the urls (nothing is changed with dry_run)
+
+        A url is rewritten only when its file and everything derived from it
+        were moved, or when the file is already at its destination (rerun
+        after an interruption). Urls sharing a destination, or whose
+        destination is taken by another file, are left flat and reported.
+        """
+        started = time.perf_counter()
+        report = LayoutMigrationReport(dry_run=dry_run)
+        moves, report.already_sharded = self.plan()
+        for new_url, old_urls in self.collisions(moves).items():
+            for old_url in old_urls:
+                del moves[old_url]
+                report.errors.append({'file': old_url, 'error': f"Same destination as {len(old_urls) - 1} other file(s): {new_url}"})
+
+        # 1. Déplacer les fichiers (originaux, déclinaisons, dossiers de tuiles), groupe par groupe
+        applied: Dict[str, str] = {}
+        done: List[Tuple[str, str]] = []
+        for old_url, new_url in moves.items():
+            old_path, new_path = old_url.lstrip('/'), new_url.lstrip('/')
+            files = self._files_of(old_path, new_path)
+            if not os.path.exists(old_path):
+                if not os.path.exists(new_path):
+                    report.missing_files.append(old_url)
+                    continue
+                # Original déjà déplacé par une exécution interrompue : finir le reste du groupe
+                files = files[1:]
+            taken = next((destination for _, destination in files if os.path.exists(destination)), None)
+            if taken:
+                report.errors.append({'file': old_path, 'error': f"Destination already exists: {taken}"})
+                continue
+            if dry_run:
+                report.files_moved += len(files)
+                applied[old_url] = new_url
+                continue
+
+            moved: List[Tuple[str, str]] = []
+            try:
+                for source, destination in files:
+                    self._move(source, destination)
+                    moved.append((source, destination))
+            except OSError as e:
+                report.errors.append({'file': source, 'error': str(e)})
+                # Groupe incomplet : tout remettre en place, l'URL reste inchangée
+                for source, destination in reversed(moved):
+                    try:
+                        self._move(destination, source)
+                    except OSError as undo_error:
+                        report.errors.append({'file': destination, 'error': str(undo_error)})
+                continue
+            done.extend(moved)
+            report.files_moved += len(moved)
+            applied[old_url] = new_url
+
+        moves = applied
+        stems = {os.path.splitext(old)[0]: os.path.splitext(new)[0] for old, new in moves.items()}
+
+        # 2. Réécrire les URLs en une seule transaction
+        conn = self._get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for table, column in self._existing_columns(conn, URL_COLUMNS):
+                cursor = conn.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE {column} = ?",
+                    [(new, old) for old, new in moves.items()]
+                )
+                report.rows_updated += max(cursor.rowcount, 0)
+
+            for table, column in self._existing_columns(conn, JSON_COLUMNS):
+                updates = []
+                for row in conn.execute(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL"):
+                    try:
+                        data = json.loads(row[column])
+                    except ValueError:
+                        continue
+                    remapped = self._remap_json(data, moves, stems)
+                    if remapped != data:
+                        updates.append((json.dumps(remapped, separators=(',', ':')), row['id']))
+                conn.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+                report.rows_updated += len(updates)
+
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            # Remettre les fichiers en place : la base pointe toujours vers l'ancien emplacement
+            for source, destination in reversed(done):
+                try:
+                    self._move(destination, source)
+                except OSError:
+                    pass
+            raise
+        finally:
+            conn.close()
+
+        if not dry_run:
+            self._rewrite_qr_manifest()
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    def _rewrite_qr_manifest(self) -> None:
+        """Key the QR regeneration manifest by the sharded file names"""
+        if not self.qr_folder:
+            return
+        manifest_path = os.path.join(self.qr_folder, QR_MANIFEST_FILENAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(manifest, dict):
+            return
+
+        rewritten = {sharded_name(name) if not is_sharded(name) else name: digest for name, digest in manifest.items()}
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(rewritten, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
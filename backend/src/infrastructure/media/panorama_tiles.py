@@ -0,0 +1,309 @@
+"""
+Multi-resolution cube tiles for room panoramas, in the layout pannellum loads
+"""
+import math
+import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from ...domain.entities.panorama_tiles import PanoramaTiles
+from .workers import submit_media_job
+
+
+# Faces du cube, dans l'ordre de pannellum
+CUBE_FACES = ('f', 'b', 'u', 'd', 'l', 'r')
+
+TILE_RESOLUTION = 512
+FALLBACK_RESOLUTION = 1024
+MAX_CUBE_RESOLUTION = 8192
+TILE_QUALITY = 80
+
+# Lignes projetées à la fois (borne la mémoire des tableaux intermédiaires)
+PROJECTION_STRIP_ROWS = 256
+
+
+def ensure_tiles_column(conn: sqlite3.Connection) -> None:
+    """Add the JSON tile pyramid column (rooms.panorama_tiles) to older databases"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(rooms)")]
+    if 'panorama_tiles' not in columns:
+        conn.execute("ALTER TABLE rooms ADD COLUMN panorama_tiles TEXT")
+
+
+def tile_directory(source_path: str) -> str:
+    """Directory of the tiles, next to the panorama"""
+    return f"{os.path.splitext(source_path)[0]}_tiles"
+
+
+def cube_geometry(source_width: int) -> Tuple[int, int]:
+    """
+    Cube face resolution and number of levels for an equirectangular width
+
+    Returns:
+        (cube resolution, max level)
+    """
+    cube_resolution = min(MAX_CUBE_RESOLUTION, max(8, 8 * int(source_width / math.pi / 8)))
+    levels = max(1, int(math.ceil(math.log(cube_resolution / TILE_RESOLUTION, 2))) + 1)
+    # Évite un dernier niveau à peine plus grand qu'une tuile
+    if levels > 1 and round(cube_resolution / 2 ** (levels - 2)) == TILE_RESOLUTION:
+        levels -= 1
+    return cube_resolution, levels
+
+
+def _face_vectors(face: str, u, v):
+    """Direction vectors (x right, y up, z back) of face pixels at u, v in [-1, 1]"""
+    import numpy as np
+
+    one = np.ones_like(u)
+    return {
+        'f': (u, -v, -one),
+        'b': (-u, -v, one),
+        'u': (u, one, -v),
+        'd': (u, -one, v),
+        'l': (-one, -v, -u),
+        'r': (one, -v, u),
+    }[face]
+
+
+def _project_face(pixels, face: str, size: int):
+    """Sample one cube face from an equirectangular RGB array (bilinear)"""
+    import numpy as np
+
+    height, width = pixels.shape[:2]
+    out = np.empty((size, size, 3), dtype=np.uint8)
+    coords = (np.arange(size, dtype=np.float32) + 0.5) * (2.0 / size) - 1.0
+
+    for top in range(0, size, PROJECTION_STRIP_ROWS):
+        v, u = np.meshgrid(coords[top:top + PROJECTION_STRIP_ROWS], coords, indexing='ij')
+        x, y, z = _face_vectors(face, u, v)
+        lon = np.arctan2(x, -z)
+        lat = np.arctan2(y, np.hypot(x, z))
+
+        px = (lon / (2 * np.pi) + 0.5) * width - 0.5
+        py = (0.5 - lat / np.pi) * height - 0.5
+        x0 = np.floor(px).astype(np.int64)
+        y0 = np.floor(py).astype(np.int64)
+        fx = (px - x0)[..., None]
+        fy = (py - y0)[..., None]
+        # La longitude boucle, la latitude est bornée aux pôles
+        x1 = (x0 + 1) % width
+        x0 %= width
+        y1 = np.clip(y0 + 1, 0, height - 1)
+        y0 = np.clip(y0, 0, height - 1)
+
+        strip = (
+            (pixels[y0, x0] * (1 - fx) + pixels[y0, x1] * fx) * (1 - fy)
+            + (pixels[y1, x0] * (1 - fx) + pixels[y1, x1] * fx) * fy
+        )
+        out[top:top + PROJECTION_STRIP_ROWS] = np.clip(strip + 0.5, 0, 255).astype(np.uint8)
+    return out
+
+
+def render_cube_face(source_path: str, face: str, output_dir: str,
+                     cube_resolution: int, levels: int) -> str:
+    """
+    Project one cube face and cut its tile pyramid (runs in a worker process)
+
+    Tiles are written as <level>/<face><row>_<col>.jpg, level <levels> being
+    full resolution and each lower level half the previous one, plus a
+    fallback/<face>.jpg for browsers without WebGL. A face already cut from
+    the current file is skipped.
+
+    Returns:
+        The face letter
+    """
+    import numpy as np
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None
+
+    marker = os.path.join(output_dir, f".{face}.done")
+    if os.path.exists(marker) and os.path.getmtime(marker) >= os.path.getmtime(source_path):
+        return face
+
+    with Image.open(source_path) as img:
+        pixels = np.asarray(img.convert('RGB'))
+    face_img = Image.fromarray(_project_face(pixels, face, cube_resolution))
+    del pixels
+
+    fallback_dir = os.path.join(output_dir, 'fallback')
+    os.makedirs(fallback_dir, exist_ok=True)
+    fallback_size = min(FALLBACK_RESOLUTION, cube_resolution)
+    face_img.resize((fallback_size, fallback_size), Image.LANCZOS).save(
+        os.path.join(fallback_dir, f"{face}.jpg"), quality=TILE_QUALITY
+    )
+
+    size = cube_resolution
+    for level in range(levels, 0, -1):
+        level_dir = os.path.join(output_dir, str(level))
+        os.makedirs(level_dir, exist_ok=True)
+        if size != face_img.width:
+            face_img = face_img.resize((size, size), Image.LANCZOS)
+        tiles = int(math.ceil(size / TILE_RESOLUTION))
+        for row in range(tiles):
+            for col in range(tiles):
+                box = (
+                    col * TILE_RESOLUTION, row * TILE_RESOLUTION,
+                    min((col + 1) * TILE_RESOLUTION, size), min((row + 1) * TILE_RESOLUTION, size)
+                )
+                face_img.crop(box).save(os.path.join(level_dir, f"{face}{row}_{col}.jpg"), quality=TILE_QUALITY)
+        size = max(1, size // 2)
+
+    with open(marker, 'w'):
+        pass
+    return face
+
+
+class PanoramaTileService:
+    """
+    Cuts room panoramas into pannellum multires cube tiles
+
+    The six faces are projected and tiled as separate jobs on the media
+    process pool, so a panorama uses every core. When the last face is done,
+    the tile manifest is stored on the room (panorama_tiles) and the room
+    API exposes it as panorama_multires. The lowest level is six tiles of at
+    most 512 px, which is all the viewer needs for its first paint.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            ensure_tiles_column(conn)
+            conn.commit()
+
+    @staticmethod
+    def _source_path(url: Optional[str]) -> Optional[str]:
+        if not url or not url.startswith('/static/'):
+            return None
+        path = url.lstrip('/')
+        return path if os.path.isfile(path) else None
+
+    @staticmethod
+    def _plan(url: str, source_path: str) -> Tuple[str, PanoramaTiles]:
+        """Output directory and manifest for a panorama"""
+        from PIL import Image
+
+        Image.MAX_IMAGE_PIXELS = None
+        with Image.open(source_path) as img:
+            cube_resolution, levels = cube_geometry(img.width)
+
+        output_dir = tile_directory(source_path)
+        base_path = f"{url.rsplit('/', 1)[0]}/{os.path.basename(output_dir)}"
+        return output_dir, PanoramaTiles(
+            source=url,
+            base_path=base_path,
+            cube_resolution=cube_resolution,
+            max_level=levels,
+            tile_resolution=TILE_RESOLUTION
+        )
+
+    def _store(self, room_id: int, tiles: PanoramaTiles) -> None:
+        with self._get_connection() as conn:
+            # Ne pas écraser si le panorama a été remplacé entre-temps
+            conn.execute(
+                "UPDATE rooms SET panorama_tiles = ? WHERE id = ? AND panorama_url = ?",
+                (tiles.to_json(), room_id, tiles.source)
+            )
+            conn.commit()
+
+    def schedule(self, room_id: int, url: Optional[str]) -> List[Future]:
+        """Queue the six face jobs of a room panorama"""
+        source_path = self._source_path(url)
+        if not source_path:
+            return []
+
+        try:
+            output_dir, tiles = self._plan(url, source_path)
+        except Exception as e:
+            print(f"DEBUG: Cannot tile panorama {url}: {e}")
+            return []
+        remaining = set(CUBE_FACES)
+        lock = threading.Lock()
+
+        def face_done(face: str) -> None:
+            with lock:
+                remaining.discard(face)
+                finished = not remaining
+            if finished:
+                self._store(room_id, tiles)
+                print(f"DEBUG: Panorama tiles ready for room {room_id}: {tiles.base_path}")
+
+        return [
+            submit_media_job(
+                render_cube_face, source_path, face, output_dir, tiles.cube_resolution, tiles.max_level,
+                on_done=face_done
+            )
+            for face in CUBE_FACES
+        ]
+
+    def generate_many(self, targets: List[Tuple[int, str]], workers: Optional[int] = None,
+                      force: bool = False) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        Cut the tiles of many panoramas on a dedicated process pool
+
+        Args:
+            force: Drop existing tiles instead of keeping up-to-date faces
+
+        Returns:
+            (number of rooms completed, errors)
+        """
+        errors = []
+        plans = {}
+        for room_id, url in targets:
+            source_path = self._source_path(url)
+            if not source_path:
+                errors.append({'target': f"room {room_id}", 'error': 'Source file not found'})
+                continue
+            if force:
+                shutil.rmtree(tile_directory(source_path), ignore_errors=True)
+            plans[room_id] = (source_path, *self._plan(url, source_path))
+        if not plans:
+            return 0, errors
+
+        failed = set()
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            futures = {
+                executor.submit(render_cube_face, source_path, face, output_dir,
+                                tiles.cube_resolution, tiles.max_level): room_id
+                for room_id, (source_path, output_dir, tiles) in plans.items()
+                for face in CUBE_FACES
+            }
+            for future in as_completed(futures):
+                room_id = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    if room_id not in failed:
+                        errors.append({'target': f"room {room_id}", 'error': str(e)})
+                    failed.add(room_id)
+
+        completed = 0
+        for room_id, (_, _, tiles) in plans.items():
+            if room_id not in failed:
+                self._store(room_id, tiles)
+                completed += 1
+        return completed, errors
+
+    def pending_targets(self, force: bool = False) -> List[Tuple[int, str]]:
+        """Rooms whose current panorama has no tiles yet"""
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, panorama_url, panorama_tiles FROM rooms WHERE panorama_url IS NOT NULL"
+            ).fetchall()
+        targets = []
+        for row in rows:
+            tiles = PanoramaTiles.from_json(row['panorama_tiles'])
+            if force or not tiles or not tiles.matches(row['panorama_url']):
+                targets.append((row['id'], row['panorama_url']))
+        return targets
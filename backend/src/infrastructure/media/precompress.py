@@ -0,0 +1,215 @@
+"""
+Precompressed (.gz / .br) siblings of compressible static files
+"""
+import gzip
+import os
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : seul gzip est alors produit
+    brotli = None
+
+
+# Formats texte qui gagnent à être compressés (les images et vidéos le sont déjà)
+PRECOMPRESSIBLE_EXTENSIONS = ('.svg', '.json', '.geojson', '.xml', '.txt', '.csv', '.vtt', '.html', '.css', '.js')
+
+# Encodage HTTP -> suffixe du fichier, dans l'ordre de préférence
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Compression à la construction : niveau maximal, le coût n'est payé qu'une fois
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+
+def available_encodings() -> List[str]:
+    """Content codings this installation can produce, best first"""
+    return [encoding for encoding in PRECOMPRESSED_SUFFIXES if encoding != 'br' or brotli is not None]
+
+
+def compress_bytes(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compress a payload for a Content-Encoding
+
+    Args:
+        data: Raw bytes
+        encoding: 'gzip' or 'br'
+        level: gzip level (1-9) or brotli quality (0-11), maximal by default
+    """
+    if encoding == 'br':
+        if brotli is None:
+            raise ValueError("brotli is not installed")
+        return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if level is None else level)
+    if encoding == 'gzip':
+        # mtime=0 : même contenu -> mêmes octets, donc ETag stable
+        return gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str, level: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Compress a streamed payload for a Content-Encoding, chunk by chunk
+
+    Each input chunk is flushed, so the client receives data as soon as
+    it is produced instead of once the compressor's window fills.
+
+    Args:
+        chunks: Raw byte chunks (tens of kilobytes each, to keep the flushes cheap)
+        encoding: 'gzip' or 'br'
+        level: gzip level (1-9) or brotli quality (0-11), maximal by default
+    """
+    if encoding == 'br':
+        if brotli is None:
+            raise ValueError("brotli is not installed")
+        compressor = brotli.Compressor(quality=STATIC_BROTLI_QUALITY if level is None else level)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    elif encoding == 'gzip':
+        # wbits 16 + MAX_WBITS : en-tête et pied gzip (mtime 0)
+        compressor = zlib.compressobj(STATIC_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def is_precompressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in PRECOMPRESSIBLE_EXTENSIONS
+
+
+def precompressed_siblings(path: str) -> List[str]:
+    """Precompressed files currently on disk next to a file"""
+    return [path + suffix for suffix in PRECOMPRESSED_SUFFIXES.values() if os.path.isfile(path + suffix)]
+
+
+def precompressed_source(path: str) -> Optional[str]:
+    """File a .gz / .br sibling was made from, or None for other files"""
+    for suffix in PRECOMPRESSED_SUFFIXES.values():
+        if path.endswith(suffix) and is_precompressible(path[:-len(suffix)]):
+            return path[:-len(suffix)]
+    return None
+
+
+def precompressed_variant(path: str, encodings: Iterable[str]) -> Optional[Tuple[str, str]]:
+    """
+    Up-to-date precompressed sibling for the first acceptable encoding
+
+    Args:
+        path: Original file
+        encodings: Encodings the client accepts, best first
+
+    Returns:
+        Tuple of (sibling path, encoding), or None to send the original
+    """
+    try:
+        source_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    for encoding in encodings:
+        suffix = PRECOMPRESSED_SUFFIXES.get(encoding)
+        if suffix is None:
+            continue
+        try:
+            # Une copie plus ancienne que l'original est périmée
+            if os.stat(path + suffix).st_mtime_ns >= source_mtime:
+                return path + suffix, encoding
+        except OSError:
+            continue
+    return None
+
+
+def precompress_file(path: str, force: bool = False) -> Dict[str, int]:
+    """
+    Write the .gz / .br siblings of a file
+
+    A sibling is only kept when it is smaller than the original; siblings
+    that are up to date are left alone unless force is set.
+
+    Returns:
+        encoding -> compressed size for each sibling written
+    """
+    written = {}
+    source_stat = os.stat(path)
+    data = None
+    for encoding in available_encodings():
+        target = path + PRECOMPRESSED_SUFFIXES[encoding]
+        if not force:
+            try:
+                if os.stat(target).st_mtime_ns >= source_stat.st_mtime_ns:
+                    continue
+            except OSError:
+                pass
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+
+        compressed = compress_bytes(data, encoding)
+        if len(compressed) >= len(data):
+            # Pas de gain : l'original est servi tel quel
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        # Même date que l'original : la copie est à jour tant qu'il ne change pas
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, target)
+        written[encoding] = len(compressed)
+    return written
+
+
+@dataclass
+class PrecompressReport:
+    """Outcome of a precompression run"""
+    scanned: int = 0
+    files_written: int = 0
+    bytes_original: int = 0
+    bytes_compressed: Dict[str, int] = field(default_factory=dict)
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'scanned': self.scanned,
+            'files_written': self.files_written,
+            'bytes_original': self.bytes_original,
+            'bytes_compressed': self.bytes_compressed,
+            'errors': self.errors[:50],
+            'elapsed_seconds': round(self.elapsed_seconds, 3)
+        }
+
+
+def precompress_tree(folders: Iterable[str], force: bool = False) -> PrecompressReport:
+    """Precompress every compressible file below some folders"""
+    started = time.perf_counter()
+    report = PrecompressReport()
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.join(root, name)
+                if not is_precompressible(name) or name.endswith('.tmp'):
+                    continue
+                report.scanned += 1
+                try:
+                    written = precompress_file(path, force=force)
+                except (OSError, ValueError) as e:
+                    report.errors.append({'file': path, 'error': str(e)})
+                    continue
+                if written:
+                    report.files_written += 1
+                    report.bytes_original += os.path.getsize(path)
+                    for encoding, size in written.items():
+                        report.bytes_compressed[encoding] = report.bytes_compressed.get(encoding, 0) + size
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,36 @@
+"""
+Sharded directory layout of the static media folders
+"""
+import hashlib
+import os
+import re
+
+
+# Deux niveaux de deux caractères hexadécimaux : ab/cd/<fichier>, 65 536 dossiers feuilles
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+_SHA256_STEM = re.compile(r'^[0-9a-f]{64}$')
+
+
+def shard_prefix(filename: str) -> str:
+    """
+    Shard directories of a file name, e.g. "ab/cd"
+
+    Content-addressed names (<sha256><ext>) are sharded by their own digest,
+    other names by the SHA-256 of the name.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    digest = stem if _SHA256_STEM.match(stem) else hashlib.sha256(os.path.basename(filename).encode('utf-8')).hexdigest()
+    return '/'.join(digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS))
+
+
+def sharded_name(filename: str) -> str:
+    """Path of a file relative to its media folder, e.g. "ab/cd/<filename>" """
+    name = os.path.basename(filename)
+    return f"{shard_prefix(name)}/{name}"
+
+
+def is_sharded(relative_path: str) -> bool:
+    """Whether a path relative to a media folder already follows the sharded layout"""
+    return relative_path.replace(os.sep, '/') == sharded_name(relative_path)
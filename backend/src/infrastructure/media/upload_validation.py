@@ -0,0 +1,102 @@
+"""
+Upload validation: size limit and content sniffing per media kind
+"""
+import os
+from typing import Dict, Optional
+
+
+class UploadTooLarge(ValueError):
+    """Declared or received size above the limit"""
+
+
+class UnsupportedMediaType(ValueError):
+    """File content does not match the expected media kind"""
+
+
+# Taille maximale par type de média (octets)
+UPLOAD_LIMITS: Dict[str, int] = {
+    'image': int(os.getenv('UPLOAD_MAX_IMAGE_BYTES', 20 * 1024 * 1024)),
+    'panorama': int(os.getenv('UPLOAD_MAX_PANORAMA_BYTES', 200 * 1024 * 1024)),
+    'audio': int(os.getenv('UPLOAD_MAX_AUDIO_BYTES', 100 * 1024 * 1024)),
+    'video': int(os.getenv('UPLOAD_MAX_VIDEO_BYTES', 4 * 1024 * 1024 * 1024)),
+}
+
+# Octets lus en tête de fichier pour reconnaître son format
+SNIFF_BYTES = 16
+
+# Atomes QuickTime pouvant ouvrir un .mov sans "ftyp"
+_QUICKTIME_ATOMS = (b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot')
+
+
+def _image_type(head: bytes) -> Optional[str]:
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _audio_type(head: bytes) -> Optional[str]:
+    if head.startswith(b'ID3') or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'audio/mpeg'
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'audio/wav'
+    if head.startswith(b'OggS'):
+        return 'audio/ogg'
+    if head.startswith(b'fLaC'):
+        return 'audio/flac'
+    if head[4:8] == b'ftyp' and head[8:11] == b'M4A':
+        return 'audio/mp4'
+    return None
+
+
+def _video_type(head: bytes) -> Optional[str]:
+    if head[4:8] == b'ftyp':
+        return 'video/quicktime' if head[8:12] == b'qt  ' else 'video/mp4'
+    if head[4:8] in _QUICKTIME_ATOMS:
+        return 'video/quicktime'
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'video/webm'
+    return None
+
+
+# Type de média -> détection du format à partir des premiers octets
+SNIFFERS = {
+    'image': _image_type,
+    'panorama': lambda head: _image_type(head) if not head.startswith(b'GIF') else None,
+    'audio': _audio_type,
+    'video': _video_type,
+}
+
+
+def upload_limit(kind: str) -> int:
+    """Largest accepted file for a media kind"""
+    if kind not in UPLOAD_LIMITS:
+        raise ValueError(f"Unsupported upload kind: {kind}")
+    return UPLOAD_LIMITS[kind]
+
+
+def sniff_media_type(head: bytes, kind: str) -> str:
+    """
+    Check the first bytes of a file against the formats accepted for a kind
+
+    Args:
+        head: At least SNIFF_BYTES bytes (or the whole file if shorter)
+        kind: 'image', 'panorama', 'audio' or 'video'
+
+    Returns:
+        Detected mimetype
+
+    Raises:
+        UnsupportedMediaType: The content is not a known format of that kind
+    """
+    if kind not in SNIFFERS:
+        raise ValueError(f"Unsupported upload kind: {kind}")
+    mimetype = SNIFFERS[kind](head)
+    if mimetype is None:
+        raise UnsupportedMediaType(f"File content is not a supported {kind} format")
+    return mimetype
@@ -0,0 +1,61 @@
+"""
+Process pool shared by the background media jobs (derivatives, tiles, metadata)
+"""
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+
+# Nombre de processus de traitement des médias (par défaut : nombre de cœurs)
+MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', '0')) or None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def media_pool() -> ProcessPoolExecutor:
+    """Return the shared pool, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS or os.cpu_count() or 1)
+            atexit.register(shutdown_media_pool)
+        return _pool
+
+
+def shutdown_media_pool(wait: bool = True) -> None:
+    """Stop the shared pool (pending jobs are finished first when wait is True)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def submit_media_job(fn: Callable[..., Any], *args: Any,
+                     on_done: Optional[Callable[[Any], None]] = None) -> Future:
+    """
+    Run fn(*args) in a worker process without blocking the request
+
+    Args:
+        fn: Module-level function (it is pickled to the worker)
+        on_done: Called in the parent process with the result; failures are logged
+    """
+    future = media_pool().submit(fn, *args)
+
+    def _callback(done: Future) -> None:
+        try:
+            result = done.result()
+        except Exception as e:
+            print(f"DEBUG: Media job {getattr(fn, '__name__', fn)} failed: {e}")
+            return
+        if on_done is not None:
+            try:
+                on_done(result)
+            except Exception as e:
+                print(f"DEBUG: Media job callback failed: {e}")
+
+    future.add_done_callback(_callback)
+    return future
@@ -0,0 +1,11 @@
+# QR code infrastructure - Image generation and storage
+from .qr_regeneration import QRCodeRegenerationService, QRRegenerationReport, qr_filename
+from .qr_renderer import OnDemandQRCodeRenderer
+from .qr_sheet import QRSheetRenderer, SHEET_FORMATS, write_sheet
+from .short_links import ShortLinkService, base62_encode
+
+__all__ = [
+    'QRCodeRegenerationService', 'QRRegenerationReport', 'qr_filename',
+    'OnDemandQRCodeRenderer', 'QRSheetRenderer', 'SHEET_FORMATS', 'write_sheet',
+    'ShortLinkService', 'base62_encode'
+]
@@ -0,0 +1,218 @@
+"""
+Bulk regeneration of the QR code images stored under static/qrcodes
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Any
+
+import qrcode
+
+from .short_links import ShortLinkService
+from ..media.sharding import sharded_name
+
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Paramètres de rendu : les changer invalide toutes les entrées du manifeste
+QR_RENDER_VERSION = "qrcode-make/box10/border4/ecc-M"
+
+
+def qr_filename(kind: str, entity_id: int) -> str:
+    """Path of the QR code image of an artwork or a room, relative to the QR folder (ab/cd/<kind>_<id>.png)"""
+    return sharded_name(f"{kind}_{entity_id}.png")
+
+
+def _render_qr_batch(batch: List[Tuple[str, str]]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Render a batch of QR codes (runs inside a worker process)
+
+    Args:
+        batch: List of (encoded url, destination path)
+
+    Returns:
+        List of (destination path, error message or None)
+    """
+    results = []
+    for url, path in batch:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            qrcode.make(url).save(tmp_path, format='PNG')
+            os.replace(tmp_path, path)
+            results.append((path, None))
+        except Exception as e:
+            results.append((path, str(e)))
+    return results
+
+
+@dataclass
+class QRTarget:
+    """A QR code image to (re)generate"""
+    kind: str
+    entity_id: int
+    url: str
+    filename: str
+
+    @property
+    def digest(self) -> str:
+        """Content address of the image: hash of the encoded URL and render settings"""
+        return hashlib.sha256(f"{QR_RENDER_VERSION}|{self.url}".encode('utf-8')).hexdigest()
+
+
+@dataclass
+class QRRegenerationReport:
+    """Outcome of a bulk regeneration run"""
+    total: int = 0
+    regenerated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[Dict[str, str]] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """QR codes processed per second"""
+        return self.total / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'regenerated': self.regenerated,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'per_second': round(self.throughput, 1),
+            'errors': self.errors[:50]
+        }
+
+
+class QRCodeRegenerationService:
+    """
+    Regenerates the QR code images of every artwork and room
+
+    A manifest next to the images maps each file to the digest of the URL it
+    encodes, so only images whose URL changed (or that are missing) get rendered.
+    Rendering is spread over a process pool in batches.
+    """
+
+    def __init__(self, db_path: str, qr_folder: str, short_links: ShortLinkService):
+        self.db_path = db_path
+        self.qr_folder = qr_folder
+        self.short_links = short_links
+        self.manifest_path = os.path.join(qr_folder, MANIFEST_FILENAME)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def collect_targets(self) -> List[QRTarget]:
+        """List the QR codes expected for the current catalog"""
+        with self._get_connection() as conn:
+            artwork_ids = [row['id'] for row in conn.execute("SELECT id FROM artworks ORDER BY id")]
+            room_ids = [row['id'] for row in conn.execute("SELECT id FROM rooms ORDER BY id")]
+
+        keys = [('artwork', artwork_id) for artwork_id in artwork_ids]
+        keys.extend(('room', room_id) for room_id in room_ids)
+        urls = self.short_links.qr_urls(keys)
+
+        return [
+            QRTarget(kind, entity_id, urls[(kind, entity_id)], qr_filename(kind, entity_id))
+            for kind, entity_id in keys
+        ]
+
+    def load_manifest(self) -> Dict[str, str]:
+        """Load the filename -> digest manifest (empty if missing or corrupt)"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest: Dict[str, str]) -> None:
+        """Atomically write the manifest"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def regenerate(self, force: bool = False, workers: Optional[int] = None,
+                   batch_size: int = 256) -> QRRegenerationReport:
+        """
+        Regenerate stale or missing QR code images
+
+        Args:
+            force: Re-render every image even if its URL is unchanged
+            workers: Number of worker processes (defaults to the CPU count)
+            batch_size: Number of images rendered per task
+
+        Returns:
+            Regeneration report with counts and throughput
+        """
+        started = time.perf_counter()
+        os.makedirs(self.qr_folder, exist_ok=True)
+
+        targets = self.collect_targets()
+        manifest = self.load_manifest()
+        report = QRRegenerationReport(total=len(targets))
+
+        pending: List[QRTarget] = []
+        for target in targets:
+            path = os.path.join(self.qr_folder, target.filename)
+            if not force and manifest.get(target.filename) == target.digest and os.path.exists(path):
+                report.skipped += 1
+            else:
+                pending.append(target)
+
+        by_path = {os.path.join(self.qr_folder, t.filename): t for t in pending}
+        jobs = [(t.url, os.path.join(self.qr_folder, t.filename)) for t in pending]
+        batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+        if len(batches) <= 1:
+            # Pas la peine de démarrer un pool pour un seul lot
+            results = [_render_qr_batch(batch) for batch in batches]
+        else:
+            max_workers = min(workers or os.cpu_count() or 1, len(batches))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_render_qr_batch, batches))
+
+        for batch_results in results:
+            for path, error in batch_results:
+                target = by_path[path]
+                if error:
+                    report.failed += 1
+                    manifest.pop(target.filename, None)
+                    report.errors.append({'file': target.filename, 'error': error})
+                else:
+                    report.regenerated += 1
+                    manifest[target.filename] = target.digest
+
+        # Oublier les entrées des œuvres/salles supprimées
+        expected = {t.filename for t in targets}
+        manifest = {name: digest for name, digest in manifest.items() if name in expected}
+        self.save_manifest(manifest)
+        self._sync_artwork_qr_urls(targets)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    def _sync_artwork_qr_urls(self, targets: List[QRTarget]) -> None:
+        """Point artworks.qr_code_url at the regenerated files in one transaction"""
+        qr_prefix = '/' + self.qr_folder.replace(os.sep, '/').strip('/')
+        updates = [
+            (f"{qr_prefix}/{t.filename}", t.entity_id, f"{qr_prefix}/{t.filename}")
+            for t in targets if t.kind == 'artwork'
+        ]
+        with self._get_connection() as conn:
+            conn.executemany(
+                "UPDATE artworks SET qr_code_url = ? WHERE id = ? AND qr_code_url IS NOT ?",
+                updates
+            )
+            conn.commit()
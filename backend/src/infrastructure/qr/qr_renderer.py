@@ -0,0 +1,103 @@
+"""
+On-demand QR code rendering backed by a disk cache
+"""
+from typing import Iterable, Optional, Tuple
+
+from ...domain.services.qr_code_service import QRCodeService
+from ..cache.disk_lru_cache import DiskLRUCache
+from ..media.precompress import PRECOMPRESSED_SUFFIXES, compress_bytes
+from .short_links import ShortLinkService
+
+
+QR_FORMATS = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png'
+}
+
+MIN_QR_SIZE = 64
+MAX_QR_SIZE = 2048
+DEFAULT_QR_SIZE = 300
+
+
+class OnDemandQRCodeRenderer:
+    """Renders artwork and room QR codes lazily and keeps them in a disk cache"""
+
+    def __init__(self, cache: DiskLRUCache, short_links: ShortLinkService):
+        self._cache = cache
+        self._short_links = short_links
+
+    def target_url(self, kind: str, entity_id: int) -> str:
+        """Short URL encoded in the QR code of an artwork or a room"""
+        return self._short_links.qr_url(kind, entity_id)
+
+    @staticmethod
+    def normalize_size(size) -> int:
+        """Clamp the requested size to the supported range"""
+        try:
+            size = int(size) if size is not None else DEFAULT_QR_SIZE
+        except (TypeError, ValueError):
+            raise ValueError("QR code size must be an integer")
+        return max(MIN_QR_SIZE, min(MAX_QR_SIZE, size))
+
+    def render(self, kind: str, entity_id: int, fmt: str = 'png', size=None) -> Tuple[str, str]:
+        """
+        Get the cached QR code file, rendering it on a miss
+
+        Args:
+            kind: 'artwork' or 'room'
+            entity_id: ID of the artwork or room
+            fmt: 'svg' or 'png'
+            size: Requested size in pixels
+
+        Returns:
+            Tuple of (file path, mimetype)
+        """
+        if fmt not in QR_FORMATS:
+            raise ValueError(f"Unsupported QR code format: {fmt}")
+
+        size = self.normalize_size(size)
+        url = self.target_url(kind, entity_id)
+        key = f"{url}|{fmt}|{size}"
+
+        path = self._cache.get(key, fmt)
+        if path is None:
+            if fmt == 'svg':
+                data = QRCodeService.render_svg(url, size)
+            else:
+                data = QRCodeService.render_png(url, size)
+            path = self._cache.put(key, fmt, data)
+
+        return path, QR_FORMATS[fmt]
+
+    def render_encoded(self, kind: str, entity_id: int, fmt: str = 'png', size=None,
+                       encodings: Iterable[str] = ()) -> Tuple[str, str, Optional[str]]:
+        """
+        Like render(), but SVG codes are sent compressed when the client accepts it
+
+        The compressed copy is cached next to the SVG, so it is encoded once
+        rather than on every request. PNG codes are already compressed.
+
+        Args:
+            encodings: Content codings accepted by the client, best first
+
+        Returns:
+            Tuple of (file path, mimetype, content encoding or None)
+        """
+        path, mimetype = self.render(kind, entity_id, fmt, size)
+        if fmt != 'svg':
+            return path, mimetype, None
+
+        encoding = next((e for e in encodings if e in PRECOMPRESSED_SUFFIXES), None)
+        if encoding is None:
+            return path, mimetype, None
+
+        key = f"{self.target_url(kind, entity_id)}|{fmt}|{self.normalize_size(size)}|{encoding}"
+        extension = fmt + PRECOMPRESSED_SUFFIXES[encoding]
+        encoded_path = self._cache.get(key, extension)
+        if encoded_path is None:
+            with open(path, 'rb') as f:
+                encoded_path = self._cache.put(key, extension, compress_bytes(f.read(), encoding))
+        return encoded_path, mimetype, encoding
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,262 @@
+"""
+Printable QR code sheets (PDF pages or PNG sprite) for the artworks of a room
+"""
+import os
+import struct
+import unicodedata
+import zlib
+from collections import deque
+from itertools import islice
+from typing import List, Tuple, Iterator, Iterable, Optional
+
+from ...domain.services.qr_code_service import QRCodeService
+from ..media.workers import media_pool
+
+
+# A4 à 150 dpi, 3 x 4 étiquettes par page
+PDF_PAGE_SIZE = (1240, 1754)
+PDF_PAGE_POINTS = (595, 842)
+PDF_GRID = (3, 4)
+PDF_MARGIN = 40
+
+SPRITE_TILE_SIZE = (320, 370)
+SPRITE_COLUMNS = 6
+
+SHEET_FORMATS = {
+    'pdf': 'application/pdf',
+    'png': 'image/png'
+}
+
+# Police TrueType des légendes (les accents ne passent pas avec la police par défaut de Pillow)
+CAPTION_FONT = os.getenv('QR_SHEET_FONT', 'DejaVuSans.ttf')
+
+# Rendu en ligne en dessous de ce nombre d'étiquettes (l'aller-retour vers le pool coûte plus cher)
+INLINE_TILE_THRESHOLD = 12
+
+
+def _load_font(size: int) -> Tuple[object, bool]:
+    """Load the caption font; the flag tells whether it covers accented letters"""
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(CAPTION_FONT, size), True
+    except OSError:
+        pass
+    try:
+        return ImageFont.load_default(size=size), False
+    except TypeError:
+        # Pillow < 10.1 : police bitmap sans taille
+        return ImageFont.load_default(), False
+
+
+def _fit_caption(draw, text: str, font, max_width: int) -> str:
+    """Ellipsize a caption so it fits on one line"""
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + '…', font=font) > max_width:
+        text = text[:-1]
+    return text + '…'
+
+
+def _render_tile(job: Tuple[str, str, int, int]) -> bytes:
+    """
+    Render one label: the QR code with its caption underneath (runs in a worker process)
+
+    Args:
+        job: (encoded url, caption, tile width, tile height)
+
+    Returns:
+        Raw 8-bit grayscale pixels of the tile
+    """
+    from PIL import Image, ImageDraw
+
+    url, caption, width, height = job
+    caption_height = max(24, height // 8)
+
+    matrix = QRCodeService.build_matrix(url, border=2)
+    modules = len(matrix)
+    box_size = max(1, min(width, height - caption_height) // modules)
+    qr_side = modules * box_size
+
+    pixels = bytes(0 if dark else 255 for row in matrix for dark in row)
+    qr_img = Image.frombytes('L', (modules, modules), pixels).resize((qr_side, qr_side), Image.NEAREST)
+
+    tile = Image.new('L', (width, height), 255)
+    tile.paste(qr_img, ((width - qr_side) // 2, (height - caption_height - qr_side) // 2))
+
+    draw = ImageDraw.Draw(tile)
+    font, unicode_font = _load_font(max(12, caption_height // 2))
+    caption = caption or ''
+    if not unicode_font:
+        caption = unicodedata.normalize('NFKD', caption).encode('ascii', 'ignore').decode('ascii')
+    text = _fit_caption(draw, caption, font, width - 16)
+    text_width = draw.textlength(text, font=font)
+    draw.text(((width - text_width) / 2, height - caption_height), text, fill=0, font=font)
+
+    return tile.tobytes()
+
+
+def _iter_tiles(jobs: List[Tuple[str, str, int, int]], workers: Optional[int], window: int) -> Iterator[bytes]:
+    """
+    Render tiles in order on the shared media pool, keeping at most `window` in flight
+
+    The window bounds memory: finished tiles wait in the queue only until
+    the writer consumes them. `workers` further caps the tiles in flight so
+    a sheet does not take the whole pool from the other media jobs.
+    """
+    if len(jobs) <= INLINE_TILE_THRESHOLD:
+        for job in jobs:
+            yield _render_tile(job)
+        return
+
+    if workers:
+        window = max(1, min(window, workers))
+    executor = media_pool()
+    remaining = iter(jobs)
+    in_flight = deque(executor.submit(_render_tile, job) for job in islice(remaining, window))
+    try:
+        while in_flight:
+            future = in_flight.popleft()
+            next_job = next(remaining, None)
+            if next_job is not None:
+                in_flight.append(executor.submit(_render_tile, next_job))
+            yield future.result()
+    finally:
+        # Téléchargement interrompu : ne pas laisser les étiquettes restantes occuper le pool
+        for future in in_flight:
+            future.cancel()
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+
+class QRSheetRenderer:
+    """
+    Lays out the QR codes of a list of artworks for printing
+
+    Both writers are generators yielding encoded bytes as soon as a page
+    (PDF) or a row of tiles (PNG) is complete, so memory stays bounded by
+    one page plus the tiles in flight, whatever the number of artworks.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers
+
+    def render(self, items: List[Tuple[str, str]], fmt: str = 'pdf') -> Iterator[bytes]:
+        """
+        Render a sheet
+
+        Args:
+            items: List of (encoded url, caption), in print order
+            fmt: 'pdf' or 'png'
+
+        Returns:
+            Iterator over the bytes of the document
+        """
+        if fmt not in SHEET_FORMATS:
+            raise ValueError(f"Unsupported sheet format: {fmt}")
+        if not items:
+            raise ValueError("No QR codes to render")
+
+        if fmt == 'pdf':
+            return self._render_pdf(items)
+        return self._render_png(items)
+
+    def _render_pdf(self, items: List[Tuple[str, str]]) -> Iterator[bytes]:
+        from PIL import Image
+
+        cols, rows = PDF_GRID
+        page_width, page_height = PDF_PAGE_SIZE
+        tile_width = (page_width - 2 * PDF_MARGIN) // cols
+        tile_height = (page_height - 2 * PDF_MARGIN) // rows
+        per_page = cols * rows
+        page_count = (len(items) + per_page - 1) // per_page
+
+        jobs = [(url, caption, tile_width, tile_height) for url, caption in items]
+        tiles = _iter_tiles(jobs, self.workers, window=2 * per_page)
+
+        offsets: List[int] = []
+        position = 0
+
+        def emit(data: bytes) -> bytes:
+            nonlocal position
+            position += len(data)
+            return data
+
+        def emit_object(number: int, body: bytes) -> bytes:
+            offsets.append(position)
+            return emit(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        # Objets : 1 catalogue, 2 arbre des pages, puis (page, contenu, image) par page
+        yield emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        yield emit_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = ' '.join(f"{3 + 3 * i} 0 R" for i in range(page_count))
+        yield emit_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+
+        points_w, points_h = PDF_PAGE_POINTS
+        content = f"q {points_w} 0 0 {points_h} 0 0 cm /Im0 Do Q".encode()
+
+        for page_index in range(page_count):
+            page = Image.new('L', PDF_PAGE_SIZE, 255)
+            for slot, tile in enumerate(islice(tiles, per_page)):
+                x = PDF_MARGIN + (slot % cols) * tile_width
+                y = PDF_MARGIN + (slot // cols) * tile_height
+                page.paste(Image.frombytes('L', (tile_width, tile_height), tile), (x, y))
+
+            page_obj = 3 + 3 * page_index
+            yield emit_object(page_obj, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {points_w} {points_h}] "
+                f"/Resources << /XObject << /Im0 {page_obj + 2} 0 R >> >> /Contents {page_obj + 1} 0 R >>"
+            ).encode())
+            yield emit_object(page_obj + 1, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+            image_data = zlib.compress(page.tobytes(), 6)
+            yield emit_object(page_obj + 2, (
+                f"<< /Type /XObject /Subtype /Image /Width {page_width} /Height {page_height} "
+                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(image_data)} >>\nstream\n"
+            ).encode() + image_data + b"\nendstream")
+
+        xref_offset = position
+        xref = [f"xref\n0 {len(offsets) + 1}\n", "0000000000 65535 f \n"]
+        xref.extend(f"{offset:010d} 00000 n \n" for offset in offsets)
+        yield ''.join(xref).encode()
+        yield f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    def _render_png(self, items: List[Tuple[str, str]]) -> Iterator[bytes]:
+        tile_width, tile_height = SPRITE_TILE_SIZE
+        cols = min(SPRITE_COLUMNS, len(items))
+        rows = (len(items) + cols - 1) // cols
+        width, height = cols * tile_width, rows * tile_height
+
+        jobs = [(url, caption, tile_width, tile_height) for url, caption in items]
+        tiles = _iter_tiles(jobs, self.workers, window=2 * cols)
+
+        yield b"\x89PNG\r\n\x1a\n"
+        yield _png_chunk(b"IHDR", struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+
+        compressor = zlib.compressobj(6)
+        blank_tile = b"\xff" * (tile_width * tile_height)
+        for _ in range(rows):
+            # Une rangée d'étiquettes à la fois, ligne de pixels par ligne de pixels
+            strip = list(islice(tiles, cols))
+            strip.extend([blank_tile] * (cols - len(strip)))
+            scanlines = []
+            for y in range(tile_height):
+                start = y * tile_width
+                scanlines.append(b"\x00" + b"".join(tile[start:start + tile_width] for tile in strip))
+            data = compressor.compress(b"".join(scanlines))
+            if data:
+                yield _png_chunk(b"IDAT", data)
+
+        yield _png_chunk(b"IDAT", compressor.flush())
+        yield _png_chunk(b"IEND", b"")
+
+
+def write_sheet(chunks: Iterable[bytes], path: str) -> int:
+    """Write a rendered sheet to a file and return its size"""
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    return size
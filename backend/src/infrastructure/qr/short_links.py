@@ -0,0 +1,304 @@
+"""
+Short codes encoded in QR codes, resolved from memory with batched scan counting
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...domain.services.qr_code_service import QRCodeService
+
+
+BASE62_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+SHORT_LINK_TARGETS = ('artwork', 'room')
+
+# Intervalle minimal entre deux relectures des codes créés par d'autres processus (secondes)
+SHORT_LINK_REFRESH_INTERVAL = float(os.getenv('SHORT_LINK_REFRESH_INTERVAL', 1.0))
+
+# Plus long code possible (identifiant 64 bits en base62)
+MAX_CODE_LENGTH = 11
+
+
+def base62_encode(number: int) -> str:
+    """Encode a positive integer in base62"""
+    if number <= 0:
+        raise ValueError("Only positive integers can be encoded")
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(digits))
+
+
+def base62_decode(code: str) -> Optional[int]:
+    """Decode a code produced by base62_encode, or None if it is not one"""
+    if not code or len(code) > MAX_CODE_LENGTH or code[0] == '0':
+        return None
+    number = 0
+    for char in code:
+        digit = BASE62_ALPHABET.find(char)
+        if digit < 0:
+            return None
+        number = number * 62 + digit
+    return number
+
+
+class ShortLinkService:
+    """
+    Maps short base62 codes to artworks and rooms
+
+    The whole table is loaded in memory at startup so resolving a scanned
+    code never touches the database. A code is the base62 row id: an unknown
+    code at or below the highest id read so far does not exist, and a higher
+    one (created by another process) triggers an incremental reload at most
+    once per refresh interval. Scans are counted in memory and written in
+    one batch every few seconds, or sooner once enough are pending.
+    """
+
+    def __init__(self, db_path: str, base_url: str, flush_interval: float = 5.0, flush_threshold: int = 500,
+                 refresh_interval: float = SHORT_LINK_REFRESH_INTERVAL):
+        self.db_path = db_path
+        self.base_url = base_url
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.refresh_interval = refresh_interval
+
+        self._by_code: Dict[str, Tuple[str, int]] = {}
+        self._by_target: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+        self._loaded_id = 0
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._pending_scans: Counter = Counter()
+        self._pending_total = 0
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS short_codes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    code TEXT UNIQUE,
+                    target_type TEXT NOT NULL, -- "artwork" ou "room"
+                    target_id INTEGER NOT NULL,
+                    scan_count INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (target_type, target_id)
+                )
+            """)
+            conn.commit()
+
+    def load(self) -> int:
+        """Load every code in memory"""
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, code, target_type, target_id FROM short_codes WHERE code IS NOT NULL"
+            ).fetchall()
+
+        with self._lock:
+            self._by_code = {row['code']: (row['target_type'], row['target_id']) for row in rows}
+            self._by_target = {target: code for code, target in self._by_code.items()}
+            self._loaded_id = max((row['id'] for row in rows), default=0)
+            self._refreshed_at = time.monotonic()
+        return len(rows)
+
+    def _refresh(self) -> None:
+        """Load the codes created since the last read (by this process or another)"""
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, code, target_type, target_id FROM short_codes WHERE id > ? AND code IS NOT NULL",
+                (self._loaded_id,)
+            ).fetchall()
+        for row in rows:
+            self._remember(row['code'], (row['target_type'], row['target_id']))
+        with self._lock:
+            # Les écritures SQLite sont sérialisées : aucun id inférieur ne peut encore apparaître
+            self._loaded_id = max([self._loaded_id] + [row['id'] for row in rows])
+            self._refreshed_at = time.monotonic()
+
+    def start(self) -> None:
+        """Start the scan counter flusher (once per process)"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='short-link-scans', daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def resolve(self, code: str) -> Optional[Tuple[str, int]]:
+        """Return (target type, target id) of a code, or None if unknown"""
+        target = self._by_code.get(code)
+        if target is not None:
+            return target
+
+        code_id = base62_decode(code)
+        if code_id is None or code_id <= self._loaded_id:
+            return None
+        # Code plus récent que la dernière lecture : créé par un autre processus, ou inconnu.
+        # Une seule relecture par intervalle, quel que soit le nombre de codes inconnus scannés
+        with self._refresh_lock:
+            if code not in self._by_code and time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                self._refresh()
+        return self._by_code.get(code)
+
+    def code_for(self, target_type: str, target_id: int) -> str:
+        """Return the code of an artwork or room, creating it if needed"""
+        code = self._by_target.get((target_type, target_id))
+        if code is None:
+            code = self.ensure_codes([(target_type, target_id)])[(target_type, target_id)]
+        return code
+
+    def ensure_codes(self, targets: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        """
+        Return the codes of many targets, creating missing ones in one transaction
+
+        Args:
+            targets: (target type, target id) pairs
+
+        Returns:
+            Mapping from target to code
+        """
+        targets = list(targets)
+        for target_type, _ in targets:
+            if target_type not in SHORT_LINK_TARGETS:
+                raise ValueError(f"Unknown short link target: {target_type}")
+
+        missing = [t for t in targets if t not in self._by_target]
+        if missing:
+            with self._get_connection() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO short_codes (target_type, target_id) VALUES (?, ?)", missing
+                )
+                # Le code est l'identifiant de la ligne en base62
+                rows = conn.execute("SELECT id FROM short_codes WHERE code IS NULL").fetchall()
+                conn.executemany(
+                    "UPDATE short_codes SET code = ? WHERE id = ?",
+                    [(base62_encode(row['id']), row['id']) for row in rows]
+                )
+                conn.commit()
+
+                if len(missing) == 1:
+                    created = conn.execute(
+                        "SELECT code, target_type, target_id FROM short_codes WHERE target_type = ? AND target_id = ?",
+                        missing[0]
+                    ).fetchall()
+                else:
+                    # Création en masse : relire la table entière coûte moins qu'une requête par cible
+                    created = conn.execute("SELECT code, target_type, target_id FROM short_codes").fetchall()
+
+            for row in created:
+                self._remember(row['code'], (row['target_type'], row['target_id']))
+
+        return {target: self._by_target[target] for target in targets}
+
+    def qr_url(self, target_type: str, target_id: int) -> str:
+        """Short URL encoded in the QR code of an artwork or room"""
+        return QRCodeService.build_short_url(self.base_url, self.code_for(target_type, target_id))
+
+    def qr_urls(self, targets: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        """Short URLs of many targets at once (bulk variant of qr_url)"""
+        return {
+            target: QRCodeService.build_short_url(self.base_url, code)
+            for target, code in self.ensure_codes(targets).items()
+        }
+
+    def forget(self, targets: Iterable[Tuple[str, int]]) -> int:
+        """
+        Delete the codes of deleted artworks or rooms, so their QR codes stop resolving
+
+        Codes are never reused: the row ids come from AUTOINCREMENT.
+
+        Returns:
+            Number of codes deleted
+        """
+        targets = list(targets)
+        if not targets:
+            return 0
+        with self._get_connection() as conn:
+            cursor = conn.executemany(
+                "DELETE FROM short_codes WHERE target_type = ? AND target_id = ?", targets
+            )
+            conn.commit()
+        with self._lock:
+            for target in targets:
+                code = self._by_target.pop(target, None)
+                if code is not None:
+                    self._by_code.pop(code, None)
+        return max(cursor.rowcount, 0)
+
+    def _remember(self, code: str, target: Tuple[str, int]) -> None:
+        with self._lock:
+            self._by_code[code] = target
+            self._by_target[target] = code
+
+    def record_scan(self, code: str) -> None:
+        """Count a scan; the count reaches the database with the next batch"""
+        with self._lock:
+            self._pending_scans[code] += 1
+            self._pending_total += 1
+            pending = self._pending_total
+        if pending == self.flush_threshold:
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def flush(self) -> int:
+        """Write pending scan counts in one transaction and return how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending_scans = self._pending_scans, Counter()
+                self._pending_total = 0
+            if not pending:
+                return 0
+            try:
+                with self._get_connection() as conn:
+                    conn.executemany(
+                        "UPDATE short_codes SET scan_count = scan_count + ? WHERE code = ?",
+                        [(count, code) for code, count in pending.items()]
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                # Remettre les compteurs en attente pour le prochain lot
+                with self._lock:
+                    self._pending_scans.update(pending)
+                    self._pending_total += sum(pending.values())
+                print(f"DEBUG: Could not flush scan counts: {e}")
+                return 0
+            return sum(pending.values())
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background flusher and write the last counts"""
+        self._stop.set()
+        self.flush()
+
+    def get_scan_counts(self) -> List[Dict[str, object]]:
+        """Scan counts per code, including the ones not flushed yet"""
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT code, target_type, target_id, scan_count FROM short_codes ORDER BY scan_count DESC"
+            ).fetchall()
+        with self._lock:
+            pending = dict(self._pending_scans)
+        return [
+            {
+                'code': row['code'],
+                'target_type': row['target_type'],
+                'target_id': row['target_id'],
+                'scan_count': (row['scan_count'] or 0) + pending.get(row['code'], 0)
+            }
+            for row in rows
+        ]
@@ -2,13 +2,114 @@
 SQLite implementation of repository interfaces
 """
 import sqlite3
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Sequence, Tuple
 from datetime import datetime
 
 from ...domain.entities.user import User
 from ...domain.entities.room import Room, MultilingualText
 from ...domain.entities.artwork import Artwork
-from ...domain.repositories.repository_interfaces import UserRepository, RoomRepository, ArtworkRepository
+from ...domain.entities.image_variants import ImageVariants
+from ...domain.entities.panorama_tiles import PanoramaTiles
+from ...domain.entities.image_metadata import ImageMetadata
+from ..media.image_metadata import IMAGE_METADATA_SCHEMA
+from ..search.trigrams import TRIGRAM_SCHEMA, TRIGRAM_ARTWORK_INDEX, trigram_match_cte
+from ..search.similarity import SIMILARITY_SCHEMA
+from ..search.catalog import ensure_catalog_version, read_catalog_version
+from ...domain.repositories.repository_interfaces import (
+    UserRepository, RoomRepository, ArtworkRepository, FACET_FIELDS, FILTER_FIELDS
+)
+
+
+# Lignes jointes aux métadonnées de leur image (dimensions, blurhash, couleur dominante)
+ROOM_SELECT = """
+    SELECT rooms.*, im.width AS panorama_width, im.height AS panorama_height,
+           im.blurhash AS panorama_blurhash, im.dominant_color AS panorama_dominant_color
+    FROM rooms LEFT JOIN image_metadata im ON im.url = rooms.panorama_url
+"""
+ARTWORK_SELECT = """
+    SELECT artworks.*, im.width AS image_width, im.height AS image_height,
+           im.blurhash AS image_blurhash, im.dominant_color AS image_dominant_color
+    FROM artworks LEFT JOIN image_metadata im ON im.url = artworks.image_url
+"""
+
+# Colonnes lues pour chaque champ d'une liste projetée ({lang} : langue de la description)
+ARTWORK_PROJECTION_COLUMNS = {
+    **{field: (f"artworks.{field}",) for field in (
+        'id', 'title', 'description_fr', 'description_en', 'description_wo', 'category', 'period', 'origin',
+        'room_id', 'image_url', 'audio_url', 'video_url', 'qr_code_url', 'popularity', 'view_count', 'created_at'
+    )},
+    'description': ("COALESCE(NULLIF(artworks.description_{lang}, ''), artworks.description_fr) AS description",),
+    'room_name': ("rooms.name_fr AS room_name",),
+    'image_srcset': ("artworks.image_url", "artworks.image_variants"),
+    'thumbnail_url': ("artworks.image_url", "artworks.image_variants"),
+    'image_metadata': ("im.width AS image_width", "im.height AS image_height",
+                       "im.blurhash AS image_blurhash", "im.dominant_color AS image_dominant_color"),
+}
+# Jointures ajoutées seulement si une colonne projetée en a besoin
+_PROJECTION_JOINS = {
+    'rooms.': "LEFT JOIN rooms ON rooms.id = artworks.room_id",
+    'im.': "LEFT JOIN image_metadata im ON im.url = artworks.image_url",
+}
+_PROJECTION_ORDERS = {
+    'title': "artworks.title",
+    'popularity': "artworks.popularity DESC, artworks.view_count DESC, artworks.title",
+    'newest': "artworks.id DESC",
+}
+
+
+def _ensure_image_metadata_table(db_path: str) -> None:
+    """The joined table is created by the metadata service, or here for standalone scripts"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(IMAGE_METADATA_SCHEMA)
+
+
+def _ensure_search_tables(db_path: str) -> None:
+    """The search tables are filled by the search services, created here for standalone scripts"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(TRIGRAM_SCHEMA)
+        conn.execute(TRIGRAM_ARTWORK_INDEX)
+        conn.execute(SIMILARITY_SCHEMA)
+        ensure_catalog_version(conn)
+
+
+def _artwork_projection(fields: Sequence[str], language: str) -> Tuple[str, str]:
+    """Select list and joins reading only the columns behind the given artwork fields"""
+    unknown = [field for field in fields if field not in ARTWORK_PROJECTION_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown field: {unknown[0]}")
+    
+    lang = language if language in ('fr', 'en', 'wo') else 'fr'
+    columns = list(dict.fromkeys(
+        column.format(lang=lang) for field in fields for column in ARTWORK_PROJECTION_COLUMNS[field]
+    ))
+    joins = [join for prefix, join in _PROJECTION_JOINS.items() if any(column.startswith(prefix) for column in columns)]
+    return ', '.join(columns), ' '.join(joins)
+
+
+def _project_artwork(row: sqlite3.Row, fields: Sequence[str]) -> Dict[str, Any]:
+    """Build the projected dict of an artwork row, decoding the derived fields"""
+    variants = None
+    if 'image_srcset' in fields or 'thumbnail_url' in fields:
+        variants = ImageVariants.from_json(row['image_variants'])
+        if variants and not variants.matches(row['image_url']):
+            variants = None
+    
+    item = {}
+    for field in fields:
+        if field == 'image_srcset':
+            item[field] = variants.srcset() if variants else None
+        elif field == 'thumbnail_url':
+            item[field] = (variants.thumbnail() if variants else None) or row['image_url']
+        elif field == 'image_metadata':
+            metadata = ImageMetadata.from_row(row, 'image_')
+            item[field] = metadata.to_dict() if metadata else None
+        elif field == 'created_at':
+            item[field] = datetime.fromisoformat(row['created_at']).isoformat() if row['created_at'] else None
+        elif field in ('popularity', 'view_count'):
+            item[field] = row[field] or 0
+        else:
+            item[field] = row[field]
+    return item
 
 
 class SQLiteUserRepository(UserRepository):
@@ -138,6 +239,7 @@ class SQLiteRoomRepository(RoomRepository):
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        _ensure_image_metadata_table(db_path)
     
     def _get_connection(self) -> sqlite3.Connection:
         """Get database connection"""
@@ -145,71 +247,51 @@ class SQLiteRoomRepository(RoomRepository):
         conn.row_factory = sqlite3.Row
         return conn
     
+    @staticmethod
+    def _row_to_room(row: sqlite3.Row) -> Room:
+        """Build a Room entity from a database row"""
+        keys = row.keys()
+        return Room(
+            name=MultilingualText(
+                fr=row['name_fr'] or "",
+                en=row['name_en'] or "",
+                wo=row['name_wo'] or ""
+            ),
+            description=MultilingualText(
+                fr=row['description_fr'] or "",
+                en=row['description_en'] or "",
+                wo=row['description_wo'] or ""
+            ),
+            theme=row['theme'] if 'theme' in keys else 'Art général',
+            accessibility_level=row['accessibility_level'] if 'accessibility_level' in keys else 'facile',
+            panorama_url=row['panorama_url'] if 'panorama_url' in keys else None,
+            hotspots=row['hotspots'] if 'hotspots' in keys else "[]",
+            has_audio=bool(row['has_audio']) if 'has_audio' in keys else False,
+            has_interactive=bool(row['has_interactive']) if 'has_interactive' in keys else False,
+            id=row['id'],
+            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+            panorama_variants=ImageVariants.from_json(row['panorama_variants']) if 'panorama_variants' in keys else None,
+            panorama_tiles=PanoramaTiles.from_json(row['panorama_tiles']) if 'panorama_tiles' in keys else None,
+            panorama_metadata=ImageMetadata.from_row(row, 'panorama_')
+        )
+    
     def get_by_id(self, room_id: int) -> Optional[Room]:
         """Get room by ID"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM rooms WHERE id = ?", (room_id,))
+            cursor.execute(f"{ROOM_SELECT} WHERE rooms.id = ?", (room_id,))
             row = cursor.fetchone()
             
-            if row:
-                name = MultilingualText(
-                    fr=row['name_fr'] or "",
-                    en=row['name_en'] or "",
-                    wo=row['name_wo'] or ""
-                )
-                description = MultilingualText(
-                    fr=row['description_fr'] or "",
-                    en=row['description_en'] or "",
-                    wo=row['description_wo'] or ""
-                )
-                accessibility_level = row['accessibility_level'] if 'accessibility_level' in row.keys() else 'facile'
-                theme = row['theme'] if 'theme' in row.keys() else 'Art général'
-                
-                return Room(
-                    name=name,
-                    description=description,
-                    theme=theme,
-                    accessibility_level=accessibility_level,
-                    panorama_url=row['panorama_url'] if 'panorama_url' in row.keys() else None,
-                    hotspots=row['hotspots'] if 'hotspots' in row.keys() else "[]",
-                    has_audio=bool(row['has_audio']) if 'has_audio' in row.keys() else False,
-                    has_interactive=bool(row['has_interactive']) if 'has_interactive' in row.keys() else False,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-            return None
+            return self._row_to_room(row) if row else None
     
     def get_all(self) -> List[Room]:
         """Get all rooms"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM rooms ORDER BY name_fr")
+            cursor.execute(f"{ROOM_SELECT} ORDER BY name_fr")
             rows = cursor.fetchall()
             
-            return [
-                Room(
-                    name=MultilingualText(
-                        fr=row['name_fr'] or "",
-                        en=row['name_en'] or "",
-                        wo=row['name_wo'] or ""
-                    ),
-                    description=MultilingualText(
-                        fr=row['description_fr'] or "",
-                        en=row['description_en'] or "",
-                        wo=row['description_wo'] or ""
-                    ),
-                    theme=row['theme'] if 'theme' in row.keys() else 'Art général',
-                    accessibility_level=row['accessibility_level'] if 'accessibility_level' in row.keys() else 'facile',
-                    panorama_url=row['panorama_url'] if 'panorama_url' in row.keys() else None,
-                    hotspots=row['hotspots'] if 'hotspots' in row.keys() else "[]",
-                    has_audio=bool(row['has_audio']) if 'has_audio' in row.keys() else False,
-                    has_interactive=bool(row['has_interactive']) if 'has_interactive' in row.keys() else False,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_room(row) for row in rows]
     
     def save(self, room: Room) -> Room:
         """Save or update room"""
@@ -258,7 +340,7 @@ class SQLiteRoomRepository(RoomRepository):
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
-            query = "SELECT * FROM rooms WHERE 1=1"
+            query = f"{ROOM_SELECT} WHERE 1=1"
             params = []
             
             # Adapter les critères au schéma existant
@@ -273,29 +355,52 @@ class SQLiteRoomRepository(RoomRepository):
             cursor.execute(query, params)
             rows = cursor.fetchall()
             
-            return [
-                Room(
-                    name=MultilingualText(
-                        fr=row['name_fr'] or "",
-                        en=row['name_en'] or "",
-                        wo=row['name_wo'] or ""
-                    ),
-                    description=MultilingualText(
-                        fr=row['description_fr'] or "",
-                        en=row['description_en'] or "",
-                        wo=row['description_wo'] or ""
-                    ),
-                    theme=row['theme'] if 'theme' in row.keys() else 'Art général',
-                    accessibility_level=row['accessibility_level'] if 'accessibility_level' in row.keys() else 'facile',
-                    panorama_url=row['panorama_url'] if 'panorama_url' in row.keys() else None,
-                    hotspots=row['hotspots'] if 'hotspots' in row.keys() else "[]",
-                    has_audio=bool(row['has_audio']) if 'has_audio' in row.keys() else False,
-                    has_interactive=bool(row['has_interactive']) if 'has_interactive' in row.keys() else False,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_room(row) for row in rows]
+    
+    def get_with_artworks(self, room_id: int, fields: Sequence[str], language: str = 'fr',
+                          room_artworks: bool = True, hotspot_artworks: bool = False
+                          ) -> Optional[Tuple[Room, List[Dict[str, Any]], Dict[int, Dict[str, Any]]]]:
+        """
+        Get a room with the given fields of its artworks and of the artworks its hotspots point at
+        
+        Both reads share one connection: the room row, then a single artworks
+        statement covering the room and the hotspot IDs (which may belong to
+        other rooms), projected as in SQLiteArtworkRepository.get_projected.
+        
+        Returns:
+            (room, its artworks by title, hotspot artworks by ID), or None if the room does not exist
+        """
+        with self._get_connection() as conn:
+            row = conn.execute(f"{ROOM_SELECT} WHERE rooms.id = ?", (room_id,)).fetchone()
+            if not row:
+                return None
+            room = self._row_to_room(row)
+            
+            conditions, params = [], [room_id]
+            if room_artworks:
+                conditions.append("artworks.room_id = ?")
+                params.append(room_id)
+            hotspot_ids = room.hotspot_artwork_ids if hotspot_artworks else []
+            if hotspot_ids:
+                conditions.append(f"artworks.id IN ({', '.join('?' * len(hotspot_ids))})")
+                params.extend(hotspot_ids)
+            if not conditions:
+                return room, [], {}
+            
+            columns, joins = _artwork_projection(fields, language)
+            rows = conn.execute(
+                f"SELECT {columns}, artworks.id AS _id, artworks.room_id = ? AS _in_room FROM artworks {joins} "
+                f"WHERE {' OR '.join(conditions)} ORDER BY artworks.title",
+                params
+            ).fetchall()
+        
+        artworks, by_id = [], {}
+        for artwork_row in rows:
+            artwork = _project_artwork(artwork_row, fields)
+            if room_artworks and artwork_row['_in_room']:
+                artworks.append(artwork)
+            by_id[artwork_row['_id']] = artwork
+        return room, artworks, {artwork_id: by_id[artwork_id] for artwork_id in hotspot_ids if artwork_id in by_id}
 
 
 class SQLiteArtworkRepository(ArtworkRepository):
@@ -303,6 +408,8 @@ class SQLiteArtworkRepository(ArtworkRepository):
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        _ensure_image_metadata_table(db_path)
+        _ensure_search_tables(db_path)
     
     def _get_connection(self) -> sqlite3.Connection:
         """Get database connection"""
@@ -310,164 +417,110 @@ class SQLiteArtworkRepository(ArtworkRepository):
         conn.row_factory = sqlite3.Row
         return conn
     
+    @staticmethod
+    def _row_to_artwork(row: sqlite3.Row) -> Artwork:
+        """Build an Artwork entity from a database row"""
+        keys = row.keys()
+        return Artwork(
+            title=row['title'],
+            description=MultilingualText(
+                fr=row['description_fr'],
+                en=row['description_en'],
+                wo=row['description_wo']
+            ),
+            category=row['category'],
+            period=row['period'],
+            origin=row['origin'],
+            room_id=row['room_id'],
+            image_url=row['image_url'],
+            audio_url=row['audio_url'],
+            video_url=row['video_url'],
+            qr_code_url=row['qr_code_url'],
+            popularity=row['popularity'] or 0,
+            view_count=row['view_count'] or 0,
+            id=row['id'],
+            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+            image_variants=ImageVariants.from_json(row['image_variants']) if 'image_variants' in keys else None,
+            image_metadata=ImageMetadata.from_row(row, 'image_')
+        )
+    
     def get_by_id(self, artwork_id: int) -> Optional[Artwork]:
         """Get artwork by ID"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM artworks WHERE id = ?", (artwork_id,))
+            cursor.execute(f"{ARTWORK_SELECT} WHERE artworks.id = ?", (artwork_id,))
             row = cursor.fetchone()
             
-            if row:
-                description = MultilingualText(
-                    fr=row['description_fr'],
-                    en=row['description_en'],
-                    wo=row['description_wo']
-                )
-                return Artwork(
-                    title=row['title'],
-                    description=description,
-                    category=row['category'],
-                    period=row['period'],
-                    origin=row['origin'],
-                    room_id=row['room_id'],
-                    image_url=row['image_url'],
-                    audio_url=row['audio_url'],
-                    video_url=row['video_url'],
-                    qr_code_url=row['qr_code_url'],
-                    popularity=row['popularity'] or 0,
-                    view_count=row['view_count'] or 0,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-            return None
+            return self._row_to_artwork(row) if row else None
+    
+    def get_by_ids(self, artwork_ids: List[int]) -> List[Artwork]:
+        """Get artworks by ID, in the order of the given IDs"""
+        artworks = {}
+        with self._get_connection() as conn:
+            # Lots bornés par la limite de paramètres SQLite
+            for start in range(0, len(artwork_ids), 500):
+                batch = artwork_ids[start:start + 500]
+                rows = conn.execute(
+                    f"{ARTWORK_SELECT} WHERE artworks.id IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                artworks.update((row['id'], self._row_to_artwork(row)) for row in rows)
+        return [artworks[artwork_id] for artwork_id in artwork_ids if artwork_id in artworks]
+    
+    def catalog_version(self) -> int:
+        """Counter bumped by the database on every write that can change search results"""
+        with self._get_connection() as conn:
+            return read_catalog_version(conn)
+    
+    def get_similar(self, artwork_id: int, limit: int) -> List[Tuple[Artwork, float]]:
+        """Get the precomputed most similar artworks with their similarity score"""
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM ({ARTWORK_SELECT}) AS neighbor "
+                "JOIN artwork_neighbors n ON n.neighbor_id = neighbor.id "
+                "WHERE n.artwork_id = ? ORDER BY n.rank LIMIT ?",
+                (artwork_id, limit)
+            ).fetchall()
+        return [(self._row_to_artwork(row), row['score']) for row in rows]
     
     def get_all(self) -> List[Artwork]:
         """Get all artworks"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM artworks ORDER BY title")
+            cursor.execute(f"{ARTWORK_SELECT} ORDER BY title")
             rows = cursor.fetchall()
             
-            return [
-                Artwork(
-                    title=row['title'],
-                    description=MultilingualText(
-                        fr=row['description_fr'],
-                        en=row['description_en'],
-                        wo=row['description_wo']
-                    ),
-                    category=row['category'],
-                    period=row['period'],
-                    origin=row['origin'],
-                    room_id=row['room_id'],
-                    image_url=row['image_url'],
-                    audio_url=row['audio_url'],
-                    video_url=row['video_url'],
-                    qr_code_url=row['qr_code_url'],
-                    popularity=row['popularity'] or 0,
-                    view_count=row['view_count'] or 0,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_artwork(row) for row in rows]
     
     def get_by_room_id(self, room_id: int) -> List[Artwork]:
         """Get all artworks in a specific room"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM artworks WHERE room_id = ? ORDER BY title", (room_id,))
+            cursor.execute(f"{ARTWORK_SELECT} WHERE room_id = ? ORDER BY title", (room_id,))
             rows = cursor.fetchall()
             
-            return [
-                Artwork(
-                    title=row['title'],
-                    description=MultilingualText(
-                        fr=row['description_fr'],
-                        en=row['description_en'],
-                        wo=row['description_wo']
-                    ),
-                    category=row['category'],
-                    period=row['period'],
-                    origin=row['origin'],
-                    room_id=row['room_id'],
-                    image_url=row['image_url'],
-                    audio_url=row['audio_url'],
-                    video_url=row['video_url'],
-                    qr_code_url=row['qr_code_url'],
-                    popularity=row['popularity'] or 0,
-                    view_count=row['view_count'] or 0,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_artwork(row) for row in rows]
     
     def get_by_category(self, category: str) -> List[Artwork]:
         """Get artworks by category"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM artworks WHERE category = ? ORDER BY title", (category,))
+            cursor.execute(f"{ARTWORK_SELECT} WHERE category = ? ORDER BY title", (category,))
             rows = cursor.fetchall()
             
-            return [
-                Artwork(
-                    title=row['title'],
-                    description=MultilingualText(
-                        fr=row['description_fr'],
-                        en=row['description_en'],
-                        wo=row['description_wo']
-                    ),
-                    category=row['category'],
-                    period=row['period'],
-                    origin=row['origin'],
-                    room_id=row['room_id'],
-                    image_url=row['image_url'],
-                    audio_url=row['audio_url'],
-                    video_url=row['video_url'],
-                    qr_code_url=row['qr_code_url'],
-                    popularity=row['popularity'] or 0,
-                    view_count=row['view_count'] or 0,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_artwork(row) for row in rows]
     
     def get_popular(self, limit: int = 10) -> List[Artwork]:
         """Get most popular artworks"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM artworks 
+            cursor.execute(f"""
+                {ARTWORK_SELECT}
                 ORDER BY popularity DESC, view_count DESC 
                 LIMIT ?
             """, (limit,))
             rows = cursor.fetchall()
             
-            return [
-                Artwork(
-                    title=row['title'],
-                    description=MultilingualText(
-                        fr=row['description_fr'],
-                        en=row['description_en'],
-                        wo=row['description_wo']
-                    ),
-                    category=row['category'],
-                    period=row['period'],
-                    origin=row['origin'],
-                    room_id=row['room_id'],
-                    image_url=row['image_url'],
-                    audio_url=row['audio_url'],
-                    video_url=row['video_url'],
-                    qr_code_url=row['qr_code_url'],
-                    popularity=row['popularity'] or 0,
-                    view_count=row['view_count'] or 0,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_artwork(row) for row in rows]
     
     def save(self, artwork: Artwork) -> Artwork:
         """Save or update artwork"""
@@ -513,57 +566,167 @@ class SQLiteArtworkRepository(ArtworkRepository):
             conn.commit()
             return cursor.rowcount > 0
     
+    @staticmethod
+    def _criteria_clause(criteria: Dict[str, Any], exclude: Optional[str] = None):
+        """
+        WHERE conditions (joined with AND) and parameters of the filters, without one field
+        
+        A list of values accepts any of them; has_audio / has_video test the media urls.
+        """
+        conditions = []
+        params = []
+        for field in FILTER_FIELDS:
+            if criteria.get(field) is None or field == exclude:
+                continue
+            value = criteria[field]
+            if field in ('has_audio', 'has_video'):
+                column = 'audio_url' if field == 'has_audio' else 'video_url'
+                conditions.append(f"COALESCE({column}, '') {'!=' if value else '='} ''")
+            elif isinstance(value, (list, tuple)):
+                conditions.append(f"{field} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                conditions.append(f"{field} = ?")
+                params.append(value)
+        return " AND ".join(conditions) or "1=1", params
+    
     def search(self, criteria: Dict[str, Any]) -> List[Artwork]:
-        """Search artworks by criteria"""
+        """
+        Search artworks by criteria
+        
+        The text query (search_text) is matched on the trigram index, so case,
+        accents and small misspellings are tolerated: best matches first, then
+        the most popular. Without text, artworks are ordered by popularity.
+        """
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
-            query = "SELECT * FROM artworks WHERE 1=1"
-            params = []
-            
-            if 'category' in criteria:
-                query += " AND category = ?"
-                params.append(criteria['category'])
-            
-            if 'period' in criteria:
-                query += " AND period = ?"
-                params.append(criteria['period'])
-            
-            if 'room_id' in criteria:
-                query += " AND room_id = ?"
-                params.append(criteria['room_id'])
-            
-            if 'search_text' in criteria:
-                query += " AND (title LIKE ? OR description_fr LIKE ? OR description_en LIKE ?)"
-                search_term = f"%{criteria['search_text']}%"
-                params.extend([search_term, search_term, search_term])
-            
-            cursor.execute(query, params)
+            clause, params = self._criteria_clause(criteria)
+            if criteria.get('search_text'):
+                cte, text_params = trigram_match_cte(criteria['search_text'])
+                cursor.execute(
+                    f"WITH {cte} {ARTWORK_SELECT} JOIN trigram_scores ts ON ts.artwork_id = artworks.id "
+                    f"WHERE {clause} ORDER BY ts.similarity DESC, popularity DESC, title",
+                    text_params + params
+                )
+            else:
+                cursor.execute(f"{ARTWORK_SELECT} WHERE {clause} ORDER BY popularity DESC, title", params)
             rows = cursor.fetchall()
             
-            return [
-                Artwork(
-                    title=row['title'],
-                    description=MultilingualText(
-                        fr=row['description_fr'],
-                        en=row['description_en'],
-                        wo=row['description_wo']
-                    ),
-                    category=row['category'],
-                    period=row['period'],
-                    origin=row['origin'],
-                    room_id=row['room_id'],
-                    image_url=row['image_url'],
-                    audio_url=row['audio_url'],
-                    video_url=row['video_url'],
-                    qr_code_url=row['qr_code_url'],
-                    popularity=row['popularity'] or 0,
-                    view_count=row['view_count'] or 0,
-                    id=row['id'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in rows
-            ]
+            return [self._row_to_artwork(row) for row in rows]
+    
+    def facet_counts(self, criteria: Dict[str, Any], facets=FACET_FIELDS) -> Dict[str, Dict[Any, int]]:
+        """
+        Number of matching artworks per value of each facet
+        
+        Counts of a facet ignore the filter on that same facet, so the
+        alternatives to the selected value are counted too. The rows matching
+        the text query are read once (materialized CTE) and grouped per facet
+        in a single statement.
+        """
+        facets = [facet for facet in facets if facet in FACET_FIELDS]
+        if not facets:
+            return {}
+        
+        columns = ', '.join(f"artworks.{field}" for field in (*FACET_FIELDS, 'audio_url', 'video_url'))
+        if criteria.get('search_text'):
+            cte, params = trigram_match_cte(criteria['search_text'])
+            matching = (f"WITH {cte}, matching AS MATERIALIZED (SELECT {columns} FROM artworks "
+                        f"JOIN trigram_scores ts ON ts.artwork_id = artworks.id) ")
+        else:
+            matching, params = f"WITH matching AS MATERIALIZED (SELECT {columns} FROM artworks) ", []
+        
+        branches = []
+        for facet in facets:
+            clause, facet_params = self._criteria_clause(criteria, exclude=facet)
+            branches.append(
+                f"SELECT '{facet}' AS facet, {facet} AS value, COUNT(*) AS count FROM matching "
+                f"WHERE {clause} AND {facet} IS NOT NULL GROUP BY {facet}"
+            )
+            params.extend(facet_params)
+        
+        counts: Dict[str, Dict[Any, int]] = {facet: {} for facet in facets}
+        with self._get_connection() as conn:
+            rows = conn.execute(matching + " UNION ALL ".join(branches), params).fetchall()
+        for row in rows:
+            counts[row['facet']][row['value']] = row['count']
+        return counts
+    
+    def _projected_query(self, fields: Sequence[str], language: str, criteria: Optional[Dict[str, Any]],
+                         order: str, limit: Optional[int] = None,
+                         ids: Optional[Sequence[int]] = None) -> Tuple[str, List[Any]]:
+        """Statement and parameters of a projected artwork list (raises ValueError on unknown fields)"""
+        if order not in _PROJECTION_ORDERS:
+            raise ValueError(f"Unknown order: {order}")
+        
+        columns, joins = _artwork_projection(fields, language)
+        clause, params = self._criteria_clause(criteria or {})
+        if ids is not None:
+            clause += f" AND artworks.id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        query = (f"SELECT {columns}, artworks.id AS _id FROM artworks {joins} "
+                 f"WHERE {clause} ORDER BY {_PROJECTION_ORDERS[order]}")
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, params
+    
+    def get_projected(self, fields: Sequence[str], language: str = 'fr', criteria: Optional[Dict[str, Any]] = None,
+                      order: str = 'title', limit: Optional[int] = None,
+                      ids: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Get only the given fields of the matching artworks, as dicts
+        
+        Only the columns behind the requested fields are read, and the rooms
+        and image metadata tables are joined only when a field needs them,
+        so a grid listing skips the descriptions and media urls entirely.
+        
+        Args:
+            fields: Fields from ARTWORK_PROJECTION_COLUMNS, in output order
+            language: Language of the description field (French when missing)
+            criteria: Filters, as for search() (without search_text)
+            order: 'title', 'popularity' or 'newest'
+            limit: Maximum number of artworks
+            ids: Only these artworks, returned in the order of the IDs (order is then ignored)
+        """
+        if ids is not None and not ids:
+            return []
+        query, params = self._projected_query(fields, language, criteria, order, limit, ids)
+        
+        with self._get_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if ids is None:
+            return [_project_artwork(row, fields) for row in rows]
+        artworks = {row['_id']: _project_artwork(row, fields) for row in rows}
+        return [artworks[artwork_id] for artwork_id in dict.fromkeys(ids) if artwork_id in artworks]
+    
+    def iter_projected(self, fields: Sequence[str], language: str = 'fr', criteria: Optional[Dict[str, Any]] = None,
+                       order: str = 'newest', batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the given fields of the matching artworks, batch_size rows at a time
+        
+        The statement is prepared (and the fields checked) before returning,
+        then the cursor is read with fetchmany, so memory does not grow with
+        the catalog. Prefer the 'newest' order (primary key scan): the other
+        orders sort every matching row before the first one is returned.
+        The connection is closed once the iterator is exhausted or closed.
+        """
+        query, params = self._projected_query(fields, language, criteria, order)
+        
+        def rows() -> Iterator[Dict[str, Any]]:
+            conn = self._get_connection()
+            try:
+                cursor = conn.execute(query, params)
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    for row in batch:
+                        yield _project_artwork(row, fields)
+            finally:
+                conn.close()
+        
+        return rows()
     
     def increment_view_count(self, artwork_id: int) -> bool:
         """Increment view count for artwork"""
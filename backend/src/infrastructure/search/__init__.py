@@ -0,0 +1,11 @@
+# Search infrastructure - Indexes over artworks and rooms
+from .analytics import SearchAnalytics
+from .bitmaps import ArtworkFilterIndex
+from .similarity import SimilarArtworksService, compute_similar_artworks
+from .suggestions import SuggestionIndex, SUGGEST_LANGUAGES
+from .text import normalize_text
+from .trigrams import TrigramIndex, TRIGRAM_FIELDS, trigrams, trigram_match_cte
+
+__all__ = ['SearchAnalytics', 'ArtworkFilterIndex', 'SimilarArtworksService', 'compute_similar_artworks',
+           'SuggestionIndex', 'SUGGEST_LANGUAGES', 'normalize_text',
+           'TrigramIndex', 'TRIGRAM_FIELDS', 'trigrams', 'trigram_match_cte']
@@ -0,0 +1,251 @@
+"""
+Search analytics: buffered search log with daily top-query and zero-result rollups
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from .text import normalize_text
+
+
+# Jours de journal détaillé conservés (les agrégats quotidiens sont gardés)
+SEARCH_LOG_RETENTION_DAYS = int(os.getenv('SEARCH_LOG_RETENTION_DAYS', 90))
+
+# Recherches gardées en mémoire au plus si la base est indisponible (les plus anciennes sont perdues)
+_MAX_PENDING = 50000
+
+
+SEARCH_ANALYTICS_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS search_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        searched_at REAL NOT NULL, -- timestamp Unix
+        query TEXT NOT NULL, -- texte normalisé ("" = filtres seuls)
+        filters TEXT NOT NULL, -- JSON trié
+        result_count INTEGER NOT NULL,
+        latency_ms REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_search_log_searched_at ON search_log (searched_at)",
+    """
+    CREATE TABLE IF NOT EXISTS search_daily (
+        day TEXT NOT NULL, -- AAAA-MM-JJ (UTC)
+        query TEXT NOT NULL,
+        filters TEXT NOT NULL,
+        searches INTEGER NOT NULL DEFAULT 0,
+        zero_results INTEGER NOT NULL DEFAULT 0,
+        total_results INTEGER NOT NULL DEFAULT 0,
+        total_latency_ms REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, query, filters)
+    )
+    """,
+)
+
+
+def ensure_search_analytics_tables(conn: sqlite3.Connection) -> None:
+    """Create the search log and its daily rollup"""
+    for statement in SEARCH_ANALYTICS_SCHEMA:
+        conn.execute(statement)
+
+
+def _day(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+
+class SearchAnalytics:
+    """
+    Records artwork searches without writing during the request
+
+    record() only appends to an in-memory queue. A background thread writes
+    the queue every few seconds (or sooner once enough searches are pending)
+    in one transaction: the raw rows go to search_log and the same batch is
+    added to the search_daily rollup (one row per day, query and filters),
+    which the reports read.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 5.0, flush_threshold: int = 200):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._pending: deque = deque(maxlen=_MAX_PENDING)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._pruned_day: Optional[str] = None
+
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            ensure_search_analytics_tables(conn)
+            conn.commit()
+
+    def start(self) -> None:
+        """Start the background flusher (once per process)"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='search-analytics', daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def record(self, query: Optional[str], filters: Dict[str, Any], result_count: int, latency_ms: float) -> None:
+        """Queue one search; it reaches the database with the next batch"""
+        entry = (
+            time.time(),
+            normalize_text(query or ''),
+            json.dumps(filters, sort_keys=True, ensure_ascii=False, default=str),
+            int(result_count),
+            round(latency_ms, 3)
+        )
+        with self._lock:
+            self._pending.append(entry)
+            pending = len(self._pending)
+        if pending == self.flush_threshold:
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def flush(self) -> int:
+        """Write the pending searches and their rollup in one transaction; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+                self._pending.clear()
+            if not batch:
+                return 0
+
+            rollup: Dict[tuple, List[float]] = {}
+            for searched_at, query, filters, result_count, latency_ms in batch:
+                totals = rollup.setdefault((_day(searched_at), query, filters), [0, 0, 0, 0.0])
+                totals[0] += 1
+                totals[1] += 1 if result_count == 0 else 0
+                totals[2] += result_count
+                totals[3] += latency_ms
+            try:
+                with self._get_connection() as conn:
+                    conn.executemany("""
+                        INSERT INTO search_log (searched_at, query, filters, result_count, latency_ms)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, batch)
+                    conn.executemany("""
+                        INSERT INTO search_daily (day, query, filters, searches, zero_results, total_results, total_latency_ms)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (day, query, filters) DO UPDATE SET
+                            searches = searches + excluded.searches,
+                            zero_results = zero_results + excluded.zero_results,
+                            total_results = total_results + excluded.total_results,
+                            total_latency_ms = total_latency_ms + excluded.total_latency_ms
+                    """, [(*key, *totals) for key, totals in rollup.items()])
+                    self._prune(conn)
+                    conn.commit()
+            except sqlite3.Error as e:
+                # Remettre les recherches en attente pour le prochain lot
+                with self._lock:
+                    self._pending.extendleft(reversed(batch))
+                print(f"DEBUG: Could not flush search log: {e}")
+                return 0
+            return len(batch)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop the detailed rows past the retention period (once a day)"""
+        today = _day(time.time())
+        if SEARCH_LOG_RETENTION_DAYS > 0 and self._pruned_day != today:
+            conn.execute("DELETE FROM search_log WHERE searched_at < ?",
+                         (time.time() - SEARCH_LOG_RETENTION_DAYS * 86400,))
+            self._pruned_day = today
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background flusher and write the last searches"""
+        self._stop.set()
+        self.flush()
+
+    # Rapports
+
+    @staticmethod
+    def _period(days: int, day: Optional[str]) -> tuple:
+        if day:
+            return day, day
+        end = datetime.now(timezone.utc).date()
+        return (end - timedelta(days=max(days, 1) - 1)).isoformat(), end.isoformat()
+
+    def top_queries(self, days: int = 7, limit: int = 20, day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Most frequent text queries over the last days (or one day), filters merged
+
+        Returns:
+            Period and queries with searches, zero-result searches, average results and latency
+        """
+        start, end = self._period(days, day)
+        with self._get_connection() as conn:
+            rows = conn.execute("""
+                SELECT query, SUM(searches) AS searches, SUM(zero_results) AS zero_results,
+                       SUM(total_results) AS total_results, SUM(total_latency_ms) AS total_latency_ms
+                FROM search_daily
+                WHERE day BETWEEN ? AND ? AND query != ''
+                GROUP BY query ORDER BY searches DESC, query LIMIT ?
+            """, (start, end, limit)).fetchall()
+        return {
+            'from': start,
+            'to': end,
+            'queries': [
+                {
+                    'query': row['query'],
+                    'searches': row['searches'],
+                    'zero_results': row['zero_results'],
+                    'avg_results': round(row['total_results'] / row['searches'], 2),
+                    'avg_latency_ms': round(row['total_latency_ms'] / row['searches'], 2)
+                }
+                for row in rows
+            ]
+        }
+
+    def zero_result_queries(self, days: int = 7, limit: int = 20, day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queries and filter combinations that found nothing over the last days (or one day)
+
+        Returns:
+            Period, share of searches without results, and the most frequent empty searches
+        """
+        start, end = self._period(days, day)
+        with self._get_connection() as conn:
+            totals = conn.execute("""
+                SELECT COALESCE(SUM(searches), 0) AS searches, COALESCE(SUM(zero_results), 0) AS zero_results
+                FROM search_daily WHERE day BETWEEN ? AND ?
+            """, (start, end)).fetchone()
+            rows = conn.execute("""
+                SELECT query, filters, SUM(zero_results) AS zero_results, MAX(day) AS last_day
+                FROM search_daily
+                WHERE day BETWEEN ? AND ? AND zero_results > 0
+                GROUP BY query, filters ORDER BY zero_results DESC, last_day DESC LIMIT ?
+            """, (start, end, limit)).fetchall()
+        return {
+            'from': start,
+            'to': end,
+            'searches': totals['searches'],
+            'zero_results': totals['zero_results'],
+            'zero_result_rate': round(totals['zero_results'] / totals['searches'], 3) if totals['searches'] else 0.0,
+            'queries': [
+                {
+                    'query': row['query'],
+                    'filters': json.loads(row['filters']),
+                    'zero_results': row['zero_results'],
+                    'last_day': row['last_day']
+                }
+                for row in rows
+            ]
+        }
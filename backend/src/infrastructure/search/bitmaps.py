@@ -0,0 +1,167 @@
+"""
+In-memory bitmap index of the artwork filters (category, period, origin, room, media)
+"""
+import heapq
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from ...domain.repositories.repository_interfaces import FACET_FIELDS, FILTER_FIELDS
+
+
+_ARTWORK_COLUMNS = "id, title, category, period, origin, room_id, audio_url, video_url, popularity"
+
+
+def _bits(bitmap: int) -> Iterable[int]:
+    """Positions of the set bits, lowest first"""
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+class ArtworkFilterIndex:
+    """
+    One bitmap of artworks per filter value, combined with AND/OR in memory
+
+    Each artwork gets a dense slot number (freed slots are reused) and every
+    value of every filter field keeps a Python int with the bits of its
+    artworks set, so a bitmap takes one bit per slot. A query ORs the bitmaps
+    of the accepted values of a field and ANDs the fields together; only the
+    matching artworks are then ranked by popularity. Writes re-read the
+    changed artwork and flip its bits.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._slots: Dict[int, int] = {}
+        self._ids: List[Optional[int]] = []
+        self._free: List[int] = []
+        self._values: Dict[int, Dict[str, Any]] = {}
+        self._rank: Dict[int, Tuple[int, str]] = {}
+        self._bitmaps: Dict[str, Dict[Any, int]] = {field: {} for field in FILTER_FIELDS}
+        self._all = 0
+        self._lock = threading.Lock()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def load(self) -> int:
+        """Build every bitmap from the database, returns the number of artworks"""
+        with self._get_connection() as conn:
+            rows = conn.execute(f"SELECT {_ARTWORK_COLUMNS} FROM artworks ORDER BY popularity DESC").fetchall()
+        with self._lock:
+            self._slots, self._ids, self._free, self._values, self._rank = {}, [], [], {}, {}
+            self._bitmaps = {field: {} for field in FILTER_FIELDS}
+            self._all = 0
+            for row in rows:
+                self._add(row)
+            return len(rows)
+
+    # Mises à jour incrémentales
+
+    @staticmethod
+    def _row_values(row) -> Dict[str, Any]:
+        values = {field: row[field] for field in FACET_FIELDS}
+        values['has_audio'] = bool(row['audio_url'])
+        values['has_video'] = bool(row['video_url'])
+        return values
+
+    def _add(self, row) -> None:
+        artwork_id = row['id']
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = artwork_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(artwork_id)
+        bit = 1 << slot
+
+        values = self._row_values(row)
+        for field, value in values.items():
+            if value is not None:
+                bitmaps = self._bitmaps[field]
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        self._slots[artwork_id] = slot
+        self._values[artwork_id] = values
+        self._rank[slot] = (-(row['popularity'] or 0), row['title'] or '')
+        self._all |= bit
+
+    def _drop(self, artwork_id: int) -> None:
+        slot = self._slots.pop(artwork_id, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        for field, value in self._values.pop(artwork_id).items():
+            bitmaps = self._bitmaps[field]
+            if value in bitmaps:
+                bitmaps[value] &= ~bit
+                if not bitmaps[value]:
+                    del bitmaps[value]
+        del self._rank[slot]
+        self._ids[slot] = None
+        self._free.append(slot)
+        self._all &= ~bit
+
+    def refresh_artwork(self, artwork_id: int) -> None:
+        """Re-index one artwork after it was created, updated or deleted"""
+        with self._get_connection() as conn:
+            row = conn.execute(f"SELECT {_ARTWORK_COLUMNS} FROM artworks WHERE id = ?", (artwork_id,)).fetchone()
+        with self._lock:
+            self._drop(artwork_id)
+            if row:
+                self._add(row)
+
+    def refresh_room(self, room_id: int) -> None:
+        """Drop the artworks of a deleted room"""
+        with self._lock:
+            bitmap = self._bitmaps['room_id'].get(room_id, 0)
+            for slot in list(_bits(bitmap)):
+                self._drop(self._ids[slot])
+
+    # Lecture
+
+    def _bitmap(self, filters: Mapping[str, Any]) -> int:
+        result = self._all
+        for field, accepted in filters.items():
+            if field not in self._bitmaps:
+                raise ValueError(f"Unknown filter: {field}")
+            if accepted is None:
+                continue
+            if not isinstance(accepted, (list, tuple, set, frozenset)):
+                accepted = (accepted,)
+            bitmaps = self._bitmaps[field]
+            union = 0
+            for value in accepted:
+                union |= bitmaps.get(value, 0)
+            result &= union
+            if not result:
+                break
+        return result
+
+    def query(self, filters: Mapping[str, Any], limit: Optional[int] = None,
+              offset: int = 0) -> Tuple[List[int], int]:
+        """
+        Artworks matching every field filter, most popular first
+
+        Args:
+            filters: Field -> accepted value, or list of accepted values (OR);
+                     fields are combined with AND, None values are ignored
+            limit: Maximum number of ids returned
+            offset: Number of ranked ids skipped
+
+        Returns:
+            (artwork ids, total number of matches)
+        """
+        with self._lock:
+            bitmap = self._bitmap(filters)
+            total = bitmap.bit_count()
+            rank = self._rank
+            if limit is not None and limit >= 0:
+                slots = heapq.nsmallest(offset + limit, _bits(bitmap), key=rank.__getitem__)[offset:]
+            else:
+                slots = sorted(_bits(bitmap), key=rank.__getitem__)[offset:]
+            return [self._ids[slot] for slot in slots], total
@@ -0,0 +1,43 @@
+"""
+Catalog version: a counter bumped by the database on every write that can change search results
+"""
+import sqlite3
+
+
+# Colonnes dont la modification change les résultats d'une recherche (pas view_count ni les médias affichés)
+SEARCHABLE_ARTWORK_COLUMNS = (
+    'title', 'description_fr', 'description_en', 'description_wo', 'category', 'period', 'origin',
+    'room_id', 'popularity', 'audio_url', 'video_url'
+)
+
+_BUMP = "UPDATE catalog_version SET version = version + 1 WHERE id = 1"
+
+CATALOG_VERSION_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)",
+    f"CREATE TRIGGER IF NOT EXISTS catalog_artwork_insert AFTER INSERT ON artworks BEGIN {_BUMP}; END",
+    f"CREATE TRIGGER IF NOT EXISTS catalog_artwork_delete AFTER DELETE ON artworks BEGIN {_BUMP}; END",
+    f"CREATE TRIGGER IF NOT EXISTS catalog_artwork_update AFTER UPDATE OF {', '.join(SEARCHABLE_ARTWORK_COLUMNS)} "
+    f"ON artworks BEGIN {_BUMP}; END",
+)
+
+
+def ensure_catalog_version(conn: sqlite3.Connection) -> None:
+    """Create the counter and the triggers that maintain it (the artworks table must exist)"""
+    for statement in CATALOG_VERSION_SCHEMA:
+        conn.execute(statement)
+
+
+def bump_catalog_version(conn: sqlite3.Connection) -> None:
+    """Mark the search results as changed (for search index writes, done after the artwork write)"""
+    conn.execute(_BUMP)
+
+
+def read_catalog_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,290 @@
+"""
+Precomputed similar artworks: TF-IDF over the descriptions plus category, period and origin
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..media.workers import submit_media_job
+from .text import normalize_text
+
+
+# Voisins gardés par œuvre et délai de regroupement des écritures avant recalcul (secondes)
+SIMILAR_TOP_K = int(os.getenv('SIMILAR_TOP_K', 12))
+SIMILAR_REFRESH_DELAY = float(os.getenv('SIMILAR_REFRESH_DELAY', 30))
+# Écritures continues : recalcul au plus tard ce délai après la première (secondes)
+SIMILAR_REFRESH_MAX_DELAY = float(os.getenv('SIMILAR_REFRESH_MAX_DELAY', 300))
+
+# Part de chaque caractéristique dans la similarité (somme = 1)
+SIMILARITY_WEIGHTS = {
+    'text': 0.6,
+    'category': 0.2,
+    'period': 0.1,
+    'origin': 0.1,
+}
+
+# Champs textuels vectorisés (TF-IDF sur l'ensemble des langues)
+SIMILARITY_TEXT_FIELDS = ('title', 'description_fr', 'description_en', 'description_wo')
+
+# Mots trop fréquents pour distinguer deux œuvres
+_STOPWORDS = frozenset("""
+    les des une est dans pour par sur avec qui que son ses aux ces cette ont
+    the and for with was are this that from its their which were has
+""".split())
+
+# Lignes de la matrice de similarité calculées à la fois, bornées par un nombre de cellules (mémoire bornée)
+_BLOCK_ROWS = 1024
+_BLOCK_CELLS = 4 * 1024 * 1024
+
+# Paires (terme d'une œuvre du bloc, œuvre contenant ce terme) développées à la fois
+_PAIR_CHUNK = 4 * 1024 * 1024
+
+SIMILARITY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS artwork_neighbors (
+        artwork_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        neighbor_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (artwork_id, rank)
+    ) WITHOUT ROWID
+"""
+
+
+def _tokens(text: str) -> List[str]:
+    return [word for word in normalize_text(text).split() if len(word) > 2 and word not in _STOPWORDS]
+
+
+def _tfidf_rows(counts: Sequence[Counter], document_frequency: Counter, vocabulary: Dict[str, int]):
+    """
+    L2-normalized TF-IDF vectors (sublinear tf) in CSR form
+
+    Only the non-zero weights are stored, so memory follows the number of
+    (artwork, term) pairs rather than artworks x vocabulary.
+
+    Returns:
+        (indptr, indices, data) arrays: the terms of row i are
+        indices[indptr[i]:indptr[i + 1]], with their weights in data
+    """
+    import numpy as np
+
+    n = len(counts)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indices = array('i')
+    data = array('f')
+    for row, document in enumerate(counts):
+        weights = {}
+        for term, count in document.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                idf = math.log((1 + n) / (1 + document_frequency[term])) + 1
+                weights[column] = (1 + math.log(count)) * idf
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        for column in sorted(weights):
+            indices.append(column)
+            data.append(weights[column] / norm)
+        indptr[row + 1] = len(indices)
+    return indptr, np.frombuffer(indices, dtype=np.int32), np.frombuffer(data, dtype=np.float32)
+
+
+def _text_scores(start: int, stop: int, rows, postings, n: int):
+    """
+    Cosine of the text vectors of rows start..stop against every artwork
+
+    Sparse product through the inverted index: each term of a row of the
+    block adds its weight times the weight of every artwork containing it.
+    The (row, artwork) pairs are expanded _PAIR_CHUNK at a time.
+    """
+    import numpy as np
+
+    indptr, indices, data = rows
+    term_ptr, posting_rows, posting_data = postings
+    scores = np.zeros((stop - start) * n, dtype=np.float32)
+
+    lo, hi = indptr[start], indptr[stop]
+    entry_rows = np.repeat(np.arange(stop - start, dtype=np.int64), np.diff(indptr[start:stop + 1]))
+    entry_terms = indices[lo:hi]
+    entry_data = data[lo:hi]
+    lengths = term_ptr[entry_terms + 1] - term_ptr[entry_terms]
+    ends = np.cumsum(lengths)
+
+    first = 0
+    while first < len(entry_terms):
+        done = ends[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(ends, done + _PAIR_CHUNK, side='right')))
+        chunk_lengths = lengths[first:last]
+        # Position de chaque paire dans les listes d'œuvres de son terme
+        positions = (np.repeat(term_ptr[entry_terms[first:last]] - (np.cumsum(chunk_lengths) - chunk_lengths),
+                               chunk_lengths)
+                     + np.arange(chunk_lengths.sum()))
+        targets = np.repeat(entry_rows[first:last], chunk_lengths) * n + posting_rows[positions]
+        weights = np.repeat(entry_data[first:last], chunk_lengths) * posting_data[positions]
+        scores += np.bincount(targets, weights=weights, minlength=scores.size).astype(np.float32)
+        first = last
+    return scores.reshape(stop - start, n)
+
+
+def compute_similar_artworks(artworks: Sequence[Dict[str, object]],
+                             k: int = SIMILAR_TOP_K) -> List[Tuple[int, int, int, float]]:
+    """
+    Top-k most similar artworks of every artwork (runs in a worker process)
+
+    Text vectors are L2-normalized TF-IDF (sublinear tf) over the title and
+    the three descriptions, keeping the terms shared by at least two
+    artworks and stored sparse; their cosine is combined with the equality
+    of category, period and origin using SIMILARITY_WEIGHTS. The similarity
+    matrix is computed by blocks of rows of at most _BLOCK_CELLS cells.
+
+    Args:
+        artworks: Dicts with id, title, descriptions, category, period and origin
+
+    Returns:
+        (artwork_id, rank, neighbor_id, score) rows, best neighbor first
+    """
+    import numpy as np
+
+    n = len(artworks)
+    if n < 2:
+        return []
+    ids = np.array([artwork['id'] for artwork in artworks])
+
+    # Vocabulaire : termes présents dans au moins deux œuvres (les autres ne rapprochent rien)
+    counts = [Counter(token for field in SIMILARITY_TEXT_FIELDS for token in _tokens(artwork.get(field) or ''))
+              for artwork in artworks]
+    document_frequency = Counter(term for document in counts for term in document)
+    vocabulary = {term: index for index, term in enumerate(
+        sorted(term for term, frequency in document_frequency.items() if frequency > 1)
+    )}
+
+    rows = _tfidf_rows(counts, document_frequency, vocabulary)
+    del counts, document_frequency
+    # Index inversé (CSC) : œuvres contenant chaque terme, avec leur poids
+    indptr, indices, data = rows
+    order = np.argsort(indices, kind='stable')
+    term_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=len(vocabulary)), out=term_ptr[1:])
+    postings = (term_ptr, np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))[order], data[order])
+
+    # Codes entiers des valeurs catégorielles (-1 = absente)
+    codes = {}
+    for field in ('category', 'period', 'origin'):
+        values = [normalize_text(artwork.get(field) or '') for artwork in artworks]
+        index = {value: code for code, value in enumerate(sorted(set(values) - {''}))}
+        codes[field] = np.array([index.get(value, -1) for value in values])
+
+    k = min(k, n - 1)
+    block_rows = max(1, min(_BLOCK_ROWS, _BLOCK_CELLS // n))
+    neighbors = []
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        scores = _text_scores(start, stop, rows, postings, n)
+        scores *= SIMILARITY_WEIGHTS['text']
+        for field, field_codes in codes.items():
+            block = field_codes[start:stop, None]
+            scores += SIMILARITY_WEIGHTS[field] * ((block == field_codes[None, :]) & (block >= 0))
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for offset in range(stop - start):
+            rank = 0
+            for neighbor, score in zip(top[offset], top_scores[offset]):
+                if score <= 0:
+                    break
+                neighbors.append((int(ids[start + offset]), rank, int(ids[neighbor]), round(float(score), 4)))
+                rank += 1
+    return neighbors
+
+
+class SimilarArtworksService:
+    """
+    Keeps the artwork_neighbors table up to date in the background
+
+    Artwork writes only call schedule(), which restarts the refresh delay:
+    the computation starts once no write happened for that delay (or, under
+    continuous writes, max_delay after the first one). The neighbors of
+    every artwork are then recomputed
+    on the media process pool (document frequencies are global, so one
+    new description can change any neighbor list) and replaced in one
+    transaction. Reading the neighbors of an artwork is a primary key
+    range read, done by the artwork repository.
+    """
+
+    def __init__(self, db_path: str, k: int = SIMILAR_TOP_K, delay: float = SIMILAR_REFRESH_DELAY,
+                 max_delay: float = SIMILAR_REFRESH_MAX_DELAY):
+        self.db_path = db_path
+        self.k = k
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self._timer: Optional[threading.Timer] = None
+        self._pending_since = 0.0
+        self._lock = threading.Lock()
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute(SIMILARITY_SCHEMA)
+            conn.commit()
+
+    def _artworks(self) -> List[Dict[str, object]]:
+        columns = ', '.join(('id', 'category', 'period', 'origin', *SIMILARITY_TEXT_FIELDS))
+        with self._get_connection() as conn:
+            return [dict(row) for row in conn.execute(f"SELECT {columns} FROM artworks ORDER BY id")]
+
+    def _store(self, rows: List[Tuple[int, int, int, float]]) -> None:
+        with self._get_connection() as conn:
+            conn.execute("DELETE FROM artwork_neighbors")
+            conn.executemany(
+                "INSERT INTO artwork_neighbors (artwork_id, rank, neighbor_id, score) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.commit()
+        print(f"DEBUG: Similar artworks refreshed ({len(rows)} neighbors)")
+
+    def refresh(self) -> int:
+        """Recompute every neighbor list now, in the calling process; returns the number of rows"""
+        rows = compute_similar_artworks(self._artworks(), self.k)
+        self._store(rows)
+        return len(rows)
+
+    def _submit(self) -> None:
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return  # remplacé par un timer plus récent pendant son déclenchement
+            self._timer = None
+        submit_media_job(compute_similar_artworks, self._artworks(), self.k, on_done=self._store)
+
+    def schedule(self) -> None:
+        """Recompute the neighbors in the background once writes have settled for the refresh delay"""
+        with self._lock:
+            now = time.monotonic()
+            if self._timer is None:
+                self._pending_since = now
+            else:
+                self._timer.cancel()
+            delay = min(self.delay, max(0.0, self._pending_since + self.max_delay - now))
+            self._timer = threading.Timer(delay, self._submit)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def ensure_computed(self) -> None:
+        """Schedule a first computation when artworks exist but no neighbors were stored yet"""
+        with self._get_connection() as conn:
+            missing = conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM artworks) AND NOT EXISTS (SELECT 1 FROM artwork_neighbors)"
+            ).fetchone()[0]
+        if missing:
+            self.schedule()
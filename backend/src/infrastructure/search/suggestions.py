@@ -0,0 +1,228 @@
+"""
+Search-as-you-type suggestions from an in-memory sorted prefix index
+"""
+import heapq
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .text import normalize_text
+
+
+SUGGEST_LANGUAGES = ('fr', 'en', 'wo')
+
+# Dernier caractère possible : borne haute de l'intervalle d'un préfixe
+_PREFIX_END = '\uffff'
+
+# Entrée de l'index : (clé normalisée, type, référence, langue ('' = toutes))
+Entry = Tuple[str, str, object, str]
+
+
+def _word_keys(text: str) -> List[str]:
+    """Normalized text from the start of each of its words, so "masque" also finds "Grand masque" """
+    normalized = normalize_text(text)
+    if not normalized:
+        return []
+    keys = [normalized]
+    position = normalized.find(' ')
+    while position != -1:
+        keys.append(normalized[position + 1:])
+        position = normalized.find(' ', position + 1)
+    return keys
+
+
+class SuggestionIndex:
+    """
+    Prefix index over artwork titles, origins, categories and room names
+
+    Every word start of a normalized label is a key of one sorted list, so
+    the suggestions of a prefix are a contiguous slice found by binary
+    search. Writes re-read only the changed artwork or room and insert or
+    remove its keys in place; origins and categories stay indexed while at
+    least one artwork uses them.
+
+    Suggestions are ranked by popularity: the artwork's own, the sum over
+    its artworks for an origin, a category or a room.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._entries: List[Entry] = []
+        self._labels: Dict[Tuple[str, object], object] = {}
+        self._artworks: Dict[int, Tuple[str, Optional[str], Optional[str], Optional[int], int]] = {}
+        self._rooms: Dict[int, Dict[str, str]] = {}
+        self._usage: Counter = Counter()
+        self._popularity: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def load(self) -> int:
+        """Build the whole index from the database, returns the number of keys"""
+        with self._get_connection() as conn:
+            rooms = conn.execute("SELECT id, name_fr, name_en, name_wo FROM rooms").fetchall()
+            artworks = conn.execute(
+                "SELECT id, title, category, origin, room_id, popularity FROM artworks"
+            ).fetchall()
+
+        with self._lock:
+            self._entries, self._labels, self._artworks, self._rooms = [], {}, {}, {}
+            self._usage.clear()
+            self._popularity.clear()
+            for row in rooms:
+                self._add_room(row, sort=False)
+            for row in artworks:
+                self._add_artwork(row, sort=False)
+            self._entries.sort()
+            return len(self._entries)
+
+    # Mises à jour incrémentales
+
+    def _insert(self, entries: Iterable[Entry], sort: bool) -> None:
+        if sort:
+            for entry in entries:
+                insort(self._entries, entry)
+        else:
+            self._entries.extend(entries)
+
+    def _remove(self, entries: Iterable[Entry]) -> None:
+        for entry in entries:
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    @staticmethod
+    def _label_entries(kind: str, ref: object, label: str, language: str = '') -> List[Entry]:
+        return [(key, kind, ref, language) for key in dict.fromkeys(_word_keys(label))]
+
+    def _add_artwork(self, row, sort: bool = True) -> None:
+        artwork_id = row['id']
+        record = (row['title'] or '', row['category'], row['origin'], row['room_id'], row['popularity'] or 0)
+        title, category, origin, room_id, popularity = record
+        self._artworks[artwork_id] = record
+        self._labels[('artwork', artwork_id)] = title
+        self._popularity[('artwork', artwork_id)] = popularity
+        self._popularity[('room', room_id)] += popularity
+
+        entries = self._label_entries('artwork', artwork_id, title)
+        for kind, value in (('category', category), ('origin', origin)):
+            if not value:
+                continue
+            self._usage[(kind, value)] += 1
+            self._popularity[(kind, value)] += popularity
+            if self._usage[(kind, value)] == 1:
+                self._labels[(kind, value)] = value
+                entries.extend(self._label_entries(kind, value, value))
+        self._insert(entries, sort)
+
+    def _drop_artwork(self, artwork_id: int) -> None:
+        record = self._artworks.pop(artwork_id, None)
+        if record is None:
+            return
+        title, category, origin, room_id, popularity = record
+        del self._labels[('artwork', artwork_id)]
+        del self._popularity[('artwork', artwork_id)]
+        self._popularity[('room', room_id)] -= popularity
+
+        entries = self._label_entries('artwork', artwork_id, title)
+        for kind, value in (('category', category), ('origin', origin)):
+            if not value:
+                continue
+            self._usage[(kind, value)] -= 1
+            self._popularity[(kind, value)] -= popularity
+            if self._usage[(kind, value)] <= 0:
+                del self._usage[(kind, value)], self._popularity[(kind, value)], self._labels[(kind, value)]
+                entries.extend(self._label_entries(kind, value, value))
+        self._remove(entries)
+
+    def _add_room(self, row, sort: bool = True) -> None:
+        room_id = row['id']
+        names = {language: row[f'name_{language}'] or row['name_fr'] or '' for language in SUGGEST_LANGUAGES}
+        self._rooms[room_id] = names
+        self._labels[('room', room_id)] = names
+        entries = []
+        for language, name in names.items():
+            entries.extend(self._label_entries('room', room_id, name, language))
+        self._insert(entries, sort)
+
+    def _drop_room(self, room_id: int) -> None:
+        names = self._rooms.pop(room_id, None)
+        if names is None:
+            return
+        del self._labels[('room', room_id)]
+        entries = []
+        for language, name in names.items():
+            entries.extend(self._label_entries('room', room_id, name, language))
+        self._remove(entries)
+
+    def refresh_artwork(self, artwork_id: int) -> None:
+        """Re-index one artwork after it was created, updated or deleted"""
+        with self._get_connection() as conn:
+            row = conn.execute(
+                "SELECT id, title, category, origin, room_id, popularity FROM artworks WHERE id = ?", (artwork_id,)
+            ).fetchone()
+        with self._lock:
+            self._drop_artwork(artwork_id)
+            if row:
+                self._add_artwork(row)
+
+    def refresh_room(self, room_id: int) -> None:
+        """Re-index one room after it was created, updated or deleted (with its artworks)"""
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT id, name_fr, name_en, name_wo FROM rooms WHERE id = ?", (room_id,)).fetchone()
+        with self._lock:
+            self._drop_room(room_id)
+            if row:
+                self._add_room(row)
+            else:
+                # Les œuvres d'une salle supprimée sont supprimées avec elle
+                for artwork_id in [key for key, record in self._artworks.items() if record[3] == room_id]:
+                    self._drop_artwork(artwork_id)
+                self._popularity.pop(('room', room_id), None)
+
+    # Lecture
+
+    def suggest(self, query: str, language: str = 'fr', limit: int = 8) -> List[Dict[str, object]]:
+        """
+        Most popular artworks, origins, categories and rooms with a word starting with the query
+
+        Args:
+            query: Typed text (case and accents are ignored)
+            language: Language of the room names
+            limit: Maximum number of suggestions
+        """
+        prefix = normalize_text(query)
+        if not prefix or limit <= 0:
+            return []
+        if language not in SUGGEST_LANGUAGES:
+            language = 'fr'
+
+        with self._lock:
+            start = bisect_left(self._entries, (prefix,))
+            end = bisect_left(self._entries, (prefix + _PREFIX_END,), start)
+            matches = {
+                (kind, ref) for _, kind, ref, entry_language in self._entries[start:end]
+                if entry_language in ('', language)
+            }
+            text = {
+                match: self._labels[match][language] if match[0] == 'room' else self._labels[match]
+                for match in matches
+            }
+            best = heapq.nsmallest(limit, matches, key=lambda match: (-self._popularity[match], text[match], match[0]))
+            suggestions = []
+            for kind, ref in best:
+                suggestion = {
+                    'text': text[(kind, ref)],
+                    'type': kind,
+                    'popularity': self._popularity[(kind, ref)]
+                }
+                if kind in ('artwork', 'room'):
+                    suggestion['id'] = ref
+                suggestions.append(suggestion)
+            return suggestions
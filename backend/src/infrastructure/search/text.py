@@ -0,0 +1,24 @@
+"""
+Text normalization shared by the search indexes
+"""
+import re
+import unicodedata
+
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+# Ligatures que la décomposition Unicode ne sépare pas
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ŋ': 'n', 'ɓ': 'b', 'ɗ': 'd'})
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, accent-free form of a text with single spaces between words
+
+    "Côte d’Ivoire" and "cote d'ivoire" both become "cote d ivoire".
+    """
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text.casefold().translate(_LIGATURES))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALPHANUMERIC.sub(' ', stripped).strip()
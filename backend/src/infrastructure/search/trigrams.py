@@ -0,0 +1,164 @@
+"""
+Accent-insensitive, typo-tolerant artwork text matching with a trigram index table
+"""
+import os
+import sqlite3
+from typing import Iterable, List, Set, Tuple
+
+from .catalog import bump_catalog_version, ensure_catalog_version
+from .text import normalize_text
+
+
+# Champs indexés et poids de leur similarité (un titre compte plus qu'une description)
+TRIGRAM_FIELDS = {
+    'title': 1.0,
+    'origin': 1.0,
+    'description_fr': 0.8,
+    'description_en': 0.8,
+    'description_wo': 0.8,
+}
+
+# Part minimale (pondérée) des trigrammes de la requête présents dans un champ
+SEARCH_MIN_SIMILARITY = float(os.getenv('SEARCH_MIN_SIMILARITY', 0.5))
+
+TRIGRAM_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS artwork_trigrams (
+        trigram TEXT NOT NULL,
+        artwork_id INTEGER NOT NULL,
+        field TEXT NOT NULL,
+        PRIMARY KEY (trigram, artwork_id, field)
+    ) WITHOUT ROWID
+"""
+TRIGRAM_ARTWORK_INDEX = "CREATE INDEX IF NOT EXISTS idx_artwork_trigrams_artwork ON artwork_trigrams (artwork_id)"
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Trigrams of the normalized words of a text
+
+    Each word is padded with two spaces in front and one behind, so word
+    starts weigh more and "baoule" shares every trigram with "Baoulé".
+    """
+    result = set()
+    for word in normalize_text(text).split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def trigram_match_cte(query: str, min_similarity: float = SEARCH_MIN_SIMILARITY) -> Tuple[str, list]:
+    """
+    CTE "trigram_scores (artwork_id, similarity)" of the artworks matching a text query
+
+    The similarity of a field is the share of the query's trigrams found in
+    it, times the field weight; an artwork scores its best field. Only the
+    index rows of the query's trigrams are read (primary key lookups).
+
+    Returns:
+        (SQL of the CTE, parameters); the CTE is empty when the query has no word
+    """
+    query_trigrams = sorted(trigrams(query))
+    if not query_trigrams:
+        return "trigram_scores (artwork_id, similarity) AS (SELECT NULL, NULL WHERE 0)", []
+
+    weight = "CASE field " + " ".join(
+        f"WHEN '{field}' THEN {field_weight}" for field, field_weight in TRIGRAM_FIELDS.items()
+    ) + " ELSE 0 END"
+    placeholders = ", ".join("?" * len(query_trigrams))
+    sql = f"""
+        trigram_scores (artwork_id, similarity) AS (
+            SELECT artwork_id, MAX(shared * {weight}) / ? FROM (
+                SELECT artwork_id, field, COUNT(*) AS shared FROM artwork_trigrams
+                WHERE trigram IN ({placeholders}) GROUP BY artwork_id, field
+            ) GROUP BY artwork_id HAVING MAX(shared * {weight}) / ? >= ?
+        )
+    """
+    count = float(len(query_trigrams))
+    return sql, [count, *query_trigrams, count, min_similarity]
+
+
+class TrigramIndex:
+    """
+    Maintains the artwork_trigrams table used by the artwork search
+
+    Each artwork's title, origin and descriptions are normalized (case,
+    accents, punctuation) and split into word trigrams, one row per
+    (trigram, artwork, field). Writes re-index only the changed artwork.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get database connection"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._get_connection() as conn:
+            conn.execute(TRIGRAM_SCHEMA)
+            conn.execute(TRIGRAM_ARTWORK_INDEX)
+            ensure_catalog_version(conn)
+            conn.commit()
+
+    @staticmethod
+    def _rows(artwork) -> List[Tuple[str, int, str]]:
+        return [
+            (trigram, artwork['id'], field)
+            for field in TRIGRAM_FIELDS
+            for trigram in trigrams(artwork[field] or '')
+        ]
+
+    def _reindex(self, conn: sqlite3.Connection, artwork_ids: Iterable[int]) -> int:
+        artwork_ids = list(artwork_ids)
+        columns = ', '.join(('id', *TRIGRAM_FIELDS))
+        indexed = 0
+        # Lots bornés par la limite de paramètres SQLite
+        for start in range(0, len(artwork_ids), 500):
+            batch = artwork_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(batch))
+            conn.execute(f"DELETE FROM artwork_trigrams WHERE artwork_id IN ({placeholders})", batch)
+            artworks = conn.execute(f"SELECT {columns} FROM artworks WHERE id IN ({placeholders})", batch).fetchall()
+            for artwork in artworks:
+                conn.executemany("INSERT OR IGNORE INTO artwork_trigrams VALUES (?, ?, ?)", self._rows(artwork))
+            indexed += len(artworks)
+        if artwork_ids:
+            # Les recherches mises en cache entre l'écriture de l'œuvre et sa réindexation sont périmées
+            bump_catalog_version(conn)
+        return indexed
+
+    def index_artwork(self, artwork_id: int) -> None:
+        """Re-index one artwork after it was created or updated (removes it if deleted)"""
+        with self._get_connection() as conn:
+            self._reindex(conn, [artwork_id])
+            conn.commit()
+
+    def purge(self) -> int:
+        """Remove the rows of deleted artworks (e.g. after a room and its artworks were deleted)"""
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM artwork_trigrams WHERE artwork_id NOT IN (SELECT id FROM artworks)"
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def sync(self, force: bool = False) -> int:
+        """
+        Index the artworks missing from the table (all of them with force)
+
+        Returns:
+            Number of artworks indexed
+        """
+        with self._get_connection() as conn:
+            if force:
+                artwork_ids = [row['id'] for row in conn.execute("SELECT id FROM artworks")]
+            else:
+                artwork_ids = [row['id'] for row in conn.execute(
+                    "SELECT id FROM artworks WHERE id NOT IN (SELECT DISTINCT artwork_id FROM artwork_trigrams)"
+                )]
+            indexed = self._reindex(conn, artwork_ids)
+            conn.execute("DELETE FROM artwork_trigrams WHERE artwork_id NOT IN (SELECT id FROM artworks)")
+            conn.commit()
+        return indexed
@@ -0,0 +1,69 @@
+"""
+Streaming exports of the artwork catalog (NDJSON / CSV)
+"""
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+
+# Format -> type MIME de l'export
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Taille des morceaux envoyés : assez gros pour limiter les écritures réseau et les flushs de compression
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _csv_cell(value: Any) -> Any:
+    """Nested values (srcset, metadata) as JSON, None as an empty cell"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return '' if value is None else value
+
+
+def encode_export(rows: Iterable[Dict[str, Any]], fields: Sequence[str], fmt: str) -> Iterator[bytes]:
+    """
+    Encode artwork dicts as NDJSON or CSV, in UTF-8 chunks of about EXPORT_CHUNK_SIZE
+
+    Lines are written to a small text buffer that is sent and emptied once
+    it reaches the chunk size, so memory stays constant whatever the number
+    of rows. The CSV columns are the keys of the first row (the fields when
+    there is none), preceded by a BOM so spreadsheets read the accents.
+
+    Args:
+        rows: Artwork dicts, all with the same keys
+        fields: Columns of an empty CSV export
+        fmt: 'ndjson' or 'csv'
+    """
+    if fmt not in EXPORT_MIMETYPES:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        buffer.write('\ufeff')
+        writer = csv.writer(buffer)
+
+    for row in rows:
+        if fmt == 'ndjson':
+            buffer.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+            buffer.write('\n')
+        else:
+            if fields is not None:
+                # En-tête sur les clés réelles (l'ID est ajouté par le service)
+                writer.writerow(row.keys())
+                fields = None
+            writer.writerow([_csv_cell(value) for value in row.values()])
+
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if writer and fields is not None:
+        writer.writerow(fields)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,75 @@
+"""
+Compression of API responses (gzip / brotli)
+"""
+import os
+from typing import List
+
+from flask import Flask, Response, request
+
+from ..infrastructure.media.precompress import available_encodings, compress_bytes
+
+
+# Taille minimale d'une réponse compressée : en dessous, le gain ne couvre pas l'en-tête
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+# Niveaux rapides : la compression est payée à chaque requête
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/geo+json', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/html', 'text/plain', 'text/css', 'text/csv', 'text/xml',
+}
+
+
+def accepted_encodings() -> List[str]:
+    """Content codings available here that the client accepts, best first"""
+    accepted = [encoding for encoding in available_encodings() if request.accept_encodings[encoding]]
+    # Tri stable : à qualité égale, brotli reste devant gzip
+    return sorted(accepted, key=lambda encoding: -request.accept_encodings[encoding])
+
+
+def negotiate_encoding() -> str:
+    """Best content coding the client accepts, or '' for identity"""
+    return next(iter(accepted_encodings()), '')
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a buffered response when the client accepts it
+
+    Files (direct passthrough), streamed bodies, partial content and
+    responses that already carry a Content-Encoding are left untouched.
+    """
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code in (204, 206)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.cache_control.no_transform):
+        return response
+
+    # La représentation dépend d'Accept-Encoding même quand elle n'est pas compressée
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    level = COMPRESS_BROTLI_QUALITY if encoding == 'br' else COMPRESS_GZIP_LEVEL
+    compressed = compress_bytes(data, encoding, level)
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Compress the JSON and text responses of an application"""
+    app.after_request(compress_response)
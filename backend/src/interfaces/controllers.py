@@ -2,18 +2,39 @@
 Flask controllers using DDD architecture
 """
 import os
+import threading
 from time import time
-from flask import Blueprint, request, jsonify, current_app
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify, current_app, g, send_file, stream_with_context, redirect
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
 from typing import Dict, Any
 
 from database import get_connection
 
 from ..application import UserApplicationService, RoomApplicationService, ArtworkApplicationService
-from ..infrastructure import SQLiteUserRepository, SQLiteRoomRepository, SQLiteArtworkRepository
+from ..application.dtos import ViewArtworkRequest, ArtworkSearchRequest
+from ..domain.repositories.repository_interfaces import (
+    FACET_FIELDS, ARTWORK_FIELDS, ARTWORK_PROJECTION_FIELDS, ARTWORK_SUMMARY_FIELDS
+)
+from ..infrastructure import (
+    SQLiteUserRepository, SQLiteRoomRepository, SQLiteArtworkRepository,
+    QRCodeRegenerationService, OnDemandQRCodeRenderer, QRSheetRenderer, ShortLinkService, DiskLRUCache,
+    ChunkedUploadService, MediaBlobStore, ImageDerivativeService, PanoramaTileService,
+    OnDemandImageResizer, MediaGarbageCollector, ImageMetadataService, SuggestionIndex, TrigramIndex,
+    ArtworkFilterIndex, SimilarArtworksService, SearchAnalytics
+)
+from ..infrastructure.qr import SHEET_FORMATS, qr_filename
+from ..infrastructure.cache import SearchResultCache
+from ..infrastructure.search.similarity import SIMILAR_TOP_K
+from ..infrastructure.media.precompress import compress_chunks
+from ..infrastructure.media import UploadNotFound, UploadOffsetMismatch, UploadTooLarge, UnsupportedMediaType
+from ..domain.services.qr_code_service import QRCodeService
+from .media_files import MediaFileServer
+from .compression import accepted_encodings, negotiate_encoding, COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY
+from .catalog_export import EXPORT_MIMETYPES, encode_export
+from .upload_validation import validated_uploads
 
 
-import qrcode
 import os
 import time 
 from dotenv import load_dotenv
@@ -27,6 +48,13 @@ FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://127.0.0.1:3000')
 JWT_SECRET = os.getenv('JWT_SECRET_KEY', 'votre-clé-secrète-très-sécurisée')
 
 QR_FOLDER = os.path.join("static", "qrcodes")
+
+# Représentation des œuvres dans la liste d'administration (les trois descriptions)
+ADMIN_ARTWORK_FIELDS = (
+    'id', 'title', 'description_fr', 'description_en', 'description_wo', 'category', 'period', 'origin',
+    'room_id', 'room_name', 'image_url', 'audio_url', 'video_url', 'qr_code_url', 'popularity',
+    'view_count', 'created_at'
+)
 IMAGES_FOLDER = os.path.join("static", "images")
 AUDIO_FOLDER = os.path.join("static", "audios")
 VIDEOS_FOLDER = os.path.join("static", "videos")
@@ -35,6 +63,28 @@ os.makedirs(IMAGES_FOLDER, exist_ok=True)
 os.makedirs(AUDIO_FOLDER, exist_ok=True)
 os.makedirs(VIDEOS_FOLDER, exist_ok=True)
 
+# Cache disque des QR codes rendus à la demande
+CACHE_FOLDER = os.getenv('CACHE_FOLDER', 'cache')
+QR_CACHE_MAX_BYTES = int(os.getenv('QR_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Uploads par morceaux (doit être sur le même disque que static/ pour un déplacement atomique)
+UPLOAD_TMP_FOLDER = os.getenv('UPLOAD_TMP_FOLDER', 'uploads_tmp')
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 4 * 1024 * 1024 * 1024))
+
+# Nombre de recherches d'œuvres gardées en cache (IDs des résultats)
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1024))
+
+# Nombre de suggestions de l'autocomplétion (par défaut / maximum)
+SUGGEST_DEFAULT_LIMIT = int(os.getenv('SUGGEST_DEFAULT_LIMIT', 8))
+SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', 20))
+
+# Nombre maximal d'œuvres demandées en un appel (GET /api/artworks?ids=1,2,3)
+ARTWORKS_MAX_IDS = int(os.getenv('ARTWORKS_MAX_IDS', 200))
+
+# Données jointes à une salle par GET /api/rooms/<id>?include=artworks,hotspots
+ROOM_INCLUDES = ('artworks', 'hotspots')
+
 def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     """Create and configure all controllers"""
     
@@ -46,7 +96,97 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     # Initialize application services
     user_service = UserApplicationService(user_repo)
     room_service = RoomApplicationService(room_repo, artwork_repo)
-    artwork_service = ArtworkApplicationService(artwork_repo, room_repo, frontend_url)
+    # Résultats de recherche (IDs) en mémoire, invalidés par la version du catalogue
+    search_cache = SearchResultCache(SEARCH_CACHE_MAX_ENTRIES)
+    artwork_service = ArtworkApplicationService(artwork_repo, room_repo, frontend_url, search_cache)
+    
+    # Codes courts des QR codes, chargés en mémoire au démarrage
+    short_links = ShortLinkService(db_path, BASE_URL)
+    short_links.load()
+    
+    qr_regeneration_service = QRCodeRegenerationService(db_path, QR_FOLDER, short_links)
+    qr_renderer = OnDemandQRCodeRenderer(
+        DiskLRUCache(os.path.join(CACHE_FOLDER, 'qrcodes'), QR_CACHE_MAX_BYTES),
+        short_links
+    )
+    qr_sheet_renderer = QRSheetRenderer()
+    
+    # Fichiers médias dédupliqués par contenu (SHA-256) avec compteur de références
+    media_store = MediaBlobStore(db_path, {
+        'image': (IMAGES_FOLDER, '/static/images'),
+        'panorama': (IMAGES_FOLDER, '/static/images'),
+        'audio': (AUDIO_FOLDER, '/static/audios'),
+        'video': (VIDEOS_FOLDER, '/static/videos'),
+    }, UPLOAD_TMP_FOLDER)
+    chunked_uploads = ChunkedUploadService(db_path, UPLOAD_TMP_FOLDER, media_store, UPLOAD_MAX_BYTES)
+    
+    # Suppressions de fichiers en arrière-plan (file + balayage périodique des orphelins)
+    media_gc = MediaGarbageCollector(
+        db_path, media_store, (IMAGES_FOLDER, AUDIO_FOLDER, VIDEOS_FOLDER, QR_FOLDER), QR_FOLDER
+    )
+    # Déclinaisons WebP/JPEG des images, générées en arrière-plan après l'upload
+    image_derivatives = ImageDerivativeService(db_path)
+    # Pyramide de tuiles multirésolution des panoramas (visionneuse 360°)
+    panorama_tiles = PanoramaTileService(db_path)
+    # Dimensions, blurhash et couleur dominante des images (mise en page avant chargement)
+    image_metadata = ImageMetadataService(db_path)
+    # Miniatures à la demande (tailles arbitraires), gardées dans un cache disque borné
+    image_resizer = OnDemandImageResizer(
+        DiskLRUCache(os.path.join(CACHE_FOLDER, 'images'), IMAGE_CACHE_MAX_BYTES)
+    )
+    # Index de préfixes en mémoire pour l'autocomplétion, mis à jour à chaque écriture
+    suggestions = SuggestionIndex(db_path)
+    suggestions.load()
+    # Index de trigrammes de la recherche (accents, casse et fautes de frappe tolérés)
+    trigram_index = TrigramIndex(db_path)
+    trigram_index.sync()
+    # Bitmaps des filtres (catégorie, période, origine, salle, audio, vidéo) pour la navigation sans SQL
+    filter_index = ArtworkFilterIndex(db_path)
+    filter_index.load()
+    # Œuvres similaires précalculées en arrière-plan (TF-IDF des descriptions + catégorie, période, origine)
+    similar_artworks = SimilarArtworksService(db_path)
+    # Journal des recherches, écrit par lots en arrière-plan (requêtes fréquentes, recherches sans résultat)
+    search_analytics = SearchAnalytics(db_path)
+    
+    # Threads et calculs d'arrière-plan démarrés à la première requête : le processus de
+    # surveillance du reloader (debug) charge aussi l'application mais ne sert jamais de requête
+    background_lock = threading.Lock()
+    background_started = threading.Event()
+    
+    def start_background_services() -> None:
+        if background_started.is_set():
+            return
+        with background_lock:
+            if background_started.is_set():
+                return
+            short_links.start()
+            media_gc.start()
+            search_analytics.start()
+            similar_artworks.ensure_computed()
+            background_started.set()
+    
+    def store_media(file_storage, kind: str) -> str:
+        """Enregistre un fichier uploadé dans le store et renvoie son URL publique"""
+        blob = media_store.put_stream(file_storage.stream, kind, file_storage.filename)
+        print(f"DEBUG: {kind} stored: {blob.url} (deduplicated: {blob.deduplicated})")
+        g.setdefault('stored_media_urls', []).append(blob.url)
+        return blob.url
+    
+    def release_media_on_failure(view):
+        """Rend les références prises par store_media() quand la requête échoue (validation, salle absente, erreur)"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                for url in g.pop('stored_media_urls', []):
+                    media_store.release(url)
+                raise
+            if response.status_code >= 400:
+                for url in g.pop('stored_media_urls', []):
+                    media_store.release(url)
+            return response
+        return wrapper
     
     # Create blueprints
     api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -55,6 +195,11 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     rooms_bp = Blueprint('rooms', __name__, url_prefix='/api/rooms')
     artworks_bp = Blueprint('artworks', __name__, url_prefix='/api/artworks')
     admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+    qr_bp = Blueprint('qr', __name__, url_prefix='/q')
+    uploads_bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
+    media_bp = Blueprint('media', __name__, url_prefix='/static')
+    images_bp = Blueprint('images', __name__, url_prefix='/media/img')
+    api_bp.before_app_request(start_background_services)
     
     # General API routes
     @api_bp.route('/health', methods=['GET'])
@@ -252,6 +397,9 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
                     'theme': room.theme,
                     'accessibility_level': room.accessibility_level,
                     'panorama_url': room.panorama_url,
+                    'panorama_srcset': room.panorama_srcset,
+                    'panorama_multires': room.panorama_multires,
+                    'panorama_metadata': room.panorama_metadata,
                     'has_audio': room.has_audio,
                     'has_interactive': room.has_interactive,
                     'created_at': room.created_at.isoformat() if room.created_at else None
@@ -264,34 +412,55 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     
     @rooms_bp.route('/<int:room_id>', methods=['GET'])
     def get_room(room_id: int):
+        """Détails d'une salle ; ?include=artworks,hotspots joint ses œuvres (?fields= / ?view=summary) en un appel"""
         try:
-            room = room_service.get_room_by_id(room_id)
-            if not room:
-                return jsonify({'error': 'Room not found'}), 404
+            include = [value.strip() for value in request.args.get('include', '').split(',') if value.strip()]
+            for value in include:
+                if value not in ROOM_INCLUDES:
+                    return jsonify({'error': f"Unknown include: {value}"}), 400
             
             language = request.args.get('lang', 'fr')
+            if include:
+                room = room_service.get_room_with_artworks(room_id, requested_fields(), language, include)
+            else:
+                room = room_service.get_room_by_id(room_id)
+            if not room:
+                return jsonify({'error': 'Room not found'}), 404
             
             # Utiliser les champs du RoomResponse DTO
             name = getattr(room, f'name_{language}', room.name_fr)
             description = getattr(room, f'description_{language}', room.description_fr)
             
-            return jsonify({
+            payload = {
                 'id': room.id,
                 'name': name,
                 'description': description,
                 'theme': room.theme,
                 'accessibility_level': room.accessibility_level,
                 'panorama_url': room.panorama_url,
+                'panorama_srcset': room.panorama_srcset,
+                'panorama_multires': room.panorama_multires,
+                'panorama_metadata': room.panorama_metadata,
                 'has_audio': room.has_audio,
                 'has_interactive': room.has_interactive,
                 'created_at': room.created_at.isoformat() if room.created_at else None
-            })
+            }
+            if 'artworks' in include:
+                payload['artworks'] = room.artworks
+            if 'hotspots' in include:
+                payload['hotspots'] = room.hotspots
+            
+            return jsonify(payload)
             
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @rooms_bp.route('/<int:room_id>', methods=['PUT'])
     @jwt_required()
+    @validated_uploads(panorama_file='panorama')
+    @release_media_on_failure
     def update_room(room_id: int):
         """Met à jour une salle existante"""
         try:
@@ -311,6 +480,7 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
                 return jsonify({'error': 'Room not found'}), 404
             
             current_panorama_url = room_check['panorama_url']
+            panorama_stored = False
             
             # Gérer les données selon le type de contenu
             if request.content_type and 'multipart/form-data' in request.content_type:
@@ -327,23 +497,9 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
                 # Gérer l'upload du nouveau panorama si fourni
                 panorama_url = current_panorama_url  # Garder l'ancien par défaut
                 if panorama_file and panorama_file.filename:
-                    # Supprimer l'ancien fichier panorama
-                    if current_panorama_url:
-                        old_panorama_path = current_panorama_url.lstrip('/')
-                        if os.path.exists(old_panorama_path):
-                            try:
-                                os.remove(old_panorama_path)
-                                print(f"DEBUG: Deleted old panorama: {old_panorama_path}")
-                            except Exception as e:
-                                print(f"DEBUG: Could not delete old panorama: {e}")
-                    
-                    # Sauvegarder le nouveau fichier
-                    filename = f"panorama_{int(time.time())}_{panorama_file.filename}"
-                    filename = filename.replace(' ', '_')
-                    file_path = os.path.join(IMAGES_FOLDER, filename)
-                    panorama_url = f"/static/images/{filename}"
-                    panorama_file.save(file_path)
-                    print(f"DEBUG: Saved new panorama: {panorama_url}")
+                    # L'ancien panorama est libéré après la mise à jour
+                    panorama_url = store_media(panorama_file, 'panorama')
+                    panorama_stored = True
                 
             else:
                 # Données JSON
@@ -385,6 +541,16 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             
             conn.commit()
             conn.close()
+            suggestions.refresh_room(room_id)
+            
+            # Libérer l'ancien panorama (supprimé en arrière-plan s'il n'est plus utilisé ailleurs) ;
+            # un fichier identique ré-uploadé a pris une référence de plus, qu'il faut aussi rendre
+            if panorama_stored or panorama_url != current_panorama_url:
+                media_gc.enqueue([current_panorama_url])
+            if panorama_url != current_panorama_url:
+                image_derivatives.schedule('room', room_id, panorama_url)
+                image_metadata.schedule(panorama_url)
+                panorama_tiles.schedule(room_id, panorama_url)
             
             print(f"DEBUG: Successfully updated room {room_id}")
             
@@ -426,6 +592,11 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             artworks_count = cur.execute("SELECT COUNT(*) as count FROM artworks WHERE room_id = ?", (room_id,)).fetchone()['count']
             print(f"DEBUG: Found {artworks_count} artworks in room {room_id}")
             
+            # Médias des œuvres de la salle, libérés après suppression
+            artwork_media = cur.execute(
+                "SELECT id, image_url, audio_url, video_url, qr_code_url FROM artworks WHERE room_id = ?", (room_id,)
+            ).fetchall()
+            
             # 3. Supprimer toutes les œuvres de cette salle
             if artworks_count > 0:
                 cur.execute("DELETE FROM artworks WHERE room_id = ?", (room_id,))
@@ -436,37 +607,25 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             
             conn.commit()
             conn.close()
-            
-            # 5. Supprimer les fichiers associés
-            files_deleted = []
-            
-            # Supprimer le fichier panorama
-            if panorama_url:
-                panorama_path = panorama_url.lstrip('/')  # Enlever le / initial
-                if os.path.exists(panorama_path):
-                    try:
-                        os.remove(panorama_path)
-                        files_deleted.append(panorama_path)
-                        print(f"DEBUG: Deleted panorama file: {panorama_path}")
-                    except Exception as e:
-                        print(f"DEBUG: Failed to delete panorama file {panorama_path}: {e}")
-            
-            # Supprimer le QR code
-            qr_path = os.path.join(QR_FOLDER, f"room_{room_id}.png")
-            if os.path.exists(qr_path):
-                try:
-                    os.remove(qr_path)
-                    files_deleted.append(qr_path)
-                    print(f"DEBUG: Deleted QR code: {qr_path}")
-                except Exception as e:
-                    print(f"DEBUG: Failed to delete QR code {qr_path}: {e}")
+            suggestions.refresh_room(room_id)
+            trigram_index.purge()
+            filter_index.refresh_room(room_id)
+            similar_artworks.schedule()
+            # Les QR codes imprimés de la salle et de ses œuvres ne redirigent plus
+            short_links.forget([('room', room_id)] + [('artwork', row['id']) for row in artwork_media])
+            
+            # 5. Fichiers associés : supprimés en arrière-plan (fichiers partagés conservés)
+            media_urls = [panorama_url, f"/static/qrcodes/{qr_filename('room', room_id)}"]
+            for row in artwork_media:
+                media_urls.extend((row['image_url'], row['audio_url'], row['video_url'], row['qr_code_url']))
+            files_queued = media_gc.enqueue(media_urls)
             
             print(f"DEBUG: Successfully deleted room {room_id}")
             
             return jsonify({
                 'message': f'Room {room_id} deleted successfully',
                 'deleted_artworks': artworks_count,
-                'deleted_files': files_deleted
+                'files_queued': files_queued
             }), 200
             
         except Exception as e:
@@ -566,15 +725,97 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     #         print(f"DEBUG: Traceback: {traceback.format_exc()}")
     #         return jsonify({'error': str(e)}), 500
     
+    def requested_fields(default=ARTWORK_FIELDS):
+        """Champs d'œuvre demandés par ?fields=id,title (ou répété) ou ?view=summary|full"""
+        fields = [field.strip() for value in request.args.getlist('fields') for field in value.split(',')
+                  if field.strip()]
+        for field in fields:
+            if field not in ARTWORK_PROJECTION_FIELDS:
+                raise ValueError(f"Unknown field: {field}")
+        if fields:
+            return fields
+        
+        view = request.args.get('view', 'full')
+        if view not in ('summary', 'full'):
+            raise ValueError("view must be 'summary' or 'full'")
+        return ARTWORK_SUMMARY_FIELDS if view == 'summary' else default
+    
     @rooms_bp.route('/<int:room_id>/artworks', methods=['GET'])
     def get_artworks_by_room(room_id: int):
-        """Get all artworks in a specific room"""
+        """Get all artworks in a specific room (?fields= or ?view=summary)"""
         try:
-            artworks = artwork_service.get_artworks_by_room(room_id)
             language = request.args.get('lang', 'fr')
+            artworks = artwork_service.list_artworks(requested_fields(), language, room_id=room_id)
             
-            return jsonify([artwork.to_dict(language) for artwork in artworks])
+            return jsonify(artworks)
             
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def send_qr_code(kind: str, entity_id: int, fmt: str):
+        """Envoie un QR code rendu à la demande, compressé si le client l'accepte (SVG)"""
+        def open_qr_code():
+            path, mimetype, encoding = qr_renderer.render_encoded(
+                kind, entity_id, fmt, request.args.get('size'), accepted_encodings()
+            )
+            return send_file(os.path.abspath(path), mimetype=mimetype, conditional=True, max_age=86400), encoding
+        
+        try:
+            response, encoding = open_qr_code()
+        except FileNotFoundError:
+            # Fichier évincé du cache par une autre requête entre sa recherche et son ouverture :
+            # il n'est plus indexé, le second passage le rend à nouveau
+            response, encoding = open_qr_code()
+        if fmt == 'svg':
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+    
+    @rooms_bp.route('/<int:room_id>/qr', methods=['GET'], defaults={'fmt': None})
+    @rooms_bp.route('/<int:room_id>/qr.<any(svg, png):fmt>', methods=['GET'])
+    def get_room_qr(room_id: int, fmt: str):
+        """QR code d'une salle, rendu à la demande (SVG ou PNG)"""
+        try:
+            if not room_repo.get_by_id(room_id):
+                return jsonify({'error': 'Room not found'}), 404
+            
+            fmt = fmt or request.args.get('format', 'png')
+            return send_qr_code('room', room_id, fmt)
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @rooms_bp.route('/<int:room_id>/qr-sheet', methods=['GET'])
+    @jwt_required()
+    def get_room_qr_sheet(room_id: int):
+        """Planche imprimable des QR codes de toutes les œuvres d'une salle (PDF ou PNG)"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            if not room_repo.get_by_id(room_id):
+                return jsonify({'error': 'Room not found'}), 404
+            
+            fmt = request.args.get('format', 'pdf')
+            artworks = artwork_repo.get_by_room_id(room_id)
+            urls = short_links.qr_urls(('artwork', artwork.id) for artwork in artworks)
+            items = [(urls[('artwork', artwork.id)], artwork.title) for artwork in artworks]
+            chunks = qr_sheet_renderer.render(items, fmt)
+            
+            return Response(
+                stream_with_context(chunks),
+                mimetype=SHEET_FORMATS[fmt],
+                headers={'Content-Disposition': f'attachment; filename="room_{room_id}_qrcodes.{fmt}"'}
+            )
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -586,26 +827,37 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             category = request.args.get('category')
             popular = request.args.get('popular', type=bool)
             language = request.args.get('lang', 'fr')
-            
-            if room_id:
-                artworks = artwork_service.get_artworks_by_room(room_id)
+            # Seules les colonnes des champs demandés sont lues (?fields=id,title ou ?view=summary)
+            fields = requested_fields()
+            ids = filter_values('ids', int)
+            
+            if ids is not None:
+                # Lot d'œuvres par ID (ex. hotspots d'une carte), dans l'ordre demandé
+                ids = ids if isinstance(ids, list) else [ids]
+                if len(ids) > ARTWORKS_MAX_IDS:
+                    return jsonify({'error': f'At most {ARTWORKS_MAX_IDS} ids per request'}), 400
+                artworks = artwork_service.list_artworks(fields, language, ids=ids)
+            elif room_id:
+                artworks = artwork_service.list_artworks(fields, language, room_id=room_id)
             elif category:
-                artworks = artwork_service.get_artworks_by_category(category)
+                artworks = artwork_service.list_artworks(fields, language, category=category, order='popularity')
             elif popular:
                 limit = request.args.get('limit', 10, type=int)
-                artworks = artwork_service.get_popular_artworks(limit)
+                artworks = artwork_service.list_artworks(fields, language, order='popularity', limit=limit)
             else:
-                artworks = artwork_service.get_all_artworks()
+                artworks = artwork_service.list_artworks(fields, language)
             
-            return jsonify([artwork.to_dict(language) for artwork in artworks])
+            return jsonify(artworks)
             
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @artworks_bp.route('/<int:artwork_id>', methods=['GET'])
     def get_artwork(artwork_id: int):
         try:
-            artwork = artwork_service.view_artwork(artwork_id)
+            artwork = artwork_service.view_artwork(ViewArtworkRequest(artwork_id=artwork_id))
             if not artwork:
                 return jsonify({'error': 'Artwork not found'}), 404
             
@@ -615,8 +867,42 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @artworks_bp.route('/<int:artwork_id>/similar', methods=['GET'])
+    def get_similar_artworks(artwork_id: int):
+        """Œuvres similaires à une œuvre (?limit=&lang=), lues dans les voisins précalculés"""
+        try:
+            limit = max(1, min(request.args.get('limit', SIMILAR_TOP_K, type=int), SIMILAR_TOP_K))
+            language = request.args.get('lang', 'fr')
+            
+            neighbors = artwork_service.get_similar_artworks(artwork_id, limit)
+            if neighbors is None:
+                return jsonify({'error': 'Artwork not found'}), 404
+            
+            return jsonify([
+                {**artwork.to_dict(language), 'similarity': score} for artwork, score in neighbors
+            ])
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @artworks_bp.route('/<int:artwork_id>/qr.<any(svg, png):fmt>', methods=['GET'])
+    def get_artwork_qr(artwork_id: int, fmt: str):
+        """QR code d'une œuvre, rendu à la demande (SVG ou PNG)"""
+        try:
+            if not artwork_repo.get_by_id(artwork_id):
+                return jsonify({'error': 'Artwork not found'}), 404
+            
+            return send_qr_code('artwork', artwork_id, fmt)
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     @artworks_bp.route('/', methods=['POST'])
     @jwt_required()
+    @validated_uploads(image_file='image', audio_file='audio', video_file='video')
+    @release_media_on_failure
     def create_artwork():
         """Ajoute une nouvelle œuvre avec upload de fichiers multimédia"""
         try:
@@ -643,30 +929,15 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
                 
                 # Upload image
                 if image_file and image_file.filename:
-                    filename = f"artwork_{int(time.time())}_{image_file.filename}"
-                    filename = filename.replace(' ', '_')
-                    file_path = os.path.join(IMAGES_FOLDER, filename)
-                    image_url = f"/static/images/{filename}"
-                    image_file.save(file_path)
-                    print(f"DEBUG: Image saved: {image_url}")
+                    image_url = store_media(image_file, 'image')
                 
                 # Upload audio
                 if audio_file and audio_file.filename:
-                    filename = f"artwork_{int(time.time())}_{audio_file.filename}"
-                    filename = filename.replace(' ', '_')
-                    file_path = os.path.join(AUDIO_FOLDER, filename)
-                    audio_url = f"/static/audios/{filename}"
-                    audio_file.save(file_path)
-                    print(f"DEBUG: Audio saved: {audio_url}")
+                    audio_url = store_media(audio_file, 'audio')
                 
                 # Upload video
                 if video_file and video_file.filename:
-                    filename = f"artwork_{int(time.time())}_{video_file.filename}"
-                    filename = filename.replace(' ', '_')
-                    file_path = os.path.join(VIDEOS_FOLDER, filename)
-                    video_url = f"/static/videos/{filename}"
-                    video_file.save(file_path)
-                    print(f"DEBUG: Video saved: {video_url}")
+                    video_url = store_media(video_file, 'video')
                 
                 # Mettre à jour les URLs dans les données
                 data['image_url'] = image_url
@@ -736,13 +1007,16 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             conn.close()
             
             print(f"DEBUG: Artwork created with ID: {artwork_id}")
+            suggestions.refresh_artwork(artwork_id)
+            filter_index.refresh_artwork(artwork_id)
+            similar_artworks.schedule()
+            trigram_index.index_artwork(artwork_id)
+            
+            image_derivatives.schedule('artwork', artwork_id, artwork_data['image_url'])
+            image_metadata.schedule(artwork_data['image_url'])
             
-            # Générer le QR code pour l'œuvre
-            artwork_url = f"{BASE_URL}/api/artworks/{artwork_id}"
-            qr_path = os.path.join(QR_FOLDER, f"artwork_{artwork_id}.png")
-            qr_img = qrcode.make(artwork_url)
-            qr_img.save(qr_path)
-            qr_code_url = f"/static/qrcodes/artwork_{artwork_id}.png"
+            # QR code rendu à la demande (et mis en cache) par la route qr.png
+            qr_code_url = f"/api/artworks/{artwork_id}/qr.png"
             
             # Mettre à jour avec le QR code
             conn = get_connection()
@@ -780,6 +1054,8 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
 
     @artworks_bp.route('/<int:artwork_id>', methods=['PUT'])
     @jwt_required()
+    @validated_uploads(image_file='image', audio_file='audio', video_file='video')
+    @release_media_on_failure
     def update_artwork(artwork_id: int):
         """Met à jour une œuvre existante avec upload de fichiers multimédia"""
         try:
@@ -805,6 +1081,7 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             current_image_url = artwork_check['image_url']
             current_audio_url = artwork_check['audio_url']
             current_video_url = artwork_check['video_url']
+            stored_slots = set()
             
             # Gérer FormData (avec fichiers) ou JSON
             if request.content_type and 'multipart/form-data' in request.content_type:
@@ -818,59 +1095,24 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
                 video_url = current_video_url
                 
                 # Traiter les nouveaux fichiers s'ils sont uploadés
+                # Les anciens fichiers sont libérés après la mise à jour
                 image_file = request.files.get('image_file')
                 if image_file and image_file.filename:
                     print(f"DEBUG: New image file received: {image_file.filename}")
-                    # Supprimer l'ancien fichier image s'il existe
-                    if current_image_url:
-                        old_image_path = os.path.join(".", current_image_url.lstrip('/'))
-                        if os.path.exists(old_image_path):
-                            os.remove(old_image_path)
-                            print(f"DEBUG: Removed old image file: {old_image_path}")
-                    
-                    # Sauvegarder le nouveau fichier image
-                    timestamp = int(time.time())
-                    image_filename = f"artwork_{timestamp}_{image_file.filename}"
-                    image_path = os.path.join(IMAGES_FOLDER, image_filename)
-                    image_file.save(image_path)
-                    image_url = f"/static/images/{image_filename}"
-                    print(f"DEBUG: New image saved: {image_path}")
+                    image_url = store_media(image_file, 'image')
+                    stored_slots.add('image')
                 
                 audio_file = request.files.get('audio_file')
                 if audio_file and audio_file.filename:
                     print(f"DEBUG: New audio file received: {audio_file.filename}")
-                    # Supprimer l'ancien fichier audio s'il existe
-                    if current_audio_url:
-                        old_audio_path = os.path.join(".", current_audio_url.lstrip('/'))
-                        if os.path.exists(old_audio_path):
-                            os.remove(old_audio_path)
-                            print(f"DEBUG: Removed old audio file: {old_audio_path}")
-                    
-                    # Sauvegarder le nouveau fichier audio
-                    timestamp = int(time())
-                    audio_filename = f"audio_{timestamp}_{audio_file.filename}"
-                    audio_path = os.path.join(AUDIO_FOLDER, audio_filename)
-                    audio_file.save(audio_path)
-                    audio_url = f"/static/audios/{audio_filename}"
-                    print(f"DEBUG: New audio saved: {audio_path}")
+                    audio_url = store_media(audio_file, 'audio')
+                    stored_slots.add('audio')
                 
                 video_file = request.files.get('video_file')
                 if video_file and video_file.filename:
                     print(f"DEBUG: New video file received: {video_file.filename}")
-                    # Supprimer l'ancien fichier vidéo s'il existe
-                    if current_video_url:
-                        old_video_path = os.path.join(".", current_video_url.lstrip('/'))
-                        if os.path.exists(old_video_path):
-                            os.remove(old_video_path)
-                            print(f"DEBUG: Removed old video file: {old_video_path}")
-                    
-                    # Sauvegarder le nouveau fichier vidéo
-                    timestamp = int(time())
-                    video_filename = f"video_{timestamp}_{video_file.filename}"
-                    video_path = os.path.join(VIDEOS_FOLDER, video_filename)
-                    video_file.save(video_path)
-                    video_url = f"/static/videos/{video_filename}"
-                    print(f"DEBUG: New video saved: {video_path}")
+                    video_url = store_media(video_file, 'video')
+                    stored_slots.add('video')
                 
                 # Ajouter les URLs des fichiers aux données
                 data['image_url'] = image_url
@@ -936,6 +1178,21 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             """, (artwork_id,)).fetchone()
             
             conn.close()
+            suggestions.refresh_artwork(artwork_id)
+            filter_index.refresh_artwork(artwork_id)
+            similar_artworks.schedule()
+            trigram_index.index_artwork(artwork_id)
+            
+            # Libérer les médias remplacés (supprimés s'ils ne sont plus utilisés ailleurs) ;
+            # un fichier identique ré-uploadé a pris une référence de plus, qu'il faut aussi rendre
+            for slot, old_url, new_url in (('image', current_image_url, artwork_data['image_url']),
+                                           ('audio', current_audio_url, artwork_data['audio_url']),
+                                           ('video', current_video_url, artwork_data['video_url'])):
+                if slot in stored_slots or old_url != new_url:
+                    media_gc.enqueue([old_url])
+            if current_image_url != artwork_data['image_url']:
+                image_derivatives.schedule('artwork', artwork_id, artwork_data['image_url'])
+                image_metadata.schedule(artwork_data['image_url'])
             
             print(f"DEBUG: Artwork {artwork_id} updated successfully")
             
@@ -998,60 +1255,24 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             cur.execute("DELETE FROM artworks WHERE id = ?", (artwork_id,))
             conn.commit()
             conn.close()
-            
-            # Supprimer les fichiers associés
-            files_deleted = []
-            
-            # Supprimer le fichier image
-            if artwork_data['image_url']:
-                image_path = os.path.join(".", artwork_data['image_url'].lstrip('/'))
-                if os.path.exists(image_path):
-                    try:
-                        os.remove(image_path)
-                        files_deleted.append(f"image: {image_path}")
-                        print(f"DEBUG: Deleted image file: {image_path}")
-                    except Exception as e:
-                        print(f"DEBUG: Could not delete image file {image_path}: {e}")
-            
-            # Supprimer le fichier audio
-            if artwork_data['audio_url']:
-                audio_path = os.path.join(".", artwork_data['audio_url'].lstrip('/'))
-                if os.path.exists(audio_path):
-                    try:
-                        os.remove(audio_path)
-                        files_deleted.append(f"audio: {audio_path}")
-                        print(f"DEBUG: Deleted audio file: {audio_path}")
-                    except Exception as e:
-                        print(f"DEBUG: Could not delete audio file {audio_path}: {e}")
-            
-            # Supprimer le fichier vidéo
-            if artwork_data['video_url']:
-                video_path = os.path.join(".", artwork_data['video_url'].lstrip('/'))
-                if os.path.exists(video_path):
-                    try:
-                        os.remove(video_path)
-                        files_deleted.append(f"video: {video_path}")
-                        print(f"DEBUG: Deleted video file: {video_path}")
-                    except Exception as e:
-                        print(f"DEBUG: Could not delete video file {video_path}: {e}")
-            
-            # Supprimer le QR code
-            if artwork_data['qr_code_url']:
-                qr_path = os.path.join(".", artwork_data['qr_code_url'].lstrip('/'))
-                if os.path.exists(qr_path):
-                    try:
-                        os.remove(qr_path)
-                        files_deleted.append(f"qr_code: {qr_path}")
-                        print(f"DEBUG: Deleted QR code file: {qr_path}")
-                    except Exception as e:
-                        print(f"DEBUG: Could not delete QR code file {qr_path}: {e}")
+            suggestions.refresh_artwork(artwork_id)
+            filter_index.refresh_artwork(artwork_id)
+            similar_artworks.schedule()
+            trigram_index.index_artwork(artwork_id)
+            short_links.forget([('artwork', artwork_id)])
+            
+            # Fichiers associés : supprimés en arrière-plan (un fichier partagé avec d'autres œuvres est conservé)
+            files_queued = media_gc.enqueue([
+                artwork_data['image_url'], artwork_data['audio_url'],
+                artwork_data['video_url'], artwork_data['qr_code_url']
+            ])
             
             print(f"DEBUG: Successfully deleted artwork {artwork_id}")
             
             return jsonify({
                 'message': f'Artwork {artwork_id} deleted successfully',
                 'artwork_title': artwork_data['title'],
-                'files_deleted': files_deleted
+                'files_queued': files_queued
             }), 200
             
         except Exception as e:
@@ -1060,28 +1281,99 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             traceback.print_exc()
             return jsonify({'error': str(e)}), 500
     
+    def record_search(search_request: ArtworkSearchRequest, result_count: int, started: float) -> None:
+        """Journalise une recherche (file en mémoire, écrite en base par lots)"""
+        search_analytics.record(
+            search_request.query, search_request.filters(), result_count, (time.perf_counter() - started) * 1000
+        )
+    
+    def filter_values(name: str, value_type=str):
+        """Valeurs d'un filtre de recherche (séparées par des virgules ou paramètre répété)"""
+        try:
+            values = [
+                value_type(value.strip())
+                for param in request.args.getlist(name) for value in param.split(',') if value.strip()
+            ]
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: {request.args.get(name)}")
+        if not values:
+            return None
+        return values[0] if len(values) == 1 else values
+    
+    def flag_value(name: str):
+        """Filtre booléen : true/1/yes, false/0/no, absent = pas de filtre"""
+        value = request.args.get(name, '').strip().lower()
+        if not value:
+            return None
+        if value not in ('true', '1', 'yes', 'false', '0', 'no'):
+            raise ValueError(f"Invalid value for {name}: {value}")
+        return value in ('true', '1', 'yes')
+    
+    @artworks_bp.route('/suggest', methods=['GET'])
+    def suggest_artworks():
+        """
+        Autocomplétion : ?q=<début de mot>&lang=fr&limit=8
+        
+        Titres d'œuvres, origines, catégories et noms de salles dont un mot
+        commence par q (casse et accents ignorés), les plus populaires d'abord.
+        """
+        try:
+            limit = max(1, min(request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int), SUGGEST_MAX_LIMIT))
+            return jsonify(suggestions.suggest(request.args.get('q', ''), request.args.get('lang', 'fr'), limit))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     @artworks_bp.route('/search', methods=['GET'])
     def search_artworks():
+        """
+        Recherche d'œuvres : ?q=&category=&period=&origin=&room_id=&has_audio=&has_video=&lang=&limit=
+        
+        Un filtre peut accepter plusieurs valeurs (category=Masque,Sculpture ou
+        paramètre répété) : OU entre les valeurs, ET entre les filtres. Sans
+        texte, les filtres sont évalués sur l'index de bitmaps en mémoire.
+        
+        Avec ?facets=1 (ou une liste, ex. facets=category,origin) la réponse
+        contient aussi le nombre de résultats par valeur de chaque facette.
+        """
         try:
-            search_text = request.args.get('q', '')
-            category = request.args.get('category')
-            period = request.args.get('period')
-            room_id = request.args.get('room_id', type=int)
-            language = request.args.get('lang', 'fr')
-            
-            criteria = {}
-            if search_text:
-                criteria['search_text'] = search_text
-            if category:
-                criteria['category'] = category
-            if period:
-                criteria['period'] = period
-            if room_id:
-                criteria['room_id'] = room_id
-            
-            artworks = artwork_service.search_artworks(criteria)
-            return jsonify([artwork.to_dict(language) for artwork in artworks])
+            search_request = ArtworkSearchRequest(
+                query=request.args.get('q', '').strip() or None,
+                category=filter_values('category'),
+                period=filter_values('period'),
+                origin=filter_values('origin'),
+                room_id=filter_values('room_id', int),
+                has_audio=flag_value('has_audio'),
+                has_video=flag_value('has_video'),
+                language=request.args.get('lang', 'fr'),
+                limit=request.args.get('limit', type=int)
+            )
+            started = time.perf_counter()
+            
+            facets = request.args.get('facets')
+            if facets:
+                requested = [] if facets.lower() in ('1', 'true', 'all') else [
+                    facet.strip() for facet in facets.split(',') if facet.strip()
+                ]
+                unknown = [facet for facet in requested if facet not in FACET_FIELDS]
+                if unknown:
+                    return jsonify({'error': f"Unknown facets: {', '.join(unknown)}",
+                                    'facets': list(FACET_FIELDS)}), 400
+                response = artwork_service.search_artworks_with_facets(search_request, requested)
+                record_search(search_request, response.total, started)
+                return jsonify(response.to_dict(search_request.language))
+            
+            if search_request.query:
+                artworks = artwork_service.search_artworks(search_request)
+                total = len(artworks)
+            else:
+                limit = search_request.limit if search_request.limit and search_request.limit > 0 else None
+                artwork_ids, total = filter_index.query(search_request.filters(), limit)
+                artworks = artwork_service.get_artworks_by_ids(artwork_ids)
+            record_search(search_request, total, started)
+            return jsonify([artwork.to_dict(search_request.language) for artwork in artworks])
             
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -1093,6 +1385,7 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     
     @rooms_bp.route('/', methods=['POST'])
     @jwt_required()
+    @validated_uploads(panorama_file='panorama')
     def create_room():
         print("DEBUG: create_room function called")
         try:
@@ -1160,6 +1453,7 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             
             if not room_response:
                 return jsonify({'error': 'Failed to create room'}), 500
+            suggestions.refresh_room(room_response.id)
             
             return jsonify({
                 'id': room_response.id,
@@ -1183,6 +1477,8 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
             return jsonify({'error': str(e)}), 500
     
     @jwt_required()
+    @validated_uploads(panorama_file='panorama')
+    @release_media_on_failure
     def admin_add_room():
         """Ajoute une nouvelle salle (version admin avec upload de fichier panorama)"""
         
@@ -1219,15 +1515,7 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
         # Traiter l'upload du panorama
         panorama_url = None
         if panorama_file and panorama_file.filename:
-            # Créer un nom de fichier sécurisé
-            filename = f"panorama_{int(time.time())}_{panorama_file.filename}"
-            filename = filename.replace(' ', '_')
-            
-            file_path = os.path.join(IMAGES_FOLDER, filename)
-            panorama_url = f"/static/images/{filename}"
-            
-            # Sauvegarder le fichier
-            panorama_file.save(file_path)
+            panorama_url = store_media(panorama_file, 'panorama')
 
         conn = get_connection()
         cur = conn.cursor()
@@ -1247,17 +1535,16 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
         conn.commit()
         room_id = cur.lastrowid
         conn.close()
-
-        # Génération du QR Code
-        room_url = f"{BASE_URL}/api/rooms/{room_id}"
-        qr_path = os.path.join(QR_FOLDER, f"room_{room_id}.png")
-        qr_img = qrcode.make(room_url)
-        qr_img.save(qr_path)
+        suggestions.refresh_room(room_id)
+        
+        image_derivatives.schedule('room', room_id, panorama_url)
+        image_metadata.schedule(panorama_url)
+        panorama_tiles.schedule(room_id, panorama_url)
 
         return jsonify({
             "message": "Salle ajoutée avec succès",
             "room_id": room_id,
-            "qr_code_url": f"/static/qrcodes/room_{room_id}.png"
+            "qr_code_url": f"/api/rooms/{room_id}/qr.png"
         }), 201
 
     @admin_bp.route('/rooms', methods=['POST'])
@@ -1283,52 +1570,57 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
     
     @admin_bp.route('/artworks', methods=['GET'])
     def admin_get_artworks():
-        """Route admin pour récupérer toutes les œuvres directement depuis la base"""
+        """Route admin pour récupérer toutes les œuvres avec le nom de leur salle (?fields= ou ?view=summary)"""
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            # Récupérer toutes les œuvres avec les noms des salles
-            artworks_data = cur.execute("""
-                SELECT a.*, r.name_fr as room_name_fr
-                FROM artworks a
-                LEFT JOIN rooms r ON a.room_id = r.id
-                ORDER BY a.id DESC
-            """).fetchall()
-            
-            conn.close()
-            
-            # Convertir en dictionnaires pour JSON
-            artworks = []
-            for artwork in artworks_data:
-                artworks.append({
-                    'id': artwork['id'],
-                    'title': artwork['title'],
-                    'description_fr': artwork['description_fr'],
-                    'description_en': artwork['description_en'],
-                    'description_wo': artwork['description_wo'],
-                    'category': artwork['category'],
-                    'period': artwork['period'],
-                    'origin': artwork['origin'],
-                    'room_id': artwork['room_id'],
-                    'room_name': artwork['room_name_fr'],
-                    'image_url': artwork['image_url'],
-                    'audio_url': artwork['audio_url'],
-                    'video_url': artwork['video_url'],
-                    'qr_code_url': artwork['qr_code_url'],
-                    'popularity': artwork['popularity'],
-                    'view_count': artwork['view_count'],
-                    'created_at': artwork['created_at']
-                })
+            artworks = artwork_service.list_artworks(requested_fields(ADMIN_ARTWORK_FIELDS), order='newest')
             
             return jsonify(artworks)
             
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             print(f"DEBUG: Error in admin_get_artworks: {e}")
             import traceback
             traceback.print_exc()
             return jsonify({'error': str(e)}), 500
     
+    @admin_bp.route('/artworks/export.<any(ndjson, csv):fmt>', methods=['GET'])
+    @jwt_required()
+    def admin_export_artworks(fmt: str):
+        """Export de tout le catalogue en flux (NDJSON ou CSV), compressé si le client l'accepte"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            fields = requested_fields(ADMIN_ARTWORK_FIELDS)
+            # Les champs sont vérifiés ici ; les lignes sont lues par lots pendant l'envoi
+            rows = artwork_service.iter_artworks(
+                fields, request.args.get('lang', 'fr'),
+                room_id=request.args.get('room_id', type=int), category=request.args.get('category')
+            )
+            chunks = encode_export(rows, fields, fmt)
+            
+            encoding = negotiate_encoding()
+            if encoding:
+                level = COMPRESS_BROTLI_QUALITY if encoding == 'br' else COMPRESS_GZIP_LEVEL
+                chunks = compress_chunks(chunks, encoding, level)
+            
+            response = Response(
+                stream_with_context(chunks),
+                mimetype=EXPORT_MIMETYPES[fmt],
+                headers={'Content-Disposition': f'attachment; filename="artworks.{fmt}"'}
+            )
+            response.vary.add('Accept-Encoding')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            return response
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     @admin_bp.route('/artworks', methods=['POST'])
     def admin_create_artwork():
         """Route de compatibilité: POST /api/admin/artworks -> POST /api/artworks/"""
@@ -1344,6 +1636,159 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
         """Route de compatibilité: DELETE /api/admin/artworks/{id} -> DELETE /api/artworks/{id}"""
         return delete_artwork(artwork_id)
     
+    @admin_bp.route('/qrcodes/regenerate', methods=['POST'])
+    @jwt_required()
+    def admin_regenerate_qrcodes():
+        """Régénère les QR codes de toutes les œuvres et salles (après changement de BASE_URL)"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            data = request.get_json(silent=True) or {}
+            # Nombre de processus : entier >= 1, plafonné au nombre de CPU (défaut : nombre de CPU)
+            workers = data.get('workers')
+            if workers is not None:
+                if isinstance(workers, bool) or not isinstance(workers, (int, str)):
+                    raise ValueError(f"Invalid value for workers: {workers}")
+                try:
+                    workers = int(workers)
+                except ValueError:
+                    raise ValueError(f"Invalid value for workers: {workers}")
+                if workers < 1:
+                    raise ValueError("workers must be at least 1")
+                workers = min(workers, os.cpu_count() or 1)
+            
+            report = qr_regeneration_service.regenerate(
+                force=bool(data.get('force', False)),
+                workers=workers
+            )
+            return jsonify(report.to_dict()), 200
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            print(f"DEBUG: Error regenerating QR codes: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    @admin_bp.route('/qrcodes/scans', methods=['GET'])
+    @jwt_required()
+    def admin_get_qr_scans():
+        """Nombre de scans par code court"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            return jsonify(short_links.get_scan_counts())
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @admin_bp.route('/media/stats', methods=['GET'])
+    @jwt_required()
+    def admin_get_media_stats():
+        """Occupation disque des médias et gain de la déduplication"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            stats = media_store.stats()
+            stats['image_cache'] = image_resizer.stats()
+            return jsonify(stats)
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @admin_bp.route('/search/stats', methods=['GET'])
+    @jwt_required()
+    def admin_get_search_stats():
+        """Efficacité du cache des résultats de recherche"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            return jsonify({'result_cache': search_cache.stats()})
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @admin_bp.route("/search/<any('top-queries', 'zero-results'):report>", methods=['GET'])
+    @jwt_required()
+    def admin_get_search_report(report: str):
+        """Recherches les plus fréquentes ou sans résultat : ?days=7&limit=20 ou ?day=AAAA-MM-JJ"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            day = request.args.get('day')
+            if day:
+                import datetime
+                try:
+                    datetime.datetime.strptime(day, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'day must be formatted as YYYY-MM-DD'}), 400
+            days = max(1, request.args.get('days', 7, type=int))
+            limit = max(1, min(request.args.get('limit', 20, type=int), 500))
+            
+            # Inclure les recherches encore en file
+            search_analytics.flush()
+            if report == 'top-queries':
+                return jsonify(search_analytics.top_queries(days, limit, day))
+            return jsonify(search_analytics.zero_result_queries(days, limit, day))
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @admin_bp.route('/media/gc', methods=['GET'])
+    @jwt_required()
+    def admin_get_media_gc():
+        """Suppressions en attente et résultat du dernier balayage des fichiers orphelins"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            return jsonify(media_gc.stats())
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @admin_bp.route('/media/gc', methods=['POST'])
+    @jwt_required()
+    def admin_run_media_gc():
+        """Traite la file des suppressions et balaie les fichiers orphelins (dry_run pour simuler)"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            data = request.get_json(silent=True) or {}
+            dry_run = bool(data.get('dry_run', False))
+            processed = 0 if dry_run else media_gc.process_queue()
+            report = media_gc.sweep(dry_run=dry_run)
+            return jsonify({'queue_processed': processed, 'sweep': report.to_dict()}), 200
+            
+        except Exception as e:
+            print(f"DEBUG: Error running media garbage collection: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Redirection des codes courts scannés
+    @qr_bp.route('/<code>', methods=['GET'])
+    def resolve_short_code(code: str):
+        target = short_links.resolve(code)
+        if not target:
+            return jsonify({'error': 'Unknown QR code'}), 404
+        
+        short_links.record_scan(code)
+        target_type, target_id = target
+        response = redirect(QRCodeService.build_frontend_url(frontend_url, target_type, target_id), code=302)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
     @admin_bp.route('/stats', methods=['GET'])
     def admin_get_stats():
         """Récupère les statistiques complètes pour le dashboard admin"""
@@ -1354,11 +1799,233 @@ def create_controllers(db_path: str, frontend_url: str) -> Dict[str, Blueprint]:
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    # Uploads par morceaux : init -> PUT des morceaux -> complete
+    @uploads_bp.route('/', methods=['POST'])
+    @jwt_required()
+    def init_upload():
+        """Ouvre une session d'upload : {"filename", "size", "kind", "sha256" (optionnel)}"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            data = request.get_json() or {}
+            session = chunked_uploads.create(
+                data.get('kind'), data.get('filename'), data.get('size'), data.get('sha256')
+            )
+            return jsonify(session.to_dict()), 201
+            
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @uploads_bp.route('/<upload_id>', methods=['GET'])
+    @jwt_required()
+    def get_upload(upload_id: str):
+        """État d'un upload ; `offset` indique où reprendre après une coupure"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            return jsonify(chunked_uploads.get(upload_id).to_dict())
+            
+        except UploadNotFound:
+            return jsonify({'error': 'Upload not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @uploads_bp.route('/<upload_id>', methods=['PUT'])
+    @jwt_required()
+    def put_upload_chunk(upload_id: str):
+        """Reçoit un morceau brut (application/octet-stream) à la position ?offset=N"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            offset = request.args.get('offset', type=int)
+            if offset is None:
+                # Alternative : Content-Range: bytes <début>-<fin>/<total>
+                content_range = request.headers.get('Content-Range', '')
+                if content_range.startswith('bytes ') and '-' in content_range:
+                    try:
+                        offset = int(content_range[6:].split('-', 1)[0])
+                    except ValueError:
+                        offset = None
+            if offset is None or offset < 0:
+                return jsonify({'error': 'Missing or invalid offset'}), 400
+            
+            new_offset = chunked_uploads.write_chunk(upload_id, offset, request.stream, request.content_length)
+            return jsonify({'upload_id': upload_id, 'offset': new_offset})
+            
+        except UploadNotFound:
+            return jsonify({'error': 'Upload not found'}), 404
+        except UploadOffsetMismatch as e:
+            return jsonify({'error': str(e), 'offset': e.offset}), 409
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        except UnsupportedMediaType as e:
+            return jsonify({'error': str(e)}), 415
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            print(f"DEBUG: Error writing chunk for upload {upload_id}: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    @uploads_bp.route('/<upload_id>/complete', methods=['POST'])
+    @jwt_required()
+    def complete_upload(upload_id: str):
+        """
+        Vérifie la somme SHA-256 et publie le fichier ;
+        {"artwork_id": N} ou {"room_id": N} le rattache directement
+        """
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            data = request.get_json(silent=True) or {}
+            session = chunked_uploads.complete(upload_id, data.get('sha256'))
+            result = session.to_dict()
+            
+            target = None
+            if data.get('artwork_id') is not None:
+                target = ('artwork', int(data['artwork_id']))
+            elif data.get('room_id') is not None:
+                target = ('room', int(data['room_id']))
+            
+            if target:
+                url, previous_url = chunked_uploads.attach(upload_id, *target)
+                # La référence de l'upload passe à l'œuvre ou la salle ; l'ancien média est libéré
+                # (si c'était déjà le même fichier, la référence en double est rendue)
+                media_gc.enqueue([previous_url])
+                if target[0] == 'artwork':
+                    # Filtres has_audio / has_video
+                    filter_index.refresh_artwork(target[1])
+                if session.kind in ('image', 'panorama'):
+                    image_derivatives.schedule(target[0], target[1], url)
+                    image_metadata.schedule(url)
+                if session.kind == 'panorama':
+                    panorama_tiles.schedule(target[1], url)
+                result['attached_to'] = {'type': target[0], 'id': target[1]}
+            
+            return jsonify(result), 200
+            
+        except UploadNotFound as e:
+            return jsonify({'error': f'Not found: {e}'}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            print(f"DEBUG: Error completing upload {upload_id}: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    @uploads_bp.route('/<upload_id>', methods=['DELETE'])
+    @jwt_required()
+    def abort_upload(upload_id: str):
+        """Abandonne un upload et supprime le fichier partiel"""
+        try:
+            current_user = user_service.get_user_by_id(get_jwt_identity())
+            if not current_user or not current_user.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            chunked_uploads.abort(upload_id)
+            return jsonify({'message': 'Upload aborted'}), 200
+            
+        except UploadNotFound:
+            return jsonify({'error': 'Upload not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    # Fichiers statiques : audio / vidéo en streaming, le reste avec ses copies .gz/.br
+    audio_files = MediaFileServer(AUDIO_FOLDER, 'audios')
+    video_files = MediaFileServer(VIDEOS_FOLDER, 'videos')
+    static_files = MediaFileServer('static', '')
+    
+    @media_bp.route('/audios/<path:filename>', methods=['GET', 'HEAD'])
+    def serve_audio(filename: str):
+        """Sert un fichier audio (requêtes Range, ETag, délégation sendfile)"""
+        return audio_files.serve(filename)
+    
+    @media_bp.route('/videos/<path:filename>', methods=['GET', 'HEAD'])
+    def serve_video(filename: str):
+        """Sert un fichier vidéo (requêtes Range, ETag, délégation sendfile)"""
+        return video_files.serve(filename)
+    
+    @media_bp.route('/<path:filename>', methods=['GET', 'HEAD'])
+    def serve_static(filename: str):
+        """Sert un fichier statique (images, QR codes...), précompressé si possible"""
+        return static_files.serve(filename)
+    
+    # Redimensionnement d'images à la demande
+    def send_resized_image(url):
+        source_path = image_resizer.source_path(url)
+        if not source_path:
+            return jsonify({'error': 'Image not found'}), 404
+        
+        requested_fmt = request.args.get('fmt')
+        fmt = image_resizer.normalize_format(requested_fmt, 'image/webp' in request.accept_mimetypes)
+        
+        def open_resized_image():
+            path, mimetype = image_resizer.render(
+                source_path, request.args.get('w'), request.args.get('h'),
+                fmt, request.args.get('fit', 'contain')
+            )
+            # ETag = nom du fichier en cache (empreinte de la variante) : stable malgré le suivi LRU
+            return send_file(
+                os.path.abspath(path), mimetype=mimetype, conditional=True, max_age=86400,
+                etag=os.path.splitext(os.path.basename(path))[0]
+            )
+        
+        try:
+            response = open_resized_image()
+        except FileNotFoundError:
+            # Variante évincée du cache par une autre requête avant son ouverture : rendue à nouveau
+            response = open_resized_image()
+        if not requested_fmt:
+            response.vary.add('Accept')
+        return response
+    
+    @images_bp.route('/<int:artwork_id>', methods=['GET'])
+    def get_artwork_image(artwork_id: int):
+        """Image d'une œuvre redimensionnée (?w=&h=&fmt=webp|jpeg|png&fit=contain|cover)"""
+        try:
+            artwork = artwork_repo.get_by_id(artwork_id)
+            if not artwork:
+                return jsonify({'error': 'Artwork not found'}), 404
+            return send_resized_image(artwork.image_url)
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @images_bp.route('/room/<int:room_id>', methods=['GET'])
+    def get_room_image(room_id: int):
+        """Panorama d'une salle redimensionné (mêmes paramètres)"""
+        try:
+            room = room_repo.get_by_id(room_id)
+            if not room:
+                return jsonify({'error': 'Room not found'}), 404
+            return send_resized_image(room.panorama_url)
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     return {
         'api': api_bp,
         'auth': auth_bp,
         'users': users_bp,
         'rooms': rooms_bp,
         'artworks': artworks_bp,
-        'admin': admin_bp
+        'admin': admin_bp,
+        'qr': qr_bp,
+        'uploads': uploads_bp,
+        'media': media_bp,
+        'images': images_bp
     }
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Serving of uploaded media files (Range requests, ETags, sendfile delegation,
+precompressed siblings)
+"""
+import mimetypes
+import os
+import re
+from typing import Optional
+from urllib.parse import quote
+
+from flask import Response, current_app, jsonify, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+from ..infrastructure.media.precompress import is_precompressible, precompressed_variant
+from .compression import accepted_encodings
+
+
+# Délégation de l'envoi des octets au serveur frontal :
+#   ""           -> Flask envoie le fichier (wsgi.file_wrapper / sendfile quand le serveur le permet)
+#   "x-accel"    -> nginx (X-Accel-Redirect vers MEDIA_ACCEL_PREFIX)
+#   "x-sendfile" -> Apache / lighttpd (X-Sendfile avec le chemin absolu)
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '').lower()
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media').rstrip('/')
+MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', 3600))
+
+# Les fichiers nommés d'après leur SHA-256 ne changent jamais
+CONTENT_ADDRESSED_NAME = re.compile(r'^([0-9a-f]{64})(?:_w\d+)?\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class MediaFileServer:
+    """
+    Sends a file from one of the static media folders
+
+    Flask answers conditional and Range requests itself (206, 304, 416),
+    or hands the transfer to the front server so media bytes never go
+    through a Python worker. For text formats (SVG, JSON...) the .br / .gz
+    sibling written by precompress_static.py is sent when the client
+    accepts it, so nothing is compressed per request.
+    """
+
+    def __init__(self, folder: str, url_folder: str, accel: Optional[str] = None,
+                 accel_prefix: Optional[str] = None):
+        """
+        Args:
+            folder: Directory on disk
+            url_folder: Path of the folder below /static (e.g. "videos", "" for /static itself)
+            accel: "", "x-accel" or "x-sendfile" (defaults to MEDIA_ACCEL)
+            accel_prefix: Internal nginx location (defaults to MEDIA_ACCEL_PREFIX)
+        """
+        self.folder = os.path.abspath(folder)
+        self.url_folder = url_folder.strip('/')
+        self.accel = MEDIA_ACCEL if accel is None else accel
+        self.accel_prefix = MEDIA_ACCEL_PREFIX if accel_prefix is None else accel_prefix.rstrip('/')
+
+    def serve(self, filename: str) -> Response:
+        path = safe_join(self.folder, filename)
+        if path is None or not os.path.isfile(path):
+            return jsonify({'error': 'File not found'}), 404
+
+        basename = os.path.basename(path)
+        content_addressed = CONTENT_ADDRESSED_NAME.match(basename)
+        max_age = IMMUTABLE_MAX_AGE if content_addressed else MEDIA_MAX_AGE
+
+        compressible = is_precompressible(basename)
+        if self.accel == 'x-accel':
+            # nginx lit le fichier lui-même et gère Range, ETag et If-Modified-Since
+            # (ainsi que les copies .gz avec gzip_static)
+            mimetype = mimetypes.guess_type(basename)[0] or 'application/octet-stream'
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = quote(
+                '/'.join(part for part in (self.accel_prefix, self.url_folder, filename) if part)
+            )
+        else:
+            variant = None
+            if compressible:
+                variant = precompressed_variant(path, accepted_encodings())
+
+            etag = content_addressed.group(1) if content_addressed else True
+            if variant and etag is not True:
+                # Chaque représentation a son propre ETag
+                etag = f"{etag}-{variant[1]}"
+            response = send_file(
+                variant[0] if variant else path,
+                request.environ,
+                mimetype=mimetypes.guess_type(basename)[0] or 'application/octet-stream',
+                conditional=True,
+                # Nom = empreinte du contenu : l'ETag est connu sans lire le fichier
+                etag=etag,
+                max_age=max_age,
+                use_x_sendfile=self.accel == 'x-sendfile',
+                response_class=current_app.response_class,
+                _root_path=current_app.root_path
+            )
+            if variant:
+                response.headers['Content-Encoding'] = variant[1]
+
+        if compressible:
+            response.vary.add('Accept-Encoding')
+        response.headers['Accept-Ranges'] = 'bytes'
+        if content_addressed:
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+        return response
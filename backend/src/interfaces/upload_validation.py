@@ -0,0 +1,137 @@
+"""
+Multipart upload validation while the request body is being read
+"""
+import os
+from functools import partial, wraps
+from typing import Callable, Dict, IO, Optional
+
+from flask import jsonify, request
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge, UnsupportedMediaType as UnsupportedMediaTypeError
+from werkzeug.formparser import FormDataParser, MultiPartParser
+
+from ..infrastructure.media.upload_validation import (
+    SNIFF_BYTES, UnsupportedMediaType, sniff_media_type, upload_limit
+)
+
+
+# Marge pour les champs texte et les en-têtes multipart dans la limite d'une route
+FORM_OVERHEAD_BYTES = int(os.getenv('UPLOAD_FORM_OVERHEAD_BYTES', 1024 * 1024))
+
+
+class ValidatingFileStream:
+    """
+    Destination of one multipart file part, checked as it is written
+
+    The first bytes are sniffed before anything is stored, and the part is
+    refused as soon as it goes past the limit of its media kind.
+    """
+
+    def __init__(self, container: IO[bytes], field: str, kind: str):
+        self._container = container
+        self.field = field
+        self.kind = kind
+        self.limit = upload_limit(kind)
+        self.size = 0
+        self._head: Optional[bytes] = b''
+
+    def _sniff(self, head: bytes) -> None:
+        try:
+            sniff_media_type(head, self.kind)
+        except UnsupportedMediaType as e:
+            raise UnsupportedMediaTypeError(f"{self.field}: {e}")
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.limit:
+            raise RequestEntityTooLarge(f"{self.field}: {self.kind} files are limited to {self.limit} bytes")
+
+        if self._head is not None:
+            # Rien n'est écrit avant d'avoir reconnu le format
+            self._head += data
+            if len(self._head) < SNIFF_BYTES:
+                return len(data)
+            self._sniff(self._head)
+            data, self._head = self._head, None
+        self._container.write(data)
+        return len(data)
+
+    def seek(self, *args) -> int:
+        # Fin de la partie : un fichier plus court que SNIFF_BYTES n'a pas encore été vérifié
+        if self._head is not None:
+            if self.size:
+                self._sniff(self._head)
+                self._container.write(self._head)
+            self._head = None
+        return self._container.seek(*args)
+
+    def __getattr__(self, name: str):
+        return getattr(self._container, name)
+
+
+class ValidatingMultiPartParser(MultiPartParser):
+    """Multipart parser wrapping the file parts of known fields in a ValidatingFileStream"""
+
+    def __init__(self, *args, file_kinds: Dict[str, str], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_kinds = file_kinds
+
+    def start_file_streaming(self, event, total_content_length):
+        container = super().start_file_streaming(event, total_content_length)
+        kind = self.file_kinds.get(event.name)
+        if kind is None or not event.filename:
+            return container
+        return ValidatingFileStream(container, event.name, kind)
+
+
+class ValidatingFormDataParser(FormDataParser):
+    """Form parser of a route whose file fields are validated while streaming"""
+
+    def __init__(self, *args, file_kinds: Dict[str, str], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_kinds = file_kinds
+
+    # Méthode privée de Werkzeug : version bornée dans requirements.txt, à revérifier à chaque mise à jour
+    def _parse_multipart(self, stream, mimetype, content_length, options):
+        parser = ValidatingMultiPartParser(
+            stream_factory=self.stream_factory,
+            max_form_memory_size=self.max_form_memory_size,
+            max_form_parts=self.max_form_parts,
+            cls=self.cls,
+            file_kinds=self.file_kinds,
+        )
+        boundary = options.get("boundary", "").encode("ascii")
+        if not boundary:
+            raise ValueError("Missing boundary")
+        form, files = parser.parse(stream, boundary, content_length)
+        return stream, form, files
+
+
+def validated_uploads(**file_kinds: str) -> Callable:
+    """
+    Validate the multipart files of a route while they are received
+
+    The request is limited to the sum of the per-kind limits of its file
+    fields (plus FORM_OVERHEAD_BYTES), so a larger Content-Length is refused
+    before the body is read. Each file part is sniffed from its first bytes
+    and bounded by its own limit: a bad upload is answered with 413 or 415
+    as soon as it is detected, without writing the rest to disk.
+
+    Usage:
+        @validated_uploads(image_file='image', audio_file='audio')
+    """
+    max_length = sum(upload_limit(kind) for kind in file_kinds.values()) + FORM_OVERHEAD_BYTES
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request.max_content_length = max_length
+            if request.mimetype == 'multipart/form-data':
+                request.form_data_parser_class = partial(ValidatingFormDataParser, file_kinds=file_kinds)
+                try:
+                    # Lecture du corps ici : les vues interceptent toutes les exceptions
+                    request.files
+                except HTTPException as e:
+                    return jsonify({'error': e.description}), e.code
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,91 @@
+"""
+Shared fixtures: an application over a fresh database in a temporary folder
+"""
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import database  # noqa: E402
+from src.infrastructure.media.workers import shutdown_media_pool  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Temporary working directory (static/, cache/ and museum.db are relative to it)"""
+    # Chemin absolu : les threads d'arrière-plan peuvent finir après le retour au dossier initial
+    db_path = str(tmp_path / 'museum.db')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_PATH', db_path)
+    monkeypatch.setattr(database, 'DB_NAME', db_path)
+    for folder in ('static/images', 'static/audios', 'static/videos', 'static/qrcodes'):
+        os.makedirs(folder, exist_ok=True)
+    database.create_tables()
+    database.create_default_admin()
+    return tmp_path
+
+
+@pytest.fixture
+def app(workdir):
+    from app import create_app
+    application = create_app()
+    application.config['TESTING'] = True
+    yield application
+    # Les traitements d'images en cours travaillent sur des chemins relatifs au dossier du test
+    shutdown_media_pool()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(app):
+    from flask_jwt_extended import create_access_token
+    admin = database.get_user_by_username('admin')
+    with app.app_context():
+        token = create_access_token(identity=str(admin['id']))
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def room_id(workdir):
+    conn = database.get_connection()
+    cur = conn.execute("""
+        INSERT INTO rooms (name_fr, description_fr, description_en, description_wo, theme, accessibility_level, hotspots)
+        VALUES ('Salle test', 'Description', 'Description', 'Description', 'Histoire', 'facile', '[]')
+    """)
+    conn.commit()
+    room = cur.lastrowid
+    conn.close()
+    return room
+
+
+def jpeg_bytes(color=(200, 120, 40), size=(32, 32)) -> bytes:
+    """A small valid JPEG"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def insert_artwork(room_id, **columns) -> int:
+    """An artwork row with every required field, plus the given columns"""
+    values = dict({
+        'room_id': room_id, 'title': 'Masque', 'description_fr': 'Description', 'description_en': 'Description',
+        'description_wo': 'Description', 'category': 'Masque', 'period': 'XXe siècle', 'origin': 'Sénégal',
+    }, **columns)
+    conn = database.get_connection()
+    cur = conn.execute(
+        f"INSERT INTO artworks ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})", list(values.values())
+    )
+    conn.commit()
+    artwork_id = cur.lastrowid
+    conn.close()
+    return artwork_id
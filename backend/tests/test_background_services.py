@@ -0,0 +1,40 @@
+"""
+Background threads start with the first request, and never sweep at boot
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+def live_threads(name):
+    return sum(1 for thread in threading.enumerate() if thread.name == name and thread.is_alive())
+
+
+def test_create_app_starts_no_background_thread(workdir):
+    from app import create_app
+    before = {name: live_threads(name) for name in ('media-gc', 'short-link-scans', 'search-analytics')}
+
+    application = create_app()
+    assert {name: live_threads(name) for name in before} == before
+
+    application.test_client().get('/health')
+    assert all(live_threads(name) == count + 1 for name, count in before.items())
+
+
+def test_first_sweep_waits_a_full_interval(workdir):
+    orphan = os.path.join('static', 'images', 'orphelin.jpg')
+    with open(orphan, 'wb') as f:
+        f.write(b'data')
+    long_ago = time.time() - 7 * 24 * 3600
+    os.utime(orphan, (long_ago, long_ago))
+
+    from app import create_app
+    create_app().test_client().get('/health')
+    time.sleep(0.5)
+
+    conn = sqlite3.connect('museum.db')
+    last_sweep_at = conn.execute("SELECT last_sweep_at FROM media_gc_state WHERE id = 1").fetchone()[0]
+    conn.close()
+    assert last_sweep_at > long_ago
+    assert os.path.exists(orphan)
@@ -0,0 +1,175 @@
+"""
+Resumable chunked uploads: init -> PUT chunks at offset -> complete (and attach)
+"""
+import hashlib
+import io
+import os
+import sqlite3
+
+from conftest import insert_artwork
+
+AUDIO = b'ID3' + bytes(range(256)) * 40
+
+
+def init_upload(client, headers, data=AUDIO, kind='audio', filename='guide.mp3', **extra):
+    body = dict({'kind': kind, 'filename': filename, 'size': len(data)}, **extra)
+    return client.post('/api/uploads/', json=body, headers=headers)
+
+
+def put_chunk(client, headers, upload_id, offset, chunk):
+    return client.put(f'/api/uploads/{upload_id}?offset={offset}', data=chunk, headers=headers,
+                      content_type='application/octet-stream')
+
+
+def upload(client, headers, data=AUDIO, **extra):
+    upload_id = init_upload(client, headers, data, **extra).get_json()['upload_id']
+    assert put_chunk(client, headers, upload_id, 0, data).status_code == 200
+    return upload_id
+
+
+def artwork_ids(response):
+    assert response.status_code == 200, response.get_json()
+    return [artwork['id'] for artwork in response.get_json()]
+
+
+def test_attaching_an_audio_upload_updates_the_has_audio_filter(client, admin_headers, room_id):
+    artwork_id = insert_artwork(room_id)
+    assert artwork_id not in artwork_ids(client.get('/api/artworks/search?has_audio=true'))
+
+    upload_id = upload(client, admin_headers)
+    response = client.post(f'/api/uploads/{upload_id}/complete',
+                           json={'sha256': hashlib.sha256(AUDIO).hexdigest(), 'artwork_id': artwork_id},
+                           headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()['attached_to'] == {'type': 'artwork', 'id': artwork_id}
+
+    assert artwork_id in artwork_ids(client.get('/api/artworks/search?has_audio=true'))
+    assert artwork_id not in artwork_ids(client.get('/api/artworks/search?has_audio=false'))
+
+
+def ref_count(url):
+    conn = sqlite3.connect('museum.db')
+    row = conn.execute("SELECT ref_count FROM media_blobs WHERE url = ?", (url,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def test_chunks_resume_from_the_server_offset(client, admin_headers):
+    response = init_upload(client, admin_headers)
+    assert response.status_code == 201
+    session = response.get_json()
+    assert session['offset'] == 0 and not session['complete']
+    upload_id = session['upload_id']
+
+    half = len(AUDIO) // 2
+    assert put_chunk(client, admin_headers, upload_id, 0, AUDIO[:half]).get_json()['offset'] == half
+
+    # Morceau renvoyé au mauvais endroit : 409 avec la position attendue
+    response = put_chunk(client, admin_headers, upload_id, 0, AUDIO[:half])
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == half
+
+    # Reprise : le client relit la position puis envoie la suite
+    offset = client.get(f'/api/uploads/{upload_id}', headers=admin_headers).get_json()['offset']
+    assert offset == half
+    assert put_chunk(client, admin_headers, upload_id, offset, AUDIO[offset:]).get_json()['offset'] == len(AUDIO)
+
+    response = client.post(f'/api/uploads/{upload_id}/complete',
+                           json={'sha256': hashlib.sha256(AUDIO).hexdigest()}, headers=admin_headers)
+    assert response.status_code == 200
+    url = response.get_json()['url']
+    with open(url.lstrip('/'), 'rb') as f:
+        assert f.read() == AUDIO
+    assert ref_count(url) == 1
+
+
+def test_incomplete_and_oversized_chunks_are_refused(client, admin_headers):
+    upload_id = init_upload(client, admin_headers).get_json()['upload_id']
+
+    assert client.post(f'/api/uploads/{upload_id}/complete', json={}, headers=admin_headers).status_code == 400
+    assert put_chunk(client, admin_headers, upload_id, 0, AUDIO + b'en trop').status_code == 413
+    assert client.get(f'/api/uploads/{upload_id}', headers=admin_headers).get_json()['offset'] == 0
+    assert put_chunk(client, admin_headers, upload_id, 0, b'pas un fichier audio').status_code == 415
+
+
+def test_checksum_mismatch_resets_the_upload(client, admin_headers):
+    upload_id = upload(client, admin_headers)
+
+    response = client.post(f'/api/uploads/{upload_id}/complete', json={'sha256': '0' * 64}, headers=admin_headers)
+    assert response.status_code == 400
+    assert client.get(f'/api/uploads/{upload_id}', headers=admin_headers).get_json()['offset'] == 0
+
+    assert put_chunk(client, admin_headers, upload_id, 0, AUDIO).status_code == 200
+    response = client.post(f'/api/uploads/{upload_id}/complete', json={}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()['complete']
+
+
+def test_abort_removes_the_partial_file(client, admin_headers, workdir):
+    upload_id = init_upload(client, admin_headers).get_json()['upload_id']
+    put_chunk(client, admin_headers, upload_id, 0, AUDIO[:100])
+    part = workdir / 'uploads_tmp' / f'{upload_id}.part'
+    assert part.exists()
+
+    assert client.delete(f'/api/uploads/{upload_id}', headers=admin_headers).status_code == 200
+    assert not part.exists()
+    assert client.get(f'/api/uploads/{upload_id}', headers=admin_headers).status_code == 404
+    assert client.delete(f'/api/uploads/{upload_id}', headers=admin_headers).status_code == 404
+
+
+def test_aborting_a_completed_upload_releases_its_blob(client, admin_headers):
+    upload_id = upload(client, admin_headers)
+    url = client.post(f'/api/uploads/{upload_id}/complete', json={}, headers=admin_headers).get_json()['url']
+
+    assert client.delete(f'/api/uploads/{upload_id}', headers=admin_headers).status_code == 200
+    assert ref_count(url) is None
+    assert not os.path.exists(url.lstrip('/'))
+
+
+def test_known_checksum_completes_without_sending_anything(client, admin_headers):
+    first = upload(client, admin_headers)
+    url = client.post(f'/api/uploads/{first}/complete', json={}, headers=admin_headers).get_json()['url']
+
+    session = init_upload(client, admin_headers, sha256=hashlib.sha256(AUDIO).hexdigest()).get_json()
+    assert session['complete'] and session['url'] == url
+    assert ref_count(url) == 2
+
+
+def test_an_upload_is_attached_once(client, admin_headers, room_id):
+    artwork_id = insert_artwork(room_id)
+    upload_id = upload(client, admin_headers)
+    client.post(f'/api/uploads/{upload_id}/complete', json={'artwork_id': artwork_id}, headers=admin_headers)
+
+    response = client.post(f'/api/uploads/{upload_id}/complete', json={'artwork_id': artwork_id},
+                           headers=admin_headers)
+    assert response.status_code == 400
+    response = client.post(f'/api/uploads/{upload(client, admin_headers)}/complete', json={'room_id': room_id},
+                           headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_stale_sessions_are_purged_and_unattached_blobs_released(workdir, room_id):
+    from src.infrastructure.media.blob_store import MediaBlobStore
+    from src.infrastructure.media.chunked_uploads import ChunkedUploadService
+
+    store = MediaBlobStore('museum.db', {'audio': ('static/audios', '/static/audios')}, 'uploads_tmp')
+    uploads = ChunkedUploadService('museum.db', 'uploads_tmp', store, 10 * 1024 * 1024)
+
+    def completed_session(data):
+        session = uploads.create('audio', 'guide.mp3', len(data))
+        uploads.write_chunk(session.id, 0, io.BytesIO(data))
+        return uploads.complete(session.id)
+
+    unfinished = uploads.create('audio', 'guide.mp3', len(AUDIO))
+    unattached = completed_session(AUDIO)
+    attached = completed_session(AUDIO + b'1')
+    artwork_id = insert_artwork(room_id)
+    uploads.attach(attached.id, 'artwork', artwork_id)
+
+    assert uploads.purge_stale(max_age=-1) == 3
+
+    assert not os.path.exists(os.path.join('uploads_tmp', f'{unfinished.id}.part'))
+    assert ref_count(unattached.completed_url) is None
+    assert not os.path.exists(unattached.completed_url.lstrip('/'))
+    assert ref_count(attached.completed_url) == 1
+    assert os.path.exists(attached.completed_url.lstrip('/'))
@@ -0,0 +1,35 @@
+"""
+Images resized on demand from the disk cache
+"""
+import os
+
+from conftest import insert_artwork, jpeg_bytes
+from src.infrastructure.media.image_resizer import OnDemandImageResizer
+
+
+def insert_artwork_with_image(room_id):
+    with open('static/images/masque.jpg', 'wb') as f:
+        f.write(jpeg_bytes(size=(200, 100)))
+    return insert_artwork(room_id, image_url='/static/images/masque.jpg')
+
+
+def test_resized_variant_evicted_before_sending_is_rendered_again(client, room_id, monkeypatch):
+    artwork_id = insert_artwork_with_image(room_id)
+    render = OnDemandImageResizer.render
+    evicted = []
+
+    def evicting_render(self, *args, **kwargs):
+        path, mimetype = render(self, *args, **kwargs)
+        if not evicted:
+            # Éviction par une requête concurrente entre la recherche et l'ouverture
+            os.remove(path)
+            evicted.append(path)
+        return path, mimetype
+
+    monkeypatch.setattr(OnDemandImageResizer, 'render', evicting_render)
+    response = client.get(f'/media/img/{artwork_id}?w=50&fmt=jpeg')
+
+    assert evicted
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert os.path.exists(evicted[0])
@@ -0,0 +1,154 @@
+"""
+Flat to sharded media layout migration: dry run, partial failures, collisions, rollback and reruns
+"""
+import json
+import os
+
+import pytest
+
+import database
+from conftest import insert_artwork
+from src.infrastructure.media.layout_migration import MediaLayoutMigration
+from src.infrastructure.media.sharding import sharded_name
+
+FOLDERS = {
+    '/static/images': 'static/images',
+    '/static/audios': 'static/audios',
+    '/static/videos': 'static/videos',
+    '/static/qrcodes': 'static/qrcodes',
+}
+
+
+def write(path: str, content: bytes = b'data') -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def column(table: str, name: str, row_id: int):
+    conn = database.get_connection()
+    value = conn.execute(f"SELECT {name} FROM {table} WHERE id = ?", (row_id,)).fetchone()[0]
+    conn.close()
+    return value
+
+
+def migration() -> MediaLayoutMigration:
+    return MediaLayoutMigration(database.DB_NAME, FOLDERS, qr_folder='static/qrcodes')
+
+
+@pytest.fixture
+def artwork(room_id):
+    """An artwork with a flat image, one derivative and its variants map"""
+    write('static/images/masque.jpg')
+    write('static/images/masque_w320.webp')
+    variants = json.dumps({'webp': {'320': '/static/images/masque_w320.webp'}})
+    return insert_artwork(room_id, image_url='/static/images/masque.jpg', image_variants=variants)
+
+
+def sharded(url: str) -> str:
+    prefix, _, name = url.rpartition('/')
+    return f"{prefix}/{sharded_name(name)}"
+
+
+def test_dry_run_changes_nothing(artwork):
+    report = migration().run(dry_run=True)
+
+    assert report.files_moved == 2
+    assert report.rows_updated == 2
+    assert os.path.exists('static/images/masque.jpg')
+    assert column('artworks', 'image_url', artwork) == '/static/images/masque.jpg'
+
+
+def test_moves_files_and_rewrites_urls(artwork):
+    report = migration().run()
+
+    new_url = sharded('/static/images/masque.jpg')
+    assert report.errors == []
+    assert column('artworks', 'image_url', artwork) == new_url
+    assert os.path.exists(new_url.lstrip('/'))
+    assert not os.path.exists('static/images/masque.jpg')
+    variants = json.loads(column('artworks', 'image_variants', artwork))
+    assert variants['webp']['320'] == os.path.splitext(new_url)[0] + '_w320.webp'
+    assert os.path.exists(variants['webp']['320'].lstrip('/'))
+
+
+def test_failed_move_keeps_the_flat_url(artwork, monkeypatch):
+    original_move = MediaLayoutMigration._move
+
+    def failing_move(source, destination):
+        if source.endswith('_w320.webp'):
+            raise OSError('disk full')
+        original_move(source, destination)
+
+    monkeypatch.setattr(MediaLayoutMigration, '_move', staticmethod(failing_move))
+    report = migration().run()
+
+    assert len(report.errors) == 1
+    # Le groupe est remis en place et l'URL n'est pas réécrite
+    assert column('artworks', 'image_url', artwork) == '/static/images/masque.jpg'
+    assert os.path.exists('static/images/masque.jpg')
+    assert os.path.exists('static/images/masque_w320.webp')
+    assert 'masque_w320' in column('artworks', 'image_variants', artwork)
+    assert sharded('/static/images/masque.jpg') not in column('artworks', 'image_variants', artwork)
+
+
+def test_same_file_name_in_two_folders_is_skipped(room_id):
+    write('static/images/a/x.jpg', b'first')
+    write('static/images/b/x.jpg', b'second')
+    first = insert_artwork(room_id, image_url='/static/images/a/x.jpg')
+    second = insert_artwork(room_id, image_url='/static/images/b/x.jpg')
+
+    report = migration().run()
+
+    assert {error['file'] for error in report.errors} == {'/static/images/a/x.jpg', '/static/images/b/x.jpg'}
+    assert column('artworks', 'image_url', first) == '/static/images/a/x.jpg'
+    assert column('artworks', 'image_url', second) == '/static/images/b/x.jpg'
+    with open('static/images/a/x.jpg', 'rb') as f:
+        assert f.read() == b'first'
+    with open('static/images/b/x.jpg', 'rb') as f:
+        assert f.read() == b'second'
+
+
+def test_existing_destination_is_not_overwritten(artwork):
+    destination = sharded('/static/images/masque.jpg').lstrip('/')
+    write(destination, b'other')
+
+    report = migration().run()
+
+    assert len(report.errors) == 1
+    assert column('artworks', 'image_url', artwork) == '/static/images/masque.jpg'
+    with open(destination, 'rb') as f:
+        assert f.read() == b'other'
+
+
+def test_database_failure_moves_the_files_back(artwork, monkeypatch):
+    def failing_remap(self, value, moves, stems):
+        raise RuntimeError('database error')
+
+    monkeypatch.setattr(MediaLayoutMigration, '_remap_json', failing_remap)
+    with pytest.raises(RuntimeError):
+        migration().run()
+
+    assert os.path.exists('static/images/masque.jpg')
+    assert os.path.exists('static/images/masque_w320.webp')
+    assert not os.path.exists(sharded('/static/images/masque.jpg').lstrip('/'))
+    assert column('artworks', 'image_url', artwork) == '/static/images/masque.jpg'
+
+
+def test_rerun_only_finishes_what_is_left(artwork):
+    # Exécution interrompue : le fichier a été déplacé mais la base n'a pas été mise à jour
+    new_url = sharded('/static/images/masque.jpg')
+    write(new_url.lstrip('/'))
+    os.remove('static/images/masque.jpg')
+
+    report = migration().run()
+    assert column('artworks', 'image_url', artwork) == new_url
+    assert report.missing_files == []
+    variants = json.loads(column('artworks', 'image_variants', artwork))
+    assert os.path.exists(variants['webp']['320'].lstrip('/'))
+
+    again = migration().run()
+    assert again.files_moved == 0
+    assert again.rows_updated == 0
+    assert again.already_sharded == 1
+    assert column('artworks', 'image_url', artwork) == new_url
@@ -0,0 +1,118 @@
+"""
+Orphan sweep safety on the flat (legacy) and sharded media layouts
+"""
+import os
+import time
+
+import pytest
+
+import database
+from src.infrastructure.media.blob_store import MediaBlobStore
+from src.infrastructure.media.garbage_collector import MediaGarbageCollector
+from src.infrastructure.media.sharding import sharded_name
+
+FOLDERS = ('static/images', 'static/audios', 'static/videos', 'static/qrcodes')
+LONG_AGO = time.time() - 7 * 24 * 3600
+
+
+def write_file(path, age=LONG_AGO):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'data')
+    os.utime(path, (age, age))
+    return path
+
+
+def insert_artwork(room_id, image_url, qr_code_url=None):
+    conn = database.get_connection()
+    cur = conn.execute(
+        "INSERT INTO artworks (room_id, title, image_url, qr_code_url) VALUES (?, 'Masque', ?, ?)",
+        (room_id, image_url, qr_code_url)
+    )
+    conn.commit()
+    artwork_id = cur.lastrowid
+    conn.close()
+    return artwork_id
+
+
+@pytest.fixture
+def collector(workdir):
+    store = MediaBlobStore('museum.db', {'image': ('static/images', '/static/images')}, 'uploads_tmp')
+    gc = MediaGarbageCollector('museum.db', store, FOLDERS, 'static/qrcodes', sweep_interval=0)
+    yield gc
+    gc.close()
+
+
+def test_sweep_keeps_referenced_flat_files(collector, room_id):
+    image = write_file('static/images/masque.jpg')
+    artwork_id = insert_artwork(room_id, '/static/images/masque.jpg')
+    artwork_qr = write_file(f'static/qrcodes/artwork_{artwork_id}.png')
+    room_qr = write_file(f'static/qrcodes/room_{room_id}.png')
+    orphan = write_file('static/images/orphelin.jpg')
+    orphan_qr = write_file('static/qrcodes/artwork_999.png')
+
+    report = collector.sweep()
+
+    assert os.path.exists(image)
+    assert os.path.exists(artwork_qr)
+    assert os.path.exists(room_qr)
+    assert not os.path.exists(orphan)
+    assert not os.path.exists(orphan_qr)
+    assert len(report.deleted) == 2
+
+
+def test_sweep_keeps_referenced_sharded_files(collector, room_id):
+    image_name = sharded_name('masque.jpg')
+    image = write_file(f'static/images/{image_name}')
+    artwork_id = insert_artwork(room_id, f'/static/images/{image_name}')
+    artwork_qr = write_file(f"static/qrcodes/{sharded_name(f'artwork_{artwork_id}.png')}")
+    room_qr = write_file(f"static/qrcodes/{sharded_name(f'room_{room_id}.png')}")
+    orphan = write_file(f"static/images/{sharded_name('orphelin.jpg')}")
+
+    collector.sweep()
+
+    assert os.path.exists(image)
+    assert os.path.exists(artwork_qr)
+    assert os.path.exists(room_qr)
+    assert not os.path.exists(orphan)
+
+
+def test_sweep_keeps_derivatives_next_to_their_source(collector, room_id):
+    image_name = sharded_name('masque.jpg')
+    write_file(f'static/images/{image_name}')
+    derivative = write_file(f"static/images/{image_name.rsplit('/', 1)[0]}/masque_w640.webp")
+    insert_artwork(room_id, f'/static/images/{image_name}')
+
+    collector.sweep()
+
+    assert os.path.exists(derivative)
+
+
+def test_sweep_keeps_recent_files_and_dry_run_deletes_nothing(collector):
+    recent = write_file('static/images/en_cours.jpg', age=time.time())
+    orphan = write_file('static/images/orphelin.jpg')
+
+    report = collector.sweep(dry_run=True)
+
+    assert report.deleted == [os.path.normpath(orphan)]
+    assert report.skipped_recent == 1
+    assert os.path.exists(orphan)
+    assert os.path.exists(recent)
+
+
+def test_queued_qr_deletes_look_up_their_target(collector, room_id, monkeypatch):
+    artwork_id = insert_artwork(room_id, '/static/images/masque.jpg')
+    kept = write_file(f"static/qrcodes/{sharded_name(f'artwork_{artwork_id}.png')}")
+    kept_room = write_file(f'static/qrcodes/room_{room_id}.png')
+    deleted = write_file(f"static/qrcodes/{sharded_name('artwork_999.png')}")
+
+    def full_scan(conn):
+        raise AssertionError("queued QR deletes must not scan the catalog")
+
+    monkeypatch.setattr(collector, '_referenced_qr_paths', full_scan)
+    collector.enqueue(['/' + kept, '/' + kept_room, '/' + deleted])
+    collector.process_queue()
+
+    assert os.path.exists(kept)
+    assert os.path.exists(kept_room)
+    assert not os.path.exists(deleted)
@@ -0,0 +1,160 @@
+"""
+Reference counting of deduplicated media across create, update and delete
+"""
+import io
+import os
+import sqlite3
+
+import pytest
+
+from conftest import jpeg_bytes
+from src.infrastructure.media.garbage_collector import MediaGarbageCollector
+
+ARTWORK_FORM = {
+    'title': 'Masque', 'description_fr': 'Description', 'description_en': 'Description',
+    'description_wo': 'Description', 'category': 'Masque', 'period': 'XXe siècle', 'origin': 'Sénégal',
+}
+
+
+@pytest.fixture(autouse=True)
+def no_background_collector(monkeypatch):
+    # La file est vidée par POST /api/admin/media/gc uniquement : pas de lot pris par le thread en parallèle
+    monkeypatch.setattr(MediaGarbageCollector, 'start', lambda self: None)
+
+
+def ref_count(url):
+    conn = sqlite3.connect('museum.db')
+    row = conn.execute("SELECT ref_count FROM media_blobs WHERE url = ?", (url,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def local_path(url):
+    return url.lstrip('/')
+
+
+def artwork_form(room_id, image):
+    return dict(ARTWORK_FORM, room_id=str(room_id), image_file=(io.BytesIO(image), 'masque.jpg'))
+
+
+def drain_queue(client, headers):
+    response = client.post('/api/admin/media/gc', json={}, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def create_artwork(client, headers, room_id, image):
+    response = client.post('/api/artworks/', data=artwork_form(room_id, image),
+                           headers=headers, content_type='multipart/form-data')
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def test_create_acquires_one_reference(client, admin_headers, room_id):
+    artwork = create_artwork(client, admin_headers, room_id, jpeg_bytes())
+
+    assert ref_count(artwork['image_url']) == 1
+    assert os.path.exists(local_path(artwork['image_url']))
+
+
+def test_identical_upload_shares_the_blob(client, admin_headers, room_id):
+    image = jpeg_bytes()
+    first = create_artwork(client, admin_headers, room_id, image)
+    second = create_artwork(client, admin_headers, room_id, image)
+
+    assert first['image_url'] == second['image_url']
+    assert ref_count(first['image_url']) == 2
+
+
+def test_reuploading_same_bytes_does_not_leak_a_reference(client, admin_headers, room_id):
+    image = jpeg_bytes()
+    artwork = create_artwork(client, admin_headers, room_id, image)
+
+    for _ in range(2):
+        response = client.put(f"/api/artworks/{artwork['id']}", data=artwork_form(room_id, image),
+                              headers=admin_headers, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.get_json()['image_url'] == artwork['image_url']
+        drain_queue(client, admin_headers)
+        assert ref_count(artwork['image_url']) == 1
+
+    response = client.delete(f"/api/artworks/{artwork['id']}", headers=admin_headers)
+    assert response.status_code == 200
+    drain_queue(client, admin_headers)
+
+    assert ref_count(artwork['image_url']) is None
+    assert not os.path.exists(local_path(artwork['image_url']))
+
+
+def test_replacing_the_image_releases_the_old_one(client, admin_headers, room_id):
+    artwork = create_artwork(client, admin_headers, room_id, jpeg_bytes())
+
+    response = client.put(f"/api/artworks/{artwork['id']}",
+                          data=artwork_form(room_id, jpeg_bytes(color=(10, 60, 200))),
+                          headers=admin_headers, content_type='multipart/form-data')
+    assert response.status_code == 200
+    new_url = response.get_json()['image_url']
+    drain_queue(client, admin_headers)
+
+    assert new_url != artwork['image_url']
+    assert ref_count(new_url) == 1
+    assert ref_count(artwork['image_url']) is None
+    assert not os.path.exists(local_path(artwork['image_url']))
+
+
+def test_shared_blob_survives_deleting_one_owner(client, admin_headers, room_id):
+    image = jpeg_bytes()
+    first = create_artwork(client, admin_headers, room_id, image)
+    create_artwork(client, admin_headers, room_id, image)
+
+    client.delete(f"/api/artworks/{first['id']}", headers=admin_headers)
+    drain_queue(client, admin_headers)
+
+    assert ref_count(first['image_url']) == 1
+    assert os.path.exists(local_path(first['image_url']))
+
+
+def test_reuploading_same_panorama_does_not_leak_a_reference(client, admin_headers, room_id):
+    form = {
+        'name_fr': 'Salle test', 'description_fr': 'Description', 'description_en': 'Description',
+        'description_wo': 'Description', 'theme': 'Histoire', 'accessibility_level': 'facile',
+    }
+    image = jpeg_bytes(size=(64, 32))
+    urls = set()
+    for _ in range(3):
+        response = client.put(f'/api/rooms/{room_id}', data=dict(form, panorama_file=(io.BytesIO(image), 'salle.jpg')),
+                              headers=admin_headers, content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+        urls.add(response.get_json()['panorama_url'])
+        drain_queue(client, admin_headers)
+
+    assert len(urls) == 1
+    assert ref_count(urls.pop()) == 1
+
+
+def test_rejected_create_releases_the_stored_file(client, admin_headers, room_id):
+    image = jpeg_bytes(color=(1, 2, 3))
+    response = client.post('/api/artworks/', data={'title': 'Masque', 'image_file': (io.BytesIO(image), 'masque.jpg')},
+                           headers=admin_headers, content_type='multipart/form-data')
+    assert response.status_code == 400
+
+    conn = sqlite3.connect('museum.db')
+    assert conn.execute("SELECT COUNT(*) FROM media_blobs").fetchone()[0] == 0
+    conn.close()
+    assert [name for _, _, names in os.walk('static/images') for name in names] == []
+
+
+def test_rejected_update_keeps_the_shared_count_right(client, admin_headers, room_id):
+    image = jpeg_bytes()
+    artwork = create_artwork(client, admin_headers, room_id, image)
+
+    # Salle inconnue : 404 après l'enregistrement du fichier (déjà stocké, partagé)
+    response = client.put(f"/api/artworks/{artwork['id']}", data=artwork_form(9999, image),
+                          headers=admin_headers, content_type='multipart/form-data')
+    assert response.status_code == 404
+    assert ref_count(artwork['image_url']) == 1
+
+    response = client.put(f'/api/rooms/{room_id}', data={'name_fr': 'Salle', 'panorama_file': (io.BytesIO(image), 'p.jpg')},
+                          headers=admin_headers, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert ref_count(artwork['image_url']) == 1
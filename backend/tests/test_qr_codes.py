@@ -0,0 +1,82 @@
+"""
+QR codes rendered on demand from the disk cache
+"""
+import os
+
+from src.infrastructure.qr.qr_renderer import OnDemandQRCodeRenderer
+
+
+def test_qr_code_is_rendered_then_served_from_cache(client, room_id):
+    first = client.get(f'/api/rooms/{room_id}/qr.png')
+    second = client.get(f'/api/rooms/{room_id}/qr.png')
+
+    assert first.status_code == second.status_code == 200
+    assert first.mimetype == 'image/png'
+    assert first.data == second.data
+
+
+def test_qr_code_evicted_before_sending_is_rendered_again(client, room_id, monkeypatch):
+    render_encoded = OnDemandQRCodeRenderer.render_encoded
+    evicted = []
+
+    def evicting_render_encoded(self, *args, **kwargs):
+        path, mimetype, encoding = render_encoded(self, *args, **kwargs)
+        if not evicted:
+            # Éviction par une requête concurrente entre la recherche et l'ouverture
+            os.remove(path)
+            evicted.append(path)
+        return path, mimetype, encoding
+
+    monkeypatch.setattr(OnDemandQRCodeRenderer, 'render_encoded', evicting_render_encoded)
+    response = client.get(f'/api/rooms/{room_id}/qr.svg', headers={'Accept-Encoding': 'identity'})
+
+    assert evicted
+    assert response.status_code == 200
+    assert response.data.lstrip().startswith(b'<')
+    assert os.path.exists(evicted[0])
+
+
+def test_qr_sheet_tiles_are_rendered_on_the_shared_pool():
+    import io
+
+    from PIL import Image
+
+    from src.infrastructure.media import workers
+    from src.infrastructure.qr.qr_sheet import INLINE_TILE_THRESHOLD, SPRITE_COLUMNS, SPRITE_TILE_SIZE, QRSheetRenderer
+
+    items = [(f'https://example.org/q/{i}', f'Œuvre {i}') for i in range(INLINE_TILE_THRESHOLD + 1)]
+    try:
+        data = b''.join(QRSheetRenderer(workers=2).render(items, 'png'))
+        # Le pool partagé survit à la planche
+        assert workers._pool is not None
+    finally:
+        workers.shutdown_media_pool()
+
+    rows = -(-len(items) // SPRITE_COLUMNS)
+    assert Image.open(io.BytesIO(data)).size == (SPRITE_COLUMNS * SPRITE_TILE_SIZE[0], rows * SPRITE_TILE_SIZE[1])
+
+
+def test_created_records_point_at_the_on_demand_qr_route(client, admin_headers, room_id):
+    import io
+
+    from conftest import jpeg_bytes
+
+    room_form = {field: 'Salle' for field in ('name_fr', 'name_en', 'name_wo', 'description_fr', 'description_en',
+                                                'description_wo', 'theme')}
+    room_form['accessibility_level'] = 'facile'
+    room_form['panorama_file'] = (io.BytesIO(jpeg_bytes()), 'panorama.jpg')
+    room = client.post('/api/admin/rooms', data=room_form, headers=admin_headers, content_type='multipart/form-data')
+
+    artwork_form = {field: 'Masque' for field in ('title', 'description_fr', 'description_en', 'description_wo',
+                                                  'category', 'period', 'origin')}
+    artwork_form.update(room_id=str(room_id), image_file=(io.BytesIO(jpeg_bytes()), 'masque.jpg'))
+    artwork = client.post('/api/artworks/', data=artwork_form, headers=admin_headers, content_type='multipart/form-data')
+
+    assert room.status_code == artwork.status_code == 201
+    room_qr = room.get_json()['qr_code_url']
+    artwork_qr = artwork.get_json()['qr_code_url']
+    assert room_qr == f"/api/rooms/{room.get_json()['room_id']}/qr.png"
+    assert artwork_qr == f"/api/artworks/{artwork.get_json()['id']}/qr.png"
+    # Plus de PNG généré d'avance
+    assert not any(files for _, _, files in os.walk('static/qrcodes'))
+    assert client.get(room_qr).mimetype == client.get(artwork_qr).mimetype == 'image/png'
@@ -0,0 +1,26 @@
+"""
+Worker count validation of POST /api/admin/qrcodes/regenerate
+"""
+import pytest
+
+
+@pytest.mark.parametrize('workers', [0, -3, 'abc', 1.5, True, [2]])
+def test_invalid_worker_count_is_400(client, admin_headers, workers):
+    response = client.post('/api/admin/qrcodes/regenerate', json={'workers': workers}, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert 'workers' in response.get_json()['error']
+
+
+def test_worker_count_is_capped_at_the_cpu_count(client, admin_headers, room_id, monkeypatch):
+    import src.interfaces.controllers as controllers
+    monkeypatch.setattr(controllers.os, 'cpu_count', lambda: 1)
+
+    response = client.post('/api/admin/qrcodes/regenerate', json={'workers': 10 ** 6}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['failed'] == 0
+
+
+def test_regeneration_requires_an_admin(client):
+    assert client.post('/api/admin/qrcodes/regenerate', json={}).status_code == 401
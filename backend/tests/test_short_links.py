@@ -0,0 +1,117 @@
+"""
+Short codes of the QR codes: /q/<code> redirects, unknown codes stay off the database
+"""
+import sqlite3
+
+import pytest
+
+from src.infrastructure.qr.short_links import ShortLinkService, base62_decode, base62_encode
+
+
+class CountingShortLinkService(ShortLinkService):
+    """Counts the connections opened after construction"""
+
+    queries = 0
+
+    def _get_connection(self) -> sqlite3.Connection:
+        self.queries += 1
+        return super()._get_connection()
+
+
+@pytest.fixture
+def service(workdir):
+    links = CountingShortLinkService('museum.db', 'http://musee.test', refresh_interval=3600)
+    links.load()
+    links.queries = 0
+    return links
+
+
+def test_base62_round_trip():
+    for number in (1, 61, 62, 3844, 10 ** 12):
+        assert base62_decode(base62_encode(number)) == number
+    assert base62_decode('0a') is None
+    assert base62_decode('ab-c') is None
+    assert base62_decode('z' * 40) is None
+
+
+def test_scanned_code_redirects_to_the_frontend(client, room_id):
+    # Le rendu du QR code crée le code court de la salle
+    assert client.get(f'/api/rooms/{room_id}/qr.svg').status_code == 200
+    conn = sqlite3.connect('museum.db')
+    code = conn.execute(
+        "SELECT code FROM short_codes WHERE target_type = 'room' AND target_id = ?", (room_id,)
+    ).fetchone()[0]
+    conn.close()
+
+    response = client.get(f'/q/{code}')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/rooms/{room_id}')
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+def test_unknown_code_is_404(client):
+    assert client.get('/q/zzzz').status_code == 404
+    assert client.get('/q/0abc').status_code == 404
+
+
+def test_unknown_codes_do_not_query_the_database(service):
+    code = service.code_for('artwork', 1)
+    service.queries = 0
+
+    for unknown in ('0', '-', 'abc_def', base62_encode(1) + '!', 'zz'):
+        assert service.resolve(unknown) is None
+    assert service.resolve(code) == ('artwork', 1)
+    assert service.queries == 0
+
+
+def test_codes_created_elsewhere_are_found_with_one_reload(service):
+    other = ShortLinkService('museum.db', 'http://musee.test')
+    codes = [other.code_for('artwork', artwork_id) for artwork_id in (7, 8)]
+
+    service.refresh_interval = 0
+    assert service.resolve(codes[1]) == ('artwork', 8)
+    assert service.resolve(codes[0]) == ('artwork', 7)
+    assert service.queries == 1
+
+
+def test_reloads_are_throttled(service):
+    service.code_for('artwork', 1)
+    service.queries = 0
+
+    for number in range(100, 200):
+        assert service.resolve(base62_encode(number)) is None
+    assert service.queries == 0
+
+    service.refresh_interval = 0
+    service.resolve(base62_encode(500))
+    assert service.queries == 1
+
+
+def short_code(target_type, target_id):
+    conn = sqlite3.connect('museum.db')
+    row = conn.execute(
+        "SELECT code FROM short_codes WHERE target_type = ? AND target_id = ?", (target_type, target_id)
+    ).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def test_codes_stop_resolving_once_their_target_is_deleted(client, admin_headers, room_id):
+    from conftest import insert_artwork
+
+    artwork_id = insert_artwork(room_id)
+    other_id = insert_artwork(room_id)
+    for url in (f'/api/artworks/{artwork_id}/qr.svg', f'/api/artworks/{other_id}/qr.svg', f'/api/rooms/{room_id}/qr.svg'):
+        assert client.get(url).status_code == 200
+    artwork_code, other_code, room_code = short_code('artwork', artwork_id), short_code('artwork', other_id), short_code('room', room_id)
+
+    assert client.delete(f'/api/artworks/{artwork_id}', headers=admin_headers).status_code == 200
+    assert short_code('artwork', artwork_id) is None
+    assert client.get(f'/q/{artwork_code}').status_code == 404
+    assert client.get(f'/q/{other_code}').status_code == 302
+
+    assert client.delete(f'/api/rooms/{room_id}', headers=admin_headers).status_code == 200
+    assert short_code('room', room_id) is None
+    assert short_code('artwork', other_id) is None
+    assert client.get(f'/q/{room_code}').status_code == 404
+    assert client.get(f'/q/{other_code}').status_code == 404
@@ -0,0 +1,109 @@
+"""
+Similar artworks: sparse TF-IDF neighbors and debounced recomputation
+"""
+import math
+import random
+import time
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.infrastructure.search import similarity
+from src.infrastructure.search.similarity import (
+    SIMILARITY_TEXT_FIELDS, SIMILARITY_WEIGHTS, SimilarArtworksService, _tokens, compute_similar_artworks
+)
+from src.infrastructure.search.text import normalize_text
+
+
+def random_artworks(n, seed=7):
+    rnd = random.Random(seed)
+    words = [f"terme{i}x" for i in range(400)]
+    return [{
+        'id': 100 + i,
+        'title': ' '.join(rnd.choices(words[:50], k=2)),
+        'description_fr': ' '.join(rnd.choices(words, k=rnd.randint(0, 25))),
+        'description_en': ' '.join(rnd.choices(words, k=10)),
+        'description_wo': None,
+        'category': rnd.choice(['Masque', 'Sculpture', None]),
+        'period': rnd.choice(['XXe siècle', 'XIXe siècle', '']),
+        'origin': rnd.choice(['Sénégal', 'Mali', None]),
+    } for i in range(n)]
+
+
+def dense_scores(artworks):
+    """Reference: the full similarity matrix with dense TF-IDF vectors"""
+    n = len(artworks)
+    counts = [Counter(t for field in SIMILARITY_TEXT_FIELDS for t in _tokens(a.get(field) or '')) for a in artworks]
+    df = Counter(term for document in counts for term in document)
+    vocabulary = sorted(term for term, frequency in df.items() if frequency > 1)
+    text = np.array([[(1 + math.log(c[term])) * (math.log((1 + n) / (1 + df[term])) + 1) if term in c else 0.0
+                      for term in vocabulary] for c in counts])
+    norms = np.linalg.norm(text, axis=1, keepdims=True)
+    text /= np.where(norms > 0, norms, 1)
+    scores = SIMILARITY_WEIGHTS['text'] * (text @ text.T)
+    for field in ('category', 'period', 'origin'):
+        values = [normalize_text(a.get(field) or '') for a in artworks]
+        scores += SIMILARITY_WEIGHTS[field] * np.array([[v != '' and v == w for w in values] for v in values])
+    return scores
+
+
+def test_neighbors_match_the_dense_computation(monkeypatch):
+    # Petits blocs et petits lots de paires : plusieurs passages de chaque boucle
+    monkeypatch.setattr(similarity, '_BLOCK_CELLS', 7 * 60)
+    monkeypatch.setattr(similarity, '_PAIR_CHUNK', 50)
+    artworks = random_artworks(60)
+    scores = dense_scores(artworks)
+    index = {artwork['id']: i for i, artwork in enumerate(artworks)}
+
+    rows = compute_similar_artworks(artworks, k=5)
+
+    assert rows
+    for artwork_id, rank, neighbor_id, score in rows:
+        assert neighbor_id != artwork_id
+        assert score == pytest.approx(scores[index[artwork_id], index[neighbor_id]], abs=2e-4)
+    for artwork_id in {row[0] for row in rows}:
+        own = [row for row in rows if row[0] == artwork_id]
+        assert [row[1] for row in own] == list(range(len(own)))
+        expected = sorted((s for j, s in enumerate(scores[index[artwork_id]]) if j != index[artwork_id]),
+                          reverse=True)[:len(own)]
+        assert [row[3] for row in own] == pytest.approx(expected, abs=2e-4)
+
+
+def test_artworks_without_shared_terms_have_no_text_neighbors():
+    rows = compute_similar_artworks([{'id': 1, 'title': 'unique'}, {'id': 2, 'title': 'autre'},
+                                     {'id': 3, 'category': 'Masque'}, {'id': 4, 'category': 'Masque'}])
+    assert rows == [(3, 0, 4, 0.2), (4, 0, 3, 0.2)]
+
+
+@pytest.fixture
+def submissions(monkeypatch):
+    calls = []
+    monkeypatch.setattr(similarity, 'submit_media_job', lambda *args, **kwargs: calls.append(time.monotonic()))
+    return calls
+
+
+def test_schedule_restarts_the_delay_on_each_write(workdir, submissions):
+    service = SimilarArtworksService('museum.db', delay=0.3, max_delay=10)
+
+    for _ in range(4):
+        service.schedule()
+        time.sleep(0.1)
+    last_write = time.monotonic()
+    assert submissions == []
+
+    time.sleep(0.6)
+    assert len(submissions) == 1
+    assert submissions[0] >= last_write + 0.15
+
+
+def test_continuous_writes_still_refresh_after_max_delay(workdir, submissions):
+    service = SimilarArtworksService('museum.db', delay=0.3, max_delay=0.5)
+
+    started = time.monotonic()
+    while time.monotonic() - started < 1.2:
+        service.schedule()
+        time.sleep(0.05)
+
+    assert len(submissions) >= 1
+    assert submissions[0] - started < 0.8
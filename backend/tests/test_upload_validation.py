@@ -0,0 +1,112 @@
+"""
+Uploads refused with 413 / 415 while the body is read, before anything is stored
+"""
+import io
+import os
+
+import pytest
+
+from conftest import jpeg_bytes
+from src.infrastructure.media import upload_validation
+from src.infrastructure.media.workers import shutdown_media_pool
+
+ARTWORK_FORM = {
+    'title': 'Masque', 'description_fr': 'Description', 'description_en': 'Description',
+    'description_wo': 'Description', 'category': 'Masque', 'period': 'XXe siècle', 'origin': 'Sénégal',
+}
+ROOM_FORM = {
+    'name_fr': 'Salle test', 'description_fr': 'Description', 'description_en': 'Description',
+    'description_wo': 'Description', 'theme': 'Histoire', 'accessibility_level': 'facile',
+}
+PANORAMA_LIMIT = 4096
+
+
+@pytest.fixture
+def app(workdir, monkeypatch):
+    # Limite de route calculée à la création des routes : à réduire avant create_app
+    monkeypatch.setitem(upload_validation.UPLOAD_LIMITS, 'panorama', PANORAMA_LIMIT)
+    from app import create_app
+    application = create_app()
+    application.config['TESTING'] = True
+    yield application
+    shutdown_media_pool()
+
+
+def stored_files():
+    return [os.path.join(root, name) for root, _, names in os.walk('static') for name in names]
+
+
+def artwork_count():
+    import database
+    conn = database.get_connection()
+    count = conn.execute("SELECT COUNT(*) FROM artworks").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_wrong_content_is_refused_with_415(client, admin_headers, room_id):
+    form = dict(ARTWORK_FORM, room_id=str(room_id),
+                image_file=(io.BytesIO(b'#!/bin/sh\necho pas une image\n' * 10), 'masque.jpg'))
+
+    response = client.post('/api/artworks/', data=form, headers=admin_headers, content_type='multipart/form-data')
+
+    assert response.status_code == 415
+    assert 'image_file' in response.get_json()['error']
+    assert stored_files() == []
+    assert artwork_count() == 0
+
+
+def test_short_file_is_sniffed_too(client, admin_headers, room_id):
+    form = dict(ARTWORK_FORM, room_id=str(room_id), audio_file=(io.BytesIO(b'abc'), 'guide.mp3'))
+
+    response = client.post('/api/artworks/', data=form, headers=admin_headers, content_type='multipart/form-data')
+
+    assert response.status_code == 415
+    assert stored_files() == []
+
+
+def test_file_over_its_kind_limit_is_refused_with_413(client, admin_headers, room_id):
+    panorama = jpeg_bytes() + b'\0' * PANORAMA_LIMIT
+    form = dict(ROOM_FORM, panorama_file=(io.BytesIO(panorama), 'salle.jpg'))
+
+    response = client.put(f'/api/rooms/{room_id}', data=form, headers=admin_headers,
+                          content_type='multipart/form-data')
+
+    assert response.status_code == 413
+    assert 'panorama_file' in response.get_json()['error']
+    assert stored_files() == []
+
+
+def test_declared_length_over_route_limit_is_refused_before_reading(client, admin_headers, room_id):
+    form = dict(ROOM_FORM, panorama_file=(io.BytesIO(jpeg_bytes()), 'salle.jpg'))
+
+    response = client.put(f'/api/rooms/{room_id}', data=form, headers=admin_headers,
+                          content_type='multipart/form-data',
+                          environ_overrides={'CONTENT_LENGTH': str(10 * 1024 * 1024 * 1024)})
+
+    assert response.status_code == 413
+    assert stored_files() == []
+
+
+def test_valid_upload_within_limits_is_accepted(client, admin_headers, room_id):
+    form = dict(ROOM_FORM, panorama_file=(io.BytesIO(jpeg_bytes()), 'salle.jpg'))
+
+    response = client.put(f'/api/rooms/{room_id}', data=form, headers=admin_headers,
+                          content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert len(stored_files()) == 1
+
+
+def test_overridden_werkzeug_hook_keeps_its_signature():
+    import inspect
+
+    from werkzeug.formparser import FormDataParser
+
+    from src.interfaces.upload_validation import ValidatingFormDataParser
+
+    # Méthode privée : une mise à jour de Werkzeug qui la change doit faire échouer ce test
+    def parameters(method):
+        return list(inspect.signature(method).parameters)
+
+    assert parameters(FormDataParser._parse_multipart) == parameters(ValidatingFormDataParser._parse_multipart)